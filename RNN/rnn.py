@@ -1,36 +1,264 @@
+import json
 import math
 import numpy as np
-import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import activation
+import callback
+import checkpoint
+import config
+import params
+import profiler
 
 # パスの設定
 DIR = os.getcwd()
 if (DIR.split('/')[-1] != 'RNN'):
     DIR = DIR + '/RNN'
+
+# 各層のユニット数の初期値
+# __main__として実行されない場合(他のモジュールからimportされた場合)にも参照できるように定義しておく
+NUM_INPUT = 1
+NUM_HIDDEN = 3
+NUM_CONTEXT = NUM_HIDDEN
+NUM_OUTPUT = 1
+
+# make_bits()が一度に乱数を生成するビット数(3の倍数)
+BLOCK_SIZE = 3 << 20
+# 入力するデータ(ビット列)の型(迷路のconfig.MAP_DTYPEとは別に、1ビットを1バイトで持つ)
+BIT_DTYPE = np.int8
+
+def _make_block(num_bit, dtype):
+    """
+    num_bitビット分のビット列を、乱数をまとめて生成して作る。
+    3ビットごとに[乱数, 乱数, 前の2ビットのXOR]を並べ、乱数は先頭から順に
+    np.random.randint(2)を1ビットずつ呼び出した時と同じ値になる。
+    input:
+        num_bit: int ビット数
+        dtype: ビット列の型
+    output:
+        bits: np.array (num_bit,) のビット列
+    """
+    num_triple = -(-num_bit // 3)
+    num_rand = 2 * (num_bit // 3) + num_bit % 3
+    # (dtype=np.int32なら、1ビットずつ生成した時と同じ乱数列になる)
+    rand = np.zeros(2 * num_triple, dtype=np.int32)
+    rand[:num_rand] = np.random.randint(2, size=num_rand, dtype=np.int32)
+    rand = rand.reshape(num_triple, 2)
+    bits = np.empty((num_triple, 3), dtype=dtype)
+    bits[:, :2] = rand
+    bits[:, 2] = rand[:, 0] ^ rand[:, 1]
+    return bits.reshape(-1)[:num_bit]
+
+def make_bits(data_len, dtype=None):
+    """
+    入力するデータ(0と1のビット列)をnp.arrayとしてまとめて生成する。
+    乱数はBLOCK_SIZEビットずつ生成するので、長いビット列でも作業用のメモリは増えない。
+    同じ乱数シードならinit_data()と同じビット列になる。
+    input:
+        data_len: int 入力するデータの長さ(3の倍数)
+        dtype: ビット列の型(NoneならBIT_DTYPE)
+    output:
+        bits: np.array (data_len,) のビット列
+    """
+    if ((type(data_len) != int) or (data_len < 0)):
+        raise ValueError
+    bits = np.empty(data_len, dtype=BIT_DTYPE if dtype is None else dtype)
+    for start in range(0, data_len, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, data_len)
+        bits[start:stop] = _make_block(stop - start, bits.dtype)
+    return bits
+
+def iter_bits(block_size=BLOCK_SIZE, num_block=None, dtype=None):
+    """
+    入力するデータを、block_sizeビットずつのブロックに分けて生成し続けるジェネレータ。
+    ブロックを順につなげると、同じ乱数シードでmake_bits()で作ったビット列と同じになる。
+    input:
+        block_size: int 1ブロックのビット数(3の倍数)
+        num_block: int 生成するブロックの数(Noneなら止まらずに生成し続ける)
+        dtype: ビット列の型(NoneならBIT_DTYPE)
+    output:
+        bits: np.array (block_size,) のビット列
+    """
+    if ((type(block_size) != int) or (block_size <= 0) or (block_size % 3 != 0)):
+        raise ValueError
+    dtype = BIT_DTYPE if dtype is None else dtype
+    iblock = 0
+    while ((num_block is None) or (iblock < num_block)):
+        yield _make_block(block_size, dtype)
+        iblock += 1
+
 def init_data(data_len):
     """
-    入力するデータを生成する
+    入力するデータを生成する(make_bits()で生成したビット列をリストにしたもの)
     input:
         data_len: int 入力するデータの長さ(3の倍数)
     output:
         res_data: リスト 入力するデータ(0と1のビット列)
     """
+    return make_bits(data_len).tolist()
 
-    res_data = []
-    for i in range(data_len):
-        # 最初の1ビット目の処理
-        if (i == 0):
-            res_data.append(np.random.randint(2))
-        # それ以降のビットの処理
-        elif ((i+1) % 3 != 0):
-            res_data.append(np.random.randint(2))
-        # 3の倍数ビットの時は、前と前々の2ビットのXORが入る
-        else:
-            res_data.append(int(res_data[i-1] ^ res_data[i-2]) )
-    
-    return res_data
 
 
+class BitSequence():
+    """
+    0と1のビット列を、np.packbits()で1バイトに8ビットずつ詰めて持つクラス。
+    リストのように len()・data[i] で読めるので、rnn.pyの各関数にそのまま入力できる。
+    詰めた配列はnp.memmapでもよく、その場合はアクセスした部分だけがディスクから読まれる。
+    """
+    __slots__ = ('packed', 'length')
+
+    def __init__(self, packed, length):
+        """
+        BitSequenceクラスのコンストラクタ
+        input:
+            packed: np.array・np.memmap np.packbits()で詰めたuint8の配列
+            length: int ビット数
+        """
+        if ((type(length) != int) or (length < 0) or (length > packed.shape[0] * 8)):
+            raise ValueError
+        self.packed = packed
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, isample):
+        """
+        isampleビット目の値を返す(負の値は後ろから数える)
+        """
+        if (isample < 0):
+            isample += self.length
+        if ((isample < 0) or (isample >= self.length)):
+            raise IndexError
+        return int((self.packed[isample >> 3] >> (7 - (isample & 7))) & 1)
+
+    def read(self, start, num_bit, dtype=None):
+        """
+        startビット目からnum_bitビット分を取り出す。最後のビットの次は先頭のビットに戻る。
+        input:
+            start: int 取り出し始める位置(ビット数より大きければビット数で割った余りの位置)
+            num_bit: int 取り出すビット数(ビット数より大きくてもよい)
+            dtype: 取り出したビット列の型(NoneならBIT_DTYPE)
+        output:
+            bits: np.array (num_bit,) のビット列
+        """
+        if (self.length == 0):
+            raise ValueError
+        bits = np.empty(num_bit, dtype=BIT_DTYPE if dtype is None else dtype)
+        pos = start % self.length
+        filled = 0
+        while (filled < num_bit):
+            # 最後のビットまでの分を、必要なバイトだけ展開して取り出す
+            num = min(num_bit - filled, self.length - pos)
+            first = pos >> 3
+            last = (pos + num + 7) >> 3
+            offset = pos - 8 * first
+            bits[filled:filled+num] = np.unpackbits(self.packed[first:last])[offset:offset+num]
+            filled += num
+            pos = 0
+        return bits
+
+class BitCursor():
+    """
+    BitSequenceを先頭から順に読み進めるカーソル。
+    最後のビットの次は先頭のビットに戻るので、何ビットでも続けて読める。
+    """
+    __slots__ = ('sequence', 'position')
+
+    def __init__(self, sequence, position=0):
+        """
+        BitCursorクラスのコンストラクタ
+        input:
+            sequence: BitSequence 読むビット列
+            position: int 最初に読む位置
+        """
+        if (len(sequence) == 0):
+            raise ValueError
+        self.sequence = sequence
+        self.position = position % len(sequence)
+
+    def peek(self, num_bit, dtype=None):
+        """
+        今の位置からnum_bitビット分を、位置を進めずに取り出す
+        """
+        return self.sequence.read(self.position, num_bit, dtype)
+
+    def read(self, num_bit, dtype=None):
+        """
+        今の位置からnum_bitビット分を取り出し、その分だけ位置を進める
+        """
+        bits = self.peek(num_bit, dtype)
+        self.position = (self.position + num_bit) % len(self.sequence)
+        return bits
+
+def pack_bits(bits):
+    """
+    ビット列をBitSequenceに詰める
+    input:
+        bits: リスト・np.array 0と1のビット列
+    output:
+        sequence: BitSequence
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    return BitSequence(np.packbits(bits), bits.shape[0])
+
+def save_bits(path, blocks):
+    """
+    ビット列を1バイトに8ビットずつ詰めて保存する。以下の2つのファイルに書き出す。
+        path.bin : np.packbits()で詰めたビット列(メモリマップで開ける)
+        path.json: ビット数など
+    ブロックごとに詰めて書き出すので、iter_bits()のようなジェネレータを渡せば
+    ビット列全体をメモリに載せずに保存できる。
+    input:
+        path: str 保存先(拡張子を除いたファイル名)
+        blocks: リスト・np.array 1本のビット列、またはビット列(np.array)のブロックを返すイテレータ
+    output:
+        length: int 保存したビット数
+    """
+    if (isinstance(blocks, (list, np.ndarray))):
+        blocks = [blocks]
+    length = 0
+    rest = np.zeros(0, dtype=np.uint8)     # 8ビットに満たずに次のブロックに回す分
+    with open(path + '.bin', mode='wb') as f:
+        for block in blocks:
+            block = np.concatenate([rest, np.asarray(block, dtype=np.uint8)])
+            num_full = block.shape[0] - block.shape[0] % 8
+            f.write(np.packbits(block[:num_full]).tobytes())
+            rest = block[num_full:]
+            length += num_full
+        if (rest.shape[0] > 0):
+            f.write(np.packbits(rest).tobytes())
+            length += rest.shape[0]
+    with open(path + '.json', mode='w') as f:
+        json.dump({'kind': 'bits', 'length': length, 'bitorder': 'big'}, f, indent=2)
+    return length
+
+def load_bits(path, mmap=True):
+    """
+    save_bits()で保存したビット列を読み込む
+    input:
+        path: str 保存先(拡張子を除いたファイル名)
+        mmap: bool Trueなら読み取り専用のメモリマップで開く。Falseならメモリに読み込む
+    output:
+        sequence: BitSequence
+    """
+    with open(path + '.json', 'r') as f:
+        meta = json.load(f)
+    if (meta['kind'] != 'bits'):
+        raise ValueError
+    if (meta['length'] == 0):
+        packed = np.zeros(0, dtype=np.uint8)
+    elif (mmap):
+        packed = np.memmap(path + '.bin', dtype=np.uint8, mode='r')
+    else:
+        packed = np.fromfile(path + '.bin', dtype=np.uint8)
+    return BitSequence(packed, meta['length'])
+
+# feedforward()・backward()に入力できるビット列の型
+SEQUENCE_TYPES = (list, np.ndarray, BitSequence)
 
 def init_net(num_input, num_context, num_hidden, num_output):
     """
@@ -42,7 +270,7 @@ def init_net(num_input, num_context, num_hidden, num_output):
         num_hidden: int 出力層のユニット数
         num_output: int 出力層のユニット数
     output:
-        network: [np.aray, np.array] 入力層~隠れ層、隠れ層~出力層それぞれの重み
+        network: [np.aray, np.array] 入力層~隠れ層、隠れ層~出力層それぞれの重み(型はconfig.FLOAT_DTYPE)
     """
     # 引数がint以外だったらValueErrorを投げる
     if ((type(num_input) != int) or (type(num_hidden) != int) or (type(num_output) != int)):
@@ -52,7 +280,7 @@ def init_net(num_input, num_context, num_hidden, num_output):
     # 入力層~隠れ層の重みを(-0.5~0.5)の範囲で初期化
     weight1 = np.random.rand(num_input+num_context+1, num_hidden) - 0.5
     weight2 = np.random.rand(num_hidden+1, num_output) - 0.5
-    return [weight1, weight2]
+    return [weight1.astype(config.FLOAT_DTYPE, copy=False), weight2.astype(config.FLOAT_DTYPE, copy=False)]
 
 def feedforward(weight, data, isample, context, beta=0.8):
     """
@@ -71,7 +299,7 @@ def feedforward(weight, data, isample, context, beta=0.8):
     """
     
     # 引数のweightがリスト、isampleがint以外だったらValueErrorを投げる
-    if ((type(weight) != list) or (type(data) != list) or (type(isample) != int)):
+    if ((type(weight) != list) or (not isinstance(data, SEQUENCE_TYPES)) or (type(isample) != int)):
         print("weight:{}\tdata:{}\tisample:{}".format(type(weight), type(data), type(isample)))
         raise ValueError
     if (weight[0] is int):
@@ -100,7 +328,7 @@ def feedforward(weight, data, isample, context, beta=0.8):
         for j in range(NUM_INPUT+NUM_CONTEXT+1):
             net_input = net_input + (weight[0][j][i] * X[j])
         # 加算された値をシグモイド関数に適用
-        H.append((1.0 / (1.0 + np.exp(net_input * -beta))))
+        H.append(activation.sigmoid(net_input, beta))
     
     H.append(1.0)
     # 出力層のユニット数だけ繰り返し
@@ -108,7 +336,7 @@ def feedforward(weight, data, isample, context, beta=0.8):
         net_input = 0
         for j in range(NUM_HIDDEN+1):
             net_input = net_input + (weight[1][j][i] * H[j])
-        Y.append((1.0 / (1.0 + np.exp(net_input * -beta))))
+        Y.append(activation.sigmoid(net_input, beta))
     return [X, H, Y]
 
 def backward(weight, data, isample, out, beta=0.8):
@@ -122,17 +350,15 @@ def backward(weight, data, isample, out, beta=0.8):
     output:
         back: [H[num_hidden], Y[num_output]] 出力値から隠れ層・出力層のそれぞれのユニットからとった差を格納したリスト
     """
-    if ((type(weight) != list) or (type(data) != list) or (type(isample) != int) or (type(out) != list)):
+    if ((type(weight) != list) or (not isinstance(data, SEQUENCE_TYPES)) or (type(isample) != int) or (type(out) != list)):
         raise ValueError
     H = []
     Y = []
     # 出力層から逆伝播させる
     for i in range(NUM_OUTPUT):
-        # 3000ビット目の出力の正否判定は0ビット目の値を使う
-        if (isample+1 == 3000):
-            Y.append(beta * (data[0] - out[2][i]) * (1.0 - out[2][i]) * out[2][i])
-        else:
-            Y.append(beta * (data[isample+1] - out[2][i]) * (1.0 - out[2][i]) * out[2][i])
+        # 最後のビットの出力の正否判定は0ビット目の値を使う
+        t = data[(isample+1) % len(data)]
+        Y.append(beta * (t - out[2][i]) * (1.0 - out[2][i]) * out[2][i])
     
     # 隠れ層から逆伝播させる
     for i in range(NUM_HIDDEN):
@@ -177,10 +403,7 @@ def print_results(isample, out, data, error):
     print('\t training data No. = {}'.format(isample+1))
     print('\t \t IN: {}'.format(data[isample]))
     print('\t Trained_OUT: ', end="")
-    if (isample+1 >= 3000):
-        print('{}'.format(data[0]))
-    else:
-        print('{}'.format(data[isample+1]))
+    print('{}'.format(data[(isample+1) % len(data)]))
     print('\t \t OUT: {}'.format(out[2]))
     print('\t error = {}'.format(error))
     print("")
@@ -203,6 +426,515 @@ def calc_error(isample, data, out):
 
     return error
 
+class Elman():
+    """
+    エルマンネットワークの重みと、各層の出力値・逆伝播の値を格納するバッファをまとめて持つクラス。
+    入力層のバッファXは[入力, コンテキスト, 閾値用の1.0]を1本に並べたもので、
+    1ビット分の計算(feedforward・backward・modify_weights)を行列の演算だけで行う。
+    バッファは生成時に一度だけ確保し、学習中は新しい配列を作らずにその場で計算する。
+    """
+    __slots__ = ('num_input', 'num_context', 'num_hidden', 'num_output', 'beta', 'weight',
+                 'X', 'H', 'Y', 'back_h', 'back_y', 'tmp_h', 'tmp_y', 'delta1', 'delta2', 'out')
+
+    def __init__(self, num_input, num_context, num_hidden, num_output, beta=0.8, weight=None, context=None):
+        """
+        Elmanクラスのコンストラクタ
+        input:
+            num_input: int 入力層のユニット数
+            num_context: int コンテキスト層のユニット数(num_hidden以下)
+            num_hidden: int 隠れ層のユニット数
+            num_output: int 出力層のユニット数
+            beta: float シグモイド関数に使われる定数(初期値0.8)
+            weight: リスト 初期化済みの重み。Noneならinit_net()で初期化する
+            context: リスト・np.array 最初のビットを入力する時のコンテキスト層の出力値(Noneなら0)
+        """
+        if ((type(num_context) != int) or (num_context > num_hidden)):
+            raise ValueError
+        if weight is None:
+            weight = init_net(num_input, num_context, num_hidden, num_output)
+        self.num_input = num_input
+        self.num_context = num_context
+        self.num_hidden = num_hidden
+        self.num_output = num_output
+        self.beta = beta
+        self.weight = weight                                        # [入力層~隠れ層, 隠れ層~出力層]の重み
+        dtype = weight[0].dtype                                     # バッファの型は重みに合わせる
+        self.X = np.ones(num_input+num_context+1, dtype=dtype)      # [入力, コンテキスト, 1.0]
+        self.H = np.ones(num_hidden+1, dtype=dtype)                 # 隠れ層の出力値(最後は閾値用の1.0)
+        self.Y = np.zeros(num_output, dtype=dtype)                  # 出力層の出力値
+        self.back_h = np.zeros(num_hidden, dtype=dtype)             # 隠れ層の逆伝播の値
+        self.back_y = np.zeros(num_output, dtype=dtype)             # 出力層の逆伝播の値
+        self.tmp_h = np.zeros(num_hidden, dtype=dtype)              # 計算途中の値を置く作業用バッファ
+        self.tmp_y = np.zeros(num_output, dtype=dtype)
+        self.delta1 = np.zeros_like(weight[0])                      # 重みの修正量
+        self.delta2 = np.zeros_like(weight[1])
+        self.out = [self.X, self.H, self.Y]                         # feedforward()と同じ形の出力
+        # 隠れ層のバッファに前の時刻の出力値として置いておき、次のfeedforward()でコンテキスト層に写す
+        self.H[:num_context] = 0.0 if context is None else np.asarray(context)[:num_context]
+
+    @property
+    def context(self):
+        """
+        次のビットを入力する時のコンテキスト層の出力値(前の時刻の隠れ層の出力値)のコピー
+        """
+        return self.H[:self.num_context].copy()
+
+    def feedforward(self, x):
+        """
+        前の時刻の隠れ層の出力値をコンテキスト層に写してから入力を順方向に伝播させ、結果をX・H・Yに書き込む
+        input:
+            x: float or np.array (num_input,) の入力値
+        output:
+            Y: np.array 出力層の出力値(バッファそのもの)
+        """
+        num_input = self.num_input
+        h = self.H[:-1]
+        self.X[num_input:num_input+self.num_context] = self.H[:self.num_context]
+        self.X[:num_input] = x
+        np.dot(self.X, self.weight[0], out=h)
+        activation.sigmoid(h, self.beta, out=h)
+        np.dot(self.H, self.weight[1], out=self.Y)
+        activation.sigmoid(self.Y, self.beta, out=self.Y)
+        return self.Y
+
+    def backward(self, t):
+        """
+        教師データ(次のビット)との差を逆方向に伝播させ、結果をback_h・back_yに書き込む
+        input:
+            t: float or np.array (num_output,) の教師データ
+        output:
+            なし
+        """
+        h = self.H[:-1]
+        # 出力層から逆伝播させる
+        np.subtract(t, self.Y, out=self.back_y)
+        self.back_y *= self.beta
+        self.back_y *= self.Y
+        np.subtract(1.0, self.Y, out=self.tmp_y)
+        self.back_y *= self.tmp_y
+        # 隠れ層から逆伝播させる
+        np.dot(self.weight[1][:-1], self.back_y, out=self.back_h)
+        self.back_h *= self.beta
+        self.back_h *= h
+        np.subtract(1.0, h, out=self.tmp_h)
+        self.back_h *= self.tmp_h
+
+    def modify_weights(self, epsilon=0.1):
+        """
+        逆伝播の結果を用いて、重みをその場で修正する
+        input:
+            epsilon: float 学習率。初期値0.1
+        output:
+            なし
+        """
+        np.outer(self.X, self.back_h, out=self.delta1)
+        self.delta1 *= epsilon
+        self.weight[0] += self.delta1
+        np.outer(self.H, self.back_y, out=self.delta2)
+        self.delta2 *= epsilon
+        self.weight[1] += self.delta2
+
+    def iter_blocks(self, data, block_size=65536):
+        """
+        データを、教師データ(次のビット)を1ビット付け足したブロックに分けて返すジェネレータ。
+        BitSequenceはBitCursorでblock_sizeビットずつ展開し、リスト・np.arrayは1つのブロックにする。
+        input:
+            data: リスト・np.array・BitSequence 入力するデータ(0と1のビット列)
+            block_size: int BitSequenceを1度に展開するビット数
+        output:
+            start: int ブロックの先頭のビットの位置
+            bits: np.array (ブロックのビット数+1,) のビット列(最後は次のブロックの先頭のビット)
+        """
+        dtype = self.X.dtype
+        if (isinstance(data, BitSequence)):
+            cursor = BitCursor(data)
+            for start in range(0, len(data), block_size):
+                num_bit = min(block_size, len(data) - start)
+                yield start, cursor.peek(num_bit + 1, dtype)
+                cursor.read(num_bit)
+        else:
+            bits = np.asarray(data, dtype=dtype)
+            # 最後のビットの教師データは先頭のビット
+            yield 0, np.append(bits, bits[:1])
+
+    def train_epoch(self, data, epsilon=0.1, prof=profiler.NULL, callbacks=None):
+        """
+        データを先頭から1ビットずつ入力し、ビットごとに重みを修正する(1epoch分)。
+        各ビットの教師データは次のビットで、最後のビットは先頭のビットに戻る。
+        input:
+            data: リスト・np.array・BitSequence 入力するデータ(0と1のビット列)
+            epsilon: float 学習率。初期値0.1
+            prof: profiler.Profiler 処理ごとの時間を計測する時に指定する
+            callbacks: リスト callback.Callbackのリスト。on_sample()をビットごとに呼び出す
+        output:
+            error: float (次のビット - 出力)^2 / 2 の総和
+        """
+        callbacks = callback.make_callbacks(callbacks)
+        on_sample = callbacks.on_sample if ((callbacks is not None) and callbacks.sample) else None
+
+        error = 0.0
+        for start, bits in self.iter_blocks(data):
+            for i in range(bits.shape[0] - 1):
+                isample = start + i
+                t0 = prof.start()
+                self.feedforward(bits[i])
+                prof.stop('forward', t0)
+                t = bits[i+1]
+                if (on_sample is not None):
+                    on_sample(isample, {'out': self.out, 'data': data, 'weight': self.weight})
+                t0 = prof.start()
+                np.subtract(t, self.Y, out=self.tmp_y)
+                error += float(np.dot(self.tmp_y, self.tmp_y)) / 2.0
+                prof.stop('error', t0)
+                t0 = prof.start()
+                self.backward(t)
+                prof.stop('backward', t0)
+                t0 = prof.start()
+                self.modify_weights(epsilon)
+                prof.stop('update', t0)
+        return error
+
+def train_epoch(weight, data, context, epsilon=0.1, beta=0.8, prof=profiler.NULL, callbacks=None):
+    """
+    データを先頭から1ビットずつ入力し、ビットごとに重みを修正する(1epoch分)
+    input:
+        weight: リスト 各層の重み(np.array)が格納されたリスト
+        data: リスト 入力するデータ(0と1のビット列)
+        context: リスト・np.array 最初のビットを入力する時のコンテキスト層の出力値
+        epsilon: float 学習率。初期値0.1
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+        prof: profiler.Profiler 処理ごとの時間を計測する時に指定する(初期値は計測しないprofiler.NULL)
+        callbacks: リスト callback.Callbackのリスト。on_sample()をビットごとに呼び出す
+    output:
+        context: リスト 最後のビットを入力した後の隠れ層の出力値(次のepochのコンテキスト層)
+    """
+    # on_sample()を上書きしたコールバックがある時だけ呼び出す
+    callbacks = callback.make_callbacks(callbacks)
+    on_sample = callbacks.on_sample if ((callbacks is not None) and callbacks.sample) else None
+
+    for isample in range(len(data)):
+        t0 = prof.start()
+        out = feedforward(weight, data, isample, context)
+        prof.stop('forward', t0)
+        context = out[1] # 次の時刻の隠れ層に入力されるコンテキスト層の設定
+        if (on_sample is not None):
+            on_sample(isample, {'out': out, 'data': data, 'weight': weight})
+        t0 = prof.start()
+        back = backward(weight, data, isample, out, beta=beta)
+        prof.stop('backward', t0)
+        t0 = prof.start()
+        modify_weights(weight, out, back, epsilon=epsilon)
+        prof.stop('update', t0)
+    return context
+
+def fit(weight, data, context, num_learn=1200, epsilon=0.1, beta=0.8, callbacks=None, prof=profiler.NULL):
+    """
+    Elman.train_epoch()をnum_learn epoch繰り返して学習する(重みはその場で修正される)。
+    コンテキスト層は前のepochの最後のビットの隠れ層の出力を引き継ぐ。
+    各層のユニット数は重みとcontextの形から決める。
+    コールバックには、logsとして 'weight'(各層の重み)・'data'(ビット列)・'context'(コンテキスト層)・
+    'error'(そのepochのエラー値の総和)を渡す。
+    input:
+        weight: リスト 各層の重み(np.array)が格納されたリスト
+        data: リスト 入力するデータ(0と1のビット列)
+        context: リスト・np.array 1epoch目のコンテキスト層の出力値
+        num_learn: int 学習の繰り返し回数
+        epsilon: float 学習率。初期値0.1
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+        callbacks: リスト callback.Callbackのリスト(on_epoch_end()がTrueを返すと止める)
+        prof: profiler.Profiler 処理ごとの時間を計測する時に指定する
+    output:
+        context: np.array 最後のビットを入力した後の隠れ層の出力値
+    """
+    callbacks = callback.make_callbacks(callbacks)
+    num_context = len(context)
+    num_input = weight[0].shape[0] - num_context - 1
+    net = Elman(num_input, num_context, weight[0].shape[1], weight[1].shape[1], beta=beta, weight=weight, context=context)
+
+    logs = {'weight': weight, 'data': data, 'context': context, 'error': None}
+    for ilearn in range(num_learn):
+        if (callbacks is not None):
+            callbacks.on_epoch_start(ilearn, logs)
+        logs['error'] = net.train_epoch(data, epsilon=epsilon, prof=prof, callbacks=callbacks)
+        logs['context'] = net.context
+        if ((callbacks is not None) and callbacks.on_epoch_end(ilearn, logs)):
+            break
+    return net.context
+
+def init_seeds(seeds, len_data, num_input, num_context, num_hidden, num_output):
+    """
+    シードごとに入力データ・重み・1epoch目のコンテキスト層を作り、先頭の軸に重ねる。
+    k番目は、np.random.seed(seeds[k])の後にinit_data()・init_net()・コンテキスト層の初期化を
+    この順に行った結果(__main__でシードごとに学習する時と同じ値)になる。
+    input:
+        seeds: リスト 各ネットワークの乱数シード
+        len_data: int 入力するデータの長さ(3の倍数)
+        num_input, num_context, num_hidden, num_output: int 各層のユニット数
+    output:
+        weight: [np.array(K, num_input+num_context+1, num_hidden), np.array(K, num_hidden+1, num_output)]
+        data: np.array (K, len_data) の入力データ
+        context: np.array (K, num_context) の1epoch目のコンテキスト層の出力値
+    """
+    if ((type(seeds) != list) or (len(seeds) == 0)):
+        raise ValueError
+    weights = []
+    data = []
+    context = []
+    for seed in seeds:
+        np.random.seed(seed=seed)
+        data.append(make_bits(len_data))
+        weights.append(init_net(num_input, num_context, num_hidden, num_output))
+        context.append((np.random.rand(num_context) / 10).astype(config.FLOAT_DTYPE))
+    weight = [np.stack([w[i] for w in weights]) for i in range(2)]
+    return weight, np.array(data, dtype=BIT_DTYPE), np.stack(context)
+
+class ElmanEnsemble(Elman):
+    """
+    同じ形のK個のエルマンネットワーク(シードだけが違うもの)を、先頭の軸に重ねてまとめて学習するクラス。
+    各時刻の計算はK個分まとめた1回の行列積(np.matmul)で行うので、
+    Pythonのループの回数はネットワーク1個分と同じになる。
+    k番目のネットワークの結果は、Elmanで1個ずつ学習した結果と同じになる。
+    """
+    __slots__ = ('num_net', 'net_h', 'net_y')
+
+    def __init__(self, num_input, num_context, num_hidden, num_output, weight, beta=0.8, context=None):
+        """
+        ElmanEnsembleクラスのコンストラクタ
+        input:
+            num_input: int 入力層のユニット数
+            num_context: int コンテキスト層のユニット数(num_hidden以下)
+            num_hidden: int 隠れ層のユニット数
+            num_output: int 出力層のユニット数
+            weight: リスト init_seeds()が返したK個分の重み
+            beta: float シグモイド関数に使われる定数(初期値0.8)
+            context: np.array (K, num_context) の1epoch目のコンテキスト層の出力値(Noneなら0)
+        """
+        if ((type(weight) != list) or (weight[0].ndim != 3)):
+            raise ValueError
+        if ((type(num_context) != int) or (num_context > num_hidden)):
+            raise ValueError
+        num_net = weight[0].shape[0]
+        self.num_net = num_net
+        self.num_input = num_input
+        self.num_context = num_context
+        self.num_hidden = num_hidden
+        self.num_output = num_output
+        self.beta = beta
+        self.weight = weight
+        dtype = weight[0].dtype
+        self.X = np.ones((num_net, num_input+num_context+1), dtype=dtype)
+        self.H = np.ones((num_net, num_hidden+1), dtype=dtype)
+        self.Y = np.zeros((num_net, num_output), dtype=dtype)
+        self.back_h = np.zeros((num_net, num_hidden), dtype=dtype)
+        self.back_y = np.zeros((num_net, num_output), dtype=dtype)
+        self.tmp_h = np.zeros((num_net, num_hidden), dtype=dtype)
+        self.tmp_y = np.zeros((num_net, num_output), dtype=dtype)
+        self.net_h = np.zeros((num_net, 1, num_hidden), dtype=dtype)    # np.matmul()の出力先
+        self.net_y = np.zeros((num_net, 1, num_output), dtype=dtype)
+        self.delta1 = np.zeros_like(weight[0])
+        self.delta2 = np.zeros_like(weight[1])
+        self.out = [self.X, self.H, self.Y]
+        self.H[:, :num_context] = 0.0 if context is None else np.asarray(context)[:, :num_context]
+
+    @property
+    def context(self):
+        """
+        次のビットを入力する時の、K個のネットワークのコンテキスト層の出力値のコピー
+        """
+        return self.H[:, :self.num_context].copy()
+
+    def feedforward(self, x):
+        """
+        K個のネットワークにそれぞれの入力を順方向に伝播させ、結果をX・H・Yに書き込む
+        input:
+            x: np.array (K,) か (K, num_input) の入力値
+        output:
+            Y: np.array (K, num_output) の出力層の出力値(バッファそのもの)
+        """
+        num_input = self.num_input
+        self.X[:, num_input:num_input+self.num_context] = self.H[:, :self.num_context]
+        self.X[:, :num_input] = np.reshape(x, (self.num_net, -1))
+        np.matmul(self.X[:, np.newaxis, :], self.weight[0], out=self.net_h)
+        activation.sigmoid(self.net_h, self.beta, out=self.net_h)
+        self.H[:, :-1] = self.net_h[:, 0, :]
+        np.matmul(self.H[:, np.newaxis, :], self.weight[1], out=self.net_y)
+        activation.sigmoid(self.net_y, self.beta, out=self.net_y)
+        self.Y[...] = self.net_y[:, 0, :]
+        return self.Y
+
+    def backward(self, t):
+        """
+        K個のネットワークそれぞれの教師データとの差を逆方向に伝播させ、結果をback_h・back_yに書き込む
+        input:
+            t: np.array (K,) か (K, num_output) の教師データ
+        output:
+            なし
+        """
+        h = self.H[:, :-1]
+        # 出力層から逆伝播させる
+        np.subtract(np.reshape(t, (self.num_net, -1)), self.Y, out=self.back_y)
+        self.back_y *= self.beta
+        self.back_y *= self.Y
+        np.subtract(1.0, self.Y, out=self.tmp_y)
+        self.back_y *= self.tmp_y
+        # 隠れ層から逆伝播させる
+        np.matmul(self.weight[1][:, :-1, :], self.back_y[:, :, np.newaxis], out=self.net_h.reshape(self.num_net, -1, 1))
+        np.multiply(self.net_h[:, 0, :], self.beta, out=self.back_h)
+        self.back_h *= h
+        np.subtract(1.0, h, out=self.tmp_h)
+        self.back_h *= self.tmp_h
+
+    def modify_weights(self, epsilon=0.1):
+        """
+        逆伝播の結果を用いて、K個のネットワークの重みをその場で修正する
+        input:
+            epsilon: float 学習率。初期値0.1
+        output:
+            なし
+        """
+        np.multiply(self.X[:, :, np.newaxis], self.back_h[:, np.newaxis, :], out=self.delta1)
+        self.delta1 *= epsilon
+        self.weight[0] += self.delta1
+        np.multiply(self.H[:, :, np.newaxis], self.back_y[:, np.newaxis, :], out=self.delta2)
+        self.delta2 *= epsilon
+        self.weight[1] += self.delta2
+
+    def train_epoch(self, data, epsilon=0.1, prof=profiler.NULL, callbacks=None):
+        """
+        K本のデータを先頭から1ビットずつ入力し、ビットごとにK個のネットワークの重みを修正する(1epoch分)。
+        各ビットの教師データは次のビットで、最後のビットは先頭のビットに戻る。
+        input:
+            data: np.array (K, len_data) の入力データ(0と1のビット列)
+            epsilon: float 学習率。初期値0.1
+            prof: profiler.Profiler 処理ごとの時間を計測する時に指定する
+            callbacks: リスト callback.Callbackのリスト。on_sample()をビットごとに呼び出す
+        output:
+            error: np.array (K,) ネットワークごとの (次のビット - 出力)^2 / 2 の総和
+        """
+        callbacks = callback.make_callbacks(callbacks)
+        on_sample = callbacks.on_sample if ((callbacks is not None) and callbacks.sample) else None
+
+        # 時刻ごとにK個分の入力を連続したメモリから取り出せるように、(len_data, K)に並べ替える
+        bits = np.ascontiguousarray(np.asarray(data, dtype=self.X.dtype).T)
+        len_data = bits.shape[0]
+        error = np.zeros(self.num_net)
+        for isample in range(len_data):
+            t0 = prof.start()
+            self.feedforward(bits[isample])
+            prof.stop('forward', t0)
+            t = bits[(isample+1) % len_data]
+            if (on_sample is not None):
+                on_sample(isample, {'out': self.out, 'data': data, 'weight': self.weight})
+            t0 = prof.start()
+            np.subtract(t[:, np.newaxis], self.Y, out=self.tmp_y)
+            self.tmp_y *= self.tmp_y
+            error += self.tmp_y.sum(axis=1) / 2.0
+            prof.stop('error', t0)
+            t0 = prof.start()
+            self.backward(t)
+            prof.stop('backward', t0)
+            t0 = prof.start()
+            self.modify_weights(epsilon)
+            prof.stop('update', t0)
+        return error
+
+def fit_ensemble(weight, data, context, num_learn=1200, epsilon=0.1, beta=0.8, callbacks=None, prof=profiler.NULL):
+    """
+    init_seeds()で作ったK個のネットワークを、ElmanEnsemble.train_epoch()でnum_learn epochまとめて学習する。
+    fit()をシードごとに呼び出すのと同じ結果になる(重みはその場で修正される)。
+    コールバックには、logsとして 'weight'・'data'・'context'・'error'(ネットワークごとのエラー値の総和)を渡す。
+    input:
+        weight: リスト init_seeds()が返したK個分の重み
+        data: np.array (K, len_data) の入力データ
+        context: np.array (K, num_context) の1epoch目のコンテキスト層の出力値
+        num_learn: int 学習の繰り返し回数
+        epsilon: float 学習率。初期値0.1
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+        callbacks: リスト callback.Callbackのリスト(on_epoch_end()がTrueを返すと止める)
+        prof: profiler.Profiler 処理ごとの時間を計測する時に指定する
+    output:
+        context: np.array (K, num_context) 最後のビットを入力した後の隠れ層の出力値
+    """
+    callbacks = callback.make_callbacks(callbacks)
+    num_context = context.shape[1]
+    num_input = weight[0].shape[1] - num_context - 1
+    net = ElmanEnsemble(num_input, num_context, weight[0].shape[2], weight[1].shape[2], weight,
+                        beta=beta, context=context)
+
+    logs = {'weight': weight, 'data': data, 'context': context, 'error': None}
+    for ilearn in range(num_learn):
+        if (callbacks is not None):
+            callbacks.on_epoch_start(ilearn, logs)
+        logs['error'] = net.train_epoch(data, epsilon=epsilon, prof=prof, callbacks=callbacks)
+        logs['context'] = net.context
+        if ((callbacks is not None) and callbacks.on_epoch_end(ilearn, logs)):
+            break
+    return net.context
+
+def calc_error_ensemble(isample, data, out):
+    """
+    K個のネットワークの出力値から、calc_error()と同じ式でネットワークごとのエラー値を計算する
+    input:
+        isample: int サンプル番号
+        data: np.array (K, len_data) の入力データ
+        out: リスト ElmanEnsemble.outの[X, H, Y]
+    output:
+        error: np.array (K,) エラー値
+    """
+    return np.sum((data[:, isample, np.newaxis] - out[2]) ** 2, axis=1) / 2.0
+
+class RecordError(callback.Callback):
+    """
+    epoch目の学習中に、各ビットの修正前の出力からfunc(既定はcalc_error())でエラー値を記録するコールバック
+    """
+    def __init__(self, epoch, func=None):
+        """
+        RecordErrorクラスのコンストラクタ
+        input:
+            epoch: int エラー値を記録するepoch
+            func: エラー値を計算する関数 func(isample, data, out)。
+                Noneならcalc_error()(ElmanEnsembleで学習する時はcalc_error_ensemble()を指定する)
+        """
+        self.epoch = epoch
+        self.func = calc_error if func is None else func
+        self.error = []          # 各ビットのエラー値
+        self.active = False      # 記録するepochの学習中かどうか
+
+    def on_epoch_start(self, epoch, logs):
+        self.active = (epoch == self.epoch)
+
+    def on_sample(self, isample, logs):
+        if self.active:
+            self.error.append(self.func(isample, logs['data'], logs['out']))
+
+def average_error(error_list):
+    """
+    シードごとの最後のepochの各ビットのエラー値を、ビットごとに平均する
+    input:
+        error_list: リスト シードごとのエラー値(長さが同じリスト・np.array)が格納されたリスト
+    output:
+        ave_error: np.array 各ビットのエラー値の平均
+    """
+    if ((type(error_list) != list) or (len(error_list) == 0)):
+        raise ValueError
+    sum_error = np.zeros(len(error_list[0]))
+    for error in error_list:
+        sum_error += np.array(error)
+    return sum_error / len(error_list)
+
+def write_error(ave_error, file_name='RNN_error.dat'):
+    """
+    エラー値を1行に1つずつ外部ファイルに書き出す
+    input:
+        ave_error: np.array 各ビットのエラー値の平均
+        file_name: str 書き出すファイル(DIRからの相対パスか絶対パス)
+    output:
+        なし
+    """
+    with open(os.path.join(DIR, file_name), mode='w') as f:
+        for ele in ave_error:
+            f.write(str(ele)+'\n')
+
 def plot_error(file_name='RNN_error.dat'):
     """
     エラー値の推移をプロットする
@@ -211,6 +943,9 @@ def plot_error(file_name='RNN_error.dat'):
     output:
         なし
     """
+    # matplotlibは読み込みに時間がかかるので、プロットする時だけimportする
+    import matplotlib.pyplot as plt
+
     error = []
     with open(DIR+'/'+file_name, 'r') as f:
         for ele in f:
@@ -237,63 +972,53 @@ def plot_error(file_name='RNN_error.dat'):
 
 
 if __name__ == '__main__':
+    PLOT = '--no-plot' not in sys.argv[1:]  # --no-plotを付けて実行するとプロットしない
     NUM_LEARN = 1200           # 学習の繰り返し回数
     LEN_DATA = 3000
-    global NUM_INPUT               # 入力層のユニット数
-    NUM_INPUT = 1
-    global NUM_HIDDEN              # 隠れ層のユニット数
-    NUM_HIDDEN = 3
-    global NUM_CONTEXT              # コンテキスト層のユニット数
-    NUM_CONTEXT = NUM_HIDDEN
-    global NUM_OUTPUT              # 出力層のユニット数
-    NUM_OUTPUT = 1
+    NUM_INPUT = 1               # 入力層のユニット数
+    NUM_HIDDEN = 3              # 隠れ層のユニット数
+    NUM_CONTEXT = NUM_HIDDEN    # コンテキスト層のユニット数
+    NUM_OUTPUT = 1              # 出力層のユニット数
     THRESHOLD_ERROR = 0.001     # 学習誤差がこの値以下になるとプログラムが停止する
     error_list = []           # 1epoch中のエラー値の推移(参考文献ではこの値が周期的になっていた)
     seeds = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12] # 乱数シード
-    
-    # シードの数だけループ
-    for seed in seeds:
-        error = []
-        print("seed {} is start!".format(seed))
-        # 乱数シードの値を設定する
-        np.random.seed(seed=seed)
-        
-        # 入出力データの読み込み
-        data = init_data(LEN_DATA)
-
-        # ネットワークの重みの初期化
-        weight = init_net(NUM_INPUT, NUM_CONTEXT, NUM_HIDDEN, NUM_OUTPUT)
-
-        # 1epoch目のコンテキスト層の初期化
-        context = np.random.rand(NUM_CONTEXT) / 10
-
-        # 学習の繰り返しループ
-        for ilearn in range(NUM_LEARN):
-            error_list = []
-            if (ilearn % 100) == 0:
-                print('# of learning : {}'.format(ilearn))
-            
-            # 訓練データに関するループ
-            for isample in range(LEN_DATA):
-                out = feedforward(weight, data, isample, context)
-                context = out[1] # 次の時刻の隠れ層に入力されるコンテキスト層の設定
-                if (ilearn == (NUM_LEARN-1)):
-                    error.append(calc_error(isample, data, out))            
-                back = backward(weight, data, isample, out)
-                modify_weights(weight, out, back, epsilon=0.1)
-        
-        error_list.append(error)   
-        print("seed {} is done!".format(seed))
 
-    sum_error = np.zeros(3000)
-    for error in error_list:
-        sum_error += np.array(error)  
-    ave_error = sum_error / len(seeds)
+    # 環境変数ML_PROFILEが設定されていれば、処理ごとの時間をepochごとにJSONで書き出す
+    prof = profiler.get_profiler()
 
-    # 出力されたエラー値の平均を外部ファイルに書き出し
-    with open(DIR+'/RNN_error.dat', mode='w') as f:
-        for ele in ave_error:
-            f.write(str(ele)+'\n')
+    # 入出力データ・重み・1epoch目のコンテキスト層を、シードごとに作って先頭の軸に重ねる
+    # (シードごとにnp.random.seed()からやり直すので、1シードずつ学習していた時と同じ値になる)
+    print("seed {} are start!".format(seeds))
+    t0 = prof.start()
+    weight, data, context = init_seeds(seeds, LEN_DATA, NUM_INPUT, NUM_CONTEXT, NUM_HIDDEN, NUM_OUTPUT)
+    prof.stop('io', t0)
+    # 全ての層の重みを1本の配列に並べ、各層はそのビュー(シード数, 行, 列)として使う
+    # (重みの修正はElmanEnsembleのバッファで行うので、修正量の配列は確保しない)
+    weight = params.FlatParams.from_weight(weight, with_grad=False).weight
+
+    # 100epochごとに繰り返し回数をプリントし、最後のepochの各ビットのエラー値をシードごとに記録する
+    recorder = RecordError(NUM_LEARN-1, func=calc_error_ensemble)
+    callbacks = [callback.PrintEpoch(100), recorder]
+    if prof.enabled:
+        callbacks.append(callback.EmitProfile(prof, seed=seeds))
+    # 全てのシードのネットワークをまとめて学習する
+    context = fit_ensemble(weight, data, context, NUM_LEARN, epsilon=0.1, callbacks=callbacks, prof=prof)
+    error = np.array(recorder.error)    # (ビット数, シード数)
+
+    for k, seed in enumerate(seeds):
+        error_list.append(error[:, k])
+        # シードごとに学習済みの重みを保存
+        t0 = prof.start()
+        checkpoint.save_model(DIR+'/rnn_model_seed{}'.format(seed), [w[k] for w in weight], kind='rnn', beta=0.8,
+                              extra={'seed': seed, 'epoch': NUM_LEARN, 'context': list(map(float, context[k]))})
+        prof.stop('io', t0)
+        print("seed {} is done!".format(seed))
+    prof.emit(seed=seeds, epoch=NUM_LEARN)
+
+    # 全てのシードのエラー値の平均を外部ファイルに書き出し
+    write_error(average_error(error_list))
+    prof.close()
     
-    plot_error()
+    if PLOT:
+        plot_error()
 
@@ -0,0 +1,112 @@
+import os
+import time
+import functools
+import multiprocessing
+import numpy as np
+import rnn
+import checkpoint
+
+
+def split_seeds(seeds, num_chunk):
+    """
+    乱数シードを、順番を保ったままnum_chunk個以下のまとまりに分ける
+    input:
+        seeds: リスト 乱数シード
+        num_chunk: int まとまりの数(プロセス数など)
+    output:
+        chunks: リスト 乱数シードのリストのリスト(空のまとまりは含まない)
+    """
+    if ((type(num_chunk) != int) or (num_chunk < 1)):
+        raise ValueError
+    size = -(-len(seeds) // num_chunk)
+    return [seeds[i:i+size] for i in range(0, len(seeds), size)]
+
+def run_seeds(seeds, len_data=3000, num_learn=1200, epsilon=0.1, num_hidden=3):
+    """
+    いくつかのシードのネットワークを、rnn.fit_ensemble()でまとめて学習させ、シードごとの結果を返す。
+    シードごとにnp.random.seed()からデータ・重みを作るので、どのプロセスで学習しても同じ結果になる。
+    input:
+        seeds: リスト 乱数シード
+        len_data: int 入力するデータの長さ(3の倍数)
+        num_learn: int 学習の繰り返し回数
+        epsilon: float 学習率
+        num_hidden: int 隠れ層(コンテキスト層)のユニット数
+    output:
+        results: リスト シードごとの辞書 {'seed', 'error'(最後のepochの各ビットのエラー値),
+            'weight', 'context', 'wall_time'(このまとまりの学習時間)}
+    """
+    start = time.perf_counter()
+    weight, data, context = rnn.init_seeds(seeds, len_data, rnn.NUM_INPUT, num_hidden, num_hidden, rnn.NUM_OUTPUT)
+    recorder = rnn.RecordError(num_learn-1, func=rnn.calc_error_ensemble)
+    context = rnn.fit_ensemble(weight, data, context, num_learn, epsilon=epsilon, callbacks=[recorder])
+    error = np.array(recorder.error)    # (ビット数, シード数)
+    wall_time = time.perf_counter() - start
+
+    return [{'seed': seed, 'error': error[:, k], 'weight': [w[k].copy() for w in weight],
+             'context': context[k], 'wall_time': wall_time}
+            for k, seed in enumerate(seeds)]
+
+def iter_results(seeds, processes=None, chunk_size=None, len_data=3000, num_learn=1200, epsilon=0.1, num_hidden=3):
+    """
+    乱数シードをプロセスプールに分けて学習させ、終わったシードから順に結果を返すジェネレータ
+    input:
+        seeds: リスト 乱数シード
+        processes: int 使うプロセス数(NoneならCPUのコア数)
+        chunk_size: int 1つのプロセスでまとめて学習させるシードの数(Noneならシードをプロセス数で等分する)
+        len_data, num_learn, epsilon, num_hidden: run_seeds()と同じ
+    output:
+        result: 辞書 run_seeds()が返すシードごとの結果(終わった順で、seedsの順番とは限らない)
+    """
+    if ((type(seeds) != list) or (len(seeds) == 0)):
+        raise ValueError
+    if (processes is None):
+        processes = multiprocessing.cpu_count()
+    if (chunk_size is None):
+        chunks = split_seeds(seeds, processes)
+    else:
+        chunks = split_seeds(seeds, -(-len(seeds) // chunk_size))
+    run = functools.partial(run_seeds, len_data=len_data, num_learn=num_learn,
+                            epsilon=epsilon, num_hidden=num_hidden)
+    pool = multiprocessing.Pool(min(processes, len(chunks)))
+    try:
+        for results in pool.imap_unordered(run, chunks):
+            for result in results:
+                yield result
+    finally:
+        pool.close()
+        pool.join()
+
+def save_result(result, num_learn, path=None):
+    """
+    1つのシードの学習済みの重みを、rnn.pyの__main__と同じ形式で保存する
+    input:
+        result: 辞書 run_seeds()が返すシードごとの結果
+        num_learn: int 学習の繰り返し回数
+        path: str 保存先(Noneなら DIR/rnn_model_seed<シード>)
+    output:
+        なし
+    """
+    if (path is None):
+        path = os.path.join(rnn.DIR, 'rnn_model_seed{}'.format(result['seed']))
+    checkpoint.save_model(path, result['weight'], kind='rnn', beta=0.8,
+                          extra={'seed': result['seed'], 'epoch': num_learn,
+                                 'context': list(map(float, result['context']))})
+
+
+if __name__ == '__main__':
+    NUM_LEARN = 1200           # 学習の繰り返し回数
+    LEN_DATA = 3000
+    NUM_HIDDEN = 3              # 隠れ層(コンテキスト層)のユニット数
+    SEEDS = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12] # 乱数シード
+
+    print('{} seeds on {} processes'.format(len(SEEDS), multiprocessing.cpu_count()))
+    start = time.perf_counter()
+    errors = {}
+    for result in iter_results(SEEDS, len_data=LEN_DATA, num_learn=NUM_LEARN, num_hidden=NUM_HIDDEN):
+        errors[result['seed']] = result['error']
+        save_result(result, NUM_LEARN)
+        print('seed {} is done! ({:.2f} s)'.format(result['seed'], result['wall_time']))
+    print('total wall time : {:.2f} s'.format(time.perf_counter() - start))
+
+    # シードの順番に並べてから平均し、rnn.pyの__main__と同じファイルに書き出す
+    rnn.write_error(rnn.average_error([errors[seed] for seed in SEEDS]))
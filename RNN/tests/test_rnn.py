@@ -3,9 +3,13 @@ import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+import io
+import tempfile
 import unittest
 import numpy as np
 import rnn
+import config
+import profiler
 
 
 class test_rnn(unittest.TestCase):
@@ -86,6 +90,83 @@ class test_rnn(unittest.TestCase):
         actual2 = return_list[1]
         self.assertEqual(expected2.all(), actual2.all())
 
+    def test_make_bits(self):
+        """
+        test method of init_data, make_bits, iter_bits
+        """
+        np.random.seed(seed=1)
+        data = rnn.init_data(3001)
+        self.assertEqual(list, type(data))
+        self.assertEqual(3001, len(data))
+        # 3ビットごとに、3ビット目が前の2ビットのXORになっているかテスト
+        bits = np.array(data[:3000]).reshape(-1, 3)
+        np.testing.assert_array_equal(bits[:, 0] ^ bits[:, 1], bits[:, 2])
+
+        # 同じ乱数シードなら、make_bits()もinit_data()と同じビット列になるかテスト
+        np.random.seed(seed=1)
+        np.testing.assert_array_equal(data, rnn.make_bits(3001))
+        # 迷路の型を変えても、ビット列の型は変わらないかテスト
+        config.set_map_dtype(np.int16)
+        try:
+            self.assertEqual(rnn.BIT_DTYPE, rnn.make_bits(3).dtype)
+            self.assertEqual(rnn.BIT_DTYPE, next(rnn.iter_bits(block_size=3)).dtype)
+            self.assertEqual(rnn.BIT_DTYPE, rnn.init_seeds([1], 3, 1, 3, 3, 1)[1].dtype)
+        finally:
+            config.set_map_dtype(np.int8)
+        # ブロックをつなげるとmake_bits()と同じビット列になるかテスト
+        np.random.seed(seed=1)
+        blocks = list(rnn.iter_bits(block_size=300, num_block=10))
+        self.assertEqual(10, len(blocks))
+        np.testing.assert_array_equal(data[:3000], np.concatenate(blocks))
+
+        with self.assertRaises(ValueError):
+            rnn.make_bits('test_input')
+        with self.assertRaises(ValueError):
+            next(rnn.iter_bits(block_size=10))
+
+    def test_bit_sequence(self):
+        """
+        test method of BitSequence, BitCursor, save_bits, load_bits
+        """
+        np.random.seed(seed=1)
+        data = rnn.make_bits(301)
+        sequence = rnn.pack_bits(data)
+        self.assertEqual(301, len(sequence))
+        self.assertEqual(list(data), [sequence[i] for i in range(301)])
+        self.assertEqual(data[-1], sequence[-1])
+        with self.assertRaises(IndexError):
+            sequence[301]
+        # 最後のビットの次は先頭のビットに戻るかテスト
+        np.testing.assert_array_equal(np.concatenate([data[290:], data[:9]]), sequence.read(290, 20))
+        cursor = rnn.BitCursor(sequence, position=300)
+        np.testing.assert_array_equal([data[300], data[0]], cursor.read(2))
+        self.assertEqual(1, cursor.position)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'bits')
+            # ブロックの長さが8の倍数でなくても、つなげたビット列として保存されるかテスト
+            length = rnn.save_bits(path, iter([data[:5], data[5:100], data[100:]]))
+            self.assertEqual(301, length)
+            self.assertEqual(38, os.path.getsize(path + '.bin'))
+            loaded = rnn.load_bits(path)
+            self.assertEqual(301, len(loaded))
+            np.testing.assert_array_equal(data, loaded.read(0, 301))
+
+            # 詰めたビット列でも、np.arrayと同じように学習できるかテスト
+            weight1 = rnn.init_net(1, 3, 3, 1)
+            weight2 = [w.copy() for w in weight1]
+            error1 = rnn.Elman(1, 3, 3, 1, weight=weight1).train_epoch(data)
+            error2 = rnn.Elman(1, 3, 3, 1, weight=weight2).train_epoch(loaded)
+            self.assertAlmostEqual(error1, error2)
+            for expected, actual in zip(weight1, weight2):
+                np.testing.assert_allclose(expected, actual)
+            del loaded
+
+        # 3000ビット以外の長さでも、最後のビットの教師データが先頭のビットになるかテスト
+        out = [[1, 0.5, 0.5, 0.5, 1.0], [0.5, 0.5, 0.5, 1.0], [0.5]]
+        back = rnn.backward(weight1, sequence, 300, out)
+        self.assertAlmostEqual(0.8 * (data[0] - 0.5) * 0.5 * 0.5, back[1][0])
+
     def test_feedforward(self):
         """
         test method of feedforward
@@ -165,3 +246,130 @@ class test_rnn(unittest.TestCase):
 
 
 
+
+    def test_elman(self):
+        """
+        test method of Elman
+        """
+        np.random.seed(seed=1)
+        data = rnn.init_data(3000)
+        weight = rnn.init_net(1, 3, 3, 1)
+        context = np.random.rand(3) / 10
+        net = rnn.Elman(1, 3, 3, 1, weight=[w.copy() for w in weight], context=context)
+        buffers = [net.X, net.H, net.Y, net.back_h, net.back_y, net.weight[0], net.weight[1]]
+
+        # 1ビットずつの関数と同じ結果になるかテスト
+        for isample in range(100):
+            out = rnn.feedforward(weight, data, isample, context)
+            context = out[1]
+            back = rnn.backward(weight, data, isample, out)
+            rnn.modify_weights(weight, out, back, epsilon=0.1)
+
+            net.feedforward(data[isample])
+            np.testing.assert_allclose(out[0], net.X)
+            np.testing.assert_allclose(out[1], net.H)
+            np.testing.assert_allclose(out[2], net.Y)
+            net.backward(data[isample+1])
+            np.testing.assert_allclose(back[0], net.back_h)
+            np.testing.assert_allclose(back[1], net.back_y)
+            net.modify_weights(0.1)
+            for expected, actual in zip(weight, net.weight):
+                np.testing.assert_allclose(expected, actual)
+        np.testing.assert_allclose(context[:3], net.context)
+
+        # 学習中にバッファが作り直されていないかテスト
+        net.train_epoch(data[:10])
+        actual = [net.X, net.H, net.Y, net.back_h, net.back_y, net.weight[0], net.weight[1]]
+        for expected, actual in zip(buffers, actual):
+            self.assertIs(expected, actual)
+
+        # コンテキスト層が隠れ層より大きい時はValueErrorを投げるかテスト
+        with self.assertRaises(ValueError):
+            rnn.Elman(1, 4, 3, 1)
+
+    def test_fit(self):
+        """
+        test method of fit
+        """
+        np.random.seed(seed=1)
+        data = rnn.init_data(3000)
+        weight1 = rnn.init_net(1, 3, 3, 1)
+        weight2 = [w.copy() for w in weight1]
+        context1 = np.random.rand(3) / 10
+
+        # 1epochずつ学習した結果と同じになるかテスト
+        context2 = rnn.fit(weight2, data, context1, num_learn=2)
+        for _ in range(2):
+            context1 = rnn.train_epoch(weight1, data, context1)
+        np.testing.assert_allclose(context1[:3], context2)
+        for expected, actual in zip(weight1, weight2):
+            np.testing.assert_allclose(expected, actual)
+
+        # 最後のepochの各ビットのエラー値を記録できるかテスト
+        recorder = rnn.RecordError(1)
+        rnn.fit(weight2, data[:30], context2, num_learn=2, callbacks=[recorder])
+        self.assertEqual(30, len(recorder.error))
+
+        # モジュールのNUM_CONTEXTと違う大きさのネットワークも学習できるかテスト
+        weight = rnn.init_net(1, 5, 5, 1)
+        context = rnn.fit(weight, data[:30], np.zeros(5), num_learn=2)
+        self.assertEqual((5,), context.shape)
+
+    def test_fit_ensemble(self):
+        """
+        test method of init_seeds and fit_ensemble
+        """
+        seeds = [1, 2, 3]
+        weight, data, context = rnn.init_seeds(seeds, 30, 1, 3, 3, 1)
+        self.assertEqual((3, 5, 3), weight[0].shape)
+        self.assertEqual((3, 4, 1), weight[1].shape)
+        self.assertEqual((3, 30), data.shape)
+        self.assertEqual((3, 3), context.shape)
+        recorder = rnn.RecordError(2, func=rnn.calc_error_ensemble)
+        context = rnn.fit_ensemble(weight, data, context, num_learn=3, callbacks=[recorder])
+        error = np.array(recorder.error)
+        self.assertEqual((30, 3), error.shape)
+
+        # シードごとにfit()で学習した結果と同じになるかテスト
+        for k, seed in enumerate(seeds):
+            np.random.seed(seed=seed)
+            data_k = rnn.init_data(30)
+            weight_k = rnn.init_net(1, 3, 3, 1)
+            context_k = np.random.rand(3) / 10
+            np.testing.assert_array_equal(data_k, data[k])
+            recorder_k = rnn.RecordError(2)
+            context_k = rnn.fit(weight_k, data_k, context_k, num_learn=3, callbacks=[recorder_k])
+            np.testing.assert_allclose(context_k, context[k])
+            np.testing.assert_allclose(recorder_k.error, error[:, k])
+            for expected, actual in zip(weight_k, weight):
+                np.testing.assert_allclose(expected, actual[k])
+
+        with self.assertRaises(ValueError):
+            rnn.init_seeds([], 30, 1, 3, 3, 1)
+
+    def test_profile_phases(self):
+        """
+        test method of Elman.train_epoch and ElmanEnsemble.train_epoch with prof
+        """
+        # 順伝播・エラー値・逆伝播・重みの修正がそれぞれサンプル数だけ計測されるかテスト
+        phases = ['backward', 'error', 'forward', 'update']
+        np.random.seed(seed=1)
+        data = rnn.init_data(30)
+        prof = profiler.Profiler(io.StringIO())
+        rnn.Elman(1, 3, 3, 1).train_epoch(data, prof=prof)
+        summary = prof.summary()
+        self.assertEqual(phases, sorted(summary))
+        for name in phases:
+            self.assertEqual(30, summary[name]['count'])
+
+        weight, data, context = rnn.init_seeds([1, 2], 30, 1, 3, 3, 1)
+        prof = profiler.Profiler(io.StringIO())
+        rnn.ElmanEnsemble(1, 3, 3, 1, weight, context=context).train_epoch(data, prof=prof)
+        summary = prof.summary()
+        self.assertEqual(phases, sorted(summary))
+        for name in phases:
+            self.assertEqual(30, summary[name]['count'])
+
+
+if __name__ == '__main__':
+    unittest.main()
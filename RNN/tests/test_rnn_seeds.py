@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import tempfile
+import unittest
+import numpy as np
+import rnn
+import rnn_seeds
+import checkpoint
+
+
+class test_rnn_seeds(unittest.TestCase):
+    def test_split_seeds(self):
+        """
+        test method of split_seeds
+        """
+        self.assertEqual([[1, 2, 3], [4, 5]], rnn_seeds.split_seeds([1, 2, 3, 4, 5], 2))
+        self.assertEqual([[1], [2]], rnn_seeds.split_seeds([1, 2], 4))
+        with self.assertRaises(ValueError):
+            rnn_seeds.split_seeds([1, 2], 0)
+
+    def test_iter_results(self):
+        """
+        test method of run_seeds, iter_results, save_result
+        """
+        seeds = [1, 2, 3]
+        results = list(rnn_seeds.iter_results(seeds, processes=2, len_data=30, num_learn=3))
+        self.assertEqual(seeds, sorted(result['seed'] for result in results))
+
+        # 並列に学習させた結果が、1シードずつrnn.fit()で学習させた結果と一致するかテスト
+        for result in results:
+            np.random.seed(seed=result['seed'])
+            data = rnn.init_data(30)
+            weight = rnn.init_net(1, 3, 3, 1)
+            context = np.random.rand(3) / 10
+            recorder = rnn.RecordError(2)
+            context = rnn.fit(weight, data, context, num_learn=3, callbacks=[recorder])
+            np.testing.assert_allclose(recorder.error, result['error'])
+            np.testing.assert_allclose(context, result['context'])
+            for expected, actual in zip(weight, result['weight']):
+                np.testing.assert_allclose(expected, actual)
+
+        # 全てのシードのエラー値を平均しているかテスト
+        errors = [result['error'] for result in results]
+        np.testing.assert_allclose(np.mean(errors, axis=0), rnn.average_error(errors))
+        with self.assertRaises(ValueError):
+            rnn.average_error([])
+
+        # 重みの保存のテスト
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model')
+            rnn_seeds.save_result(results[0], 3, path)
+            model = checkpoint.load_model(path)
+            self.assertEqual(results[0]['seed'], model['extra']['seed'])
+            for expected, actual in zip(results[0]['weight'], model['weight']):
+                np.testing.assert_array_equal(expected, actual)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,14 @@
 import math
 import numpy as np
-import matplotlib.pyplot as plt
 import os
+import sys
 import copy
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config
+import profiler
+
 # パスの設定
 DIR = os.getcwd()
 if (DIR.split('/')[-1] != 'SARSA'):
@@ -174,7 +179,7 @@ def init_map(row, col, start_pos, goal_pos):
         start_pos: リスト スタートの位置
         goal_pos: リスト ゴールの位置
     output:
-        ret_map: リスト 上記の0~3の整数が入ったリスト
+        ret_map: np.ndarray 上記の0~3の整数が入った配列(型はconfig.MAP_DTYPE)
     """
     WAY, START, GOAL, HOLL = (0, 1, 2, 3)
     # スタート地点のx、y
@@ -183,7 +188,7 @@ def init_map(row, col, start_pos, goal_pos):
     g_x, g_y = goal_pos
 
     # 最初は全て道として初期化
-    ret_map = np.zeros((row, col))
+    ret_map = np.zeros((row, col), dtype=config.MAP_DTYPE)
 
     # スタート地点とゴール地点の設定
     ret_map[s_x, s_y] = START
@@ -202,9 +207,9 @@ def init_qtable(row, col, ac_num=4):
         col: int 迷路の列方向の大きさ。
         ac_num: int エージェントのアクション数。初期値4
     output:
-        ret_q: np.ndarray Qテーブル
+        ret_q: np.ndarray Qテーブル(型はconfig.FLOAT_DTYPE)
     """
-    ret_q = np.random.rand(row, col, ac_num)
+    ret_q = np.random.rand(row, col, ac_num).astype(config.FLOAT_DTYPE, copy=False)
 
     return ret_q
 
@@ -253,6 +258,9 @@ def plot_result(row, col, log):
     output:
         なし
     """
+    # matplotlibは読み込みに時間がかかるので、プロットする時だけimportする
+    import matplotlib.pyplot as plt
+
     # グラフのタイトルを設定
     plt.title('Trajectory of Agent')
 
@@ -295,6 +303,7 @@ def plot_result(row, col, log):
         print("")
 
 if __name__ == '__main__':
+    PLOT = '--no-plot' not in sys.argv[1:]  # --no-plotを付けて実行するとプロットしない
     seed = 1                    # 乱数シード
     NUM_EPISODE = 10000 # 最大エピソード
     NUM_STEP = 1000             # 最大ステップ
@@ -309,6 +318,9 @@ if __name__ == '__main__':
     # 乱数シード設定
     np.random.seed(seed=seed)
 
+    # 環境変数ML_PROFILEが設定されていれば、処理ごとの時間をエピソードごとにJSONで書き出す
+    prof = profiler.get_profiler()
+
     # 迷路の初期化
     maze = init_map(ROW, COL, start_pos=START_POS, goal_pos=GOAL_POS)
     # Qテーブルの初期化
@@ -319,29 +331,44 @@ if __name__ == '__main__':
         # エージェントの初期化
         agent = Agent(start_pos=START_POS)
         # 現時刻の状態から現時刻の行動の決定
+        t0 = prof.start()
         agent.current_action = agent.decide_action(agent.current_pos, q_table, EPSILON)
+        prof.stop('action', t0)
         # 最大ステップ数に達するか、ゴールに到達するまでループ
         istep = 0
         while True:
             # 現時刻の行動から次時刻の位置を算出
+            t0 = prof.start()
             agent.move_agent(row=ROW, col=COL)
             # 現時刻の行動と状態(現時刻の位置)から報酬を算出
             reward = agent.cal_reward(maze, row=ROW, col=COL)
+            prof.stop('step', t0)
             # 次時刻の状態から次時刻の行動を決定
+            t0 = prof.start()
             agent.next_action = agent.decide_action(agent.next_pos, q_table, EPSILON)
+            prof.stop('action', t0)
             # 現時刻の状態で現時刻の行動を取った時のQ値を更新
+            t0 = prof.start()
             now_q = q_table[agent.current_pos[0]][agent.current_pos[1]][agent.current_action]
             now_x, now_y = agent.current_pos
             now_action = agent.current_action
             q_table[now_x, now_y, now_action] = update_q(q_table, agent, reward, ALPHA, GAMMA)
+            prof.stop('update', t0)
             # 状態を遷移させる
+            t0 = prof.start()
             agent.move_state(maze)
+            prof.stop('step', t0)
             istep += 1
             if (agent.current_pos == GOAL_POS) | (istep == NUM_STEP):
                 break
+        prof.emit(episode=iepisode, steps=istep)
 
     # 学習済みのQ値を外部ファイルに書き出し
+    t0 = prof.start()
     np.save(DIR+'/SARSA_table.npy', q_table)
+    prof.stop('io', t0)
+    prof.emit(episode=NUM_EPISODE)
+    prof.close()
 
     # 結果を描画するためにグリーディー(決定論的)に行動させる
     agent = Agent(START_POS)
@@ -359,5 +386,6 @@ if __name__ == '__main__':
     print()
     show_map(maze)
     
-    plot_result(ROW, COL, np.array(agent_log))
+    if PLOT:
+        plot_result(ROW, COL, np.array(agent_log))
               
\ No newline at end of file
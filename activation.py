@@ -0,0 +1,135 @@
+import math
+import numpy as np
+
+
+# 型ごとのnp.exp()がオーバーフローしない入力の上限(毎回np.finfo()を呼ばないように覚えておく)
+_EXP_LIMITS = {}
+
+def _exp_limit(dtype):
+    """
+    np.exp()がオーバーフローしない入力の上限を返す
+    input:
+        dtype: 計算に使う型(浮動小数点以外はfloat64とみなす)
+    output:
+        limit: float
+    """
+    limit = _EXP_LIMITS.get(dtype)
+    if (limit is None):
+        float_dtype = dtype if np.issubdtype(dtype, np.floating) else np.float64
+        limit = float(np.log(np.finfo(float_dtype).max)) - 1.0
+        _EXP_LIMITS[dtype] = limit
+    return limit
+
+# float64のnp.exp()・math.exp()がオーバーフローしない入力の上限
+_FLOAT64_LIMIT = _exp_limit(np.dtype(np.float64))
+
+def sigmoid(x, beta=0.8, out=None):
+    """
+    シグモイド関数 1 / (1 + exp(-beta * x)) を配列全体にまとめて適用する。
+    exp()の入力をオーバーフローしない範囲に収めてから計算するため、
+    大きな負の入力でも警告を出さずに0に近い値を返す。
+    input:
+        x: float or np.array 入力値
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+        out: np.array 結果を書き込む配列(xと同じ形)。xを指定すればその場で計算する
+    output:
+        y: float or np.array 出力値(outを指定した時はout)
+    """
+    # 1ユニットずつ計算するループからの呼び出しは、numpyを通さずにPythonのfloatで計算する
+    # (np.float64はfloatのサブクラスなのでここに入る。np.float32などは型を保つため下で計算する)
+    if ((out is None) and (isinstance(x, float) or (type(x) == int))):
+        z = -beta * x
+        if (z > _FLOAT64_LIMIT):
+            z = _FLOAT64_LIMIT
+        elif (z < -_FLOAT64_LIMIT):
+            z = -_FLOAT64_LIMIT
+        return 1.0 / (1.0 + math.exp(z))
+    z = np.multiply(x, -beta, out=out)
+    if ((type(z) != np.ndarray) or (z.ndim == 0)):
+        limit = _exp_limit(np.result_type(z))
+        return 1.0 / (1.0 + np.exp(np.clip(z, -limit, limit)))
+    limit = _exp_limit(z.dtype)
+    # np.clip()と同じ結果だが、小さい配列ではこの方が速い
+    np.maximum(z, -limit, out=z)
+    np.minimum(z, limit, out=z)
+    np.exp(z, out=z)
+    z += 1.0
+    np.reciprocal(z, out=z)
+    return z
+
+def sigmoid_deriv(y, beta=0.8):
+    """
+    シグモイド関数の微分を、出力値yから計算する
+    input:
+        y: float or np.array sigmoid()の出力値
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+    output:
+        dy: float or np.array beta * y * (1 - y)
+    """
+    return beta * (1.0 - y) * y
+
+def tanh(x, beta=0.8):
+    """
+    双曲線正接関数 tanh(beta * x) を配列全体にまとめて適用する
+    input:
+        x: float or np.array 入力値
+        beta: float 入力に掛ける定数(初期値0.8)
+    output:
+        y: float or np.array 出力値(-1~1)
+    """
+    return np.tanh(np.multiply(x, beta))
+
+def tanh_deriv(y, beta=0.8):
+    """
+    tanh()の微分を、出力値yから計算する
+    input:
+        y: float or np.array tanh()の出力値
+        beta: float 入力に掛ける定数(初期値0.8)
+    output:
+        dy: float or np.array beta * (1 - y^2)
+    """
+    return beta * (1.0 - y * y)
+
+def relu(x, beta=0.8):
+    """
+    ランプ関数 max(0, beta * x) を配列全体にまとめて適用する
+    input:
+        x: float or np.array 入力値
+        beta: float 入力に掛ける定数(初期値0.8)
+    output:
+        y: float or np.array 出力値
+    """
+    return np.maximum(np.multiply(x, beta), 0.0)
+
+def relu_deriv(y, beta=0.8):
+    """
+    relu()の微分を、出力値yから計算する
+    input:
+        y: float or np.array relu()の出力値
+        beta: float 入力に掛ける定数(初期値0.8)
+    output:
+        dy: float or np.array yが正ならbeta、それ以外は0(型はyと同じ)
+    """
+    y = np.asarray(y)
+    # bool配列にfloatを掛けるとfloat64になるので、yの型で計算する
+    dtype = y.dtype if np.issubdtype(y.dtype, np.floating) else np.dtype(np.float64)
+    return (y > 0.0).astype(dtype) * dtype.type(beta)
+
+# 活性化関数の名前と、(関数, 出力値から計算する微分)の組
+ACTIVATIONS = {
+    'sigmoid': (sigmoid, sigmoid_deriv),
+    'tanh': (tanh, tanh_deriv),
+    'relu': (relu, relu_deriv),
+}
+
+def get_activation(name):
+    """
+    名前から活性化関数とその微分を取り出す
+    input:
+        name: str 'sigmoid', 'tanh', 'relu'のいずれか
+    output:
+        (func, deriv): 活性化関数と、出力値から微分を計算する関数
+    """
+    if (name not in ACTIVATIONS):
+        raise ValueError
+    return ACTIVATIONS[name]
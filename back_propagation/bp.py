@@ -1,12 +1,30 @@
+import json
 import math
+import itertools
 import numpy as np
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import activation
+import callback
+import checkpoint
+import config
+import params
+import profiler
 
 # パスの設定
 DIR = os.getcwd()
 if (DIR.split('/')[-1] != 'back_propagation'):
     DIR = DIR + '/back_propagation'
 
+# 各層のユニット数の初期値
+# __main__として実行されない場合(他のモジュールからimportされた場合)にも参照できるように定義しておく
+NUM_INPUT = 2
+NUM_HIDDEN = 3
+NUM_OUTPUT = 1
+
 def read_data(path='/data.dat'):
     """
     入力データと教師データが格納されている「data.dat」を開き、
@@ -26,6 +44,85 @@ def read_data(path='/data.dat'):
         raise OSError
     return data
 
+def read_data_meta(path='data.dat'):
+    """
+    入出力データのファイルと同じ名前の「.json」から、入力層・出力層のユニット数を読み込む
+        data.jsonの書式
+            {"num_input": 2, "num_output": 1}
+    input:
+        path: str 入出力データのファイル(DIRからの相対パスか絶対パス)
+    output:
+        meta: 辞書 'num_input'・'num_output'(.jsonが無ければNone)
+    """
+    meta_path = os.path.splitext(os.path.join(DIR, path))[0] + '.json'
+    if (not os.path.exists(meta_path)):
+        return None
+    with open(meta_path, 'r') as f:
+        return json.load(f)
+
+def convert_data(src='data.dat', dst='data.npy', chunk_size=65536):
+    """
+    テキスト形式の入出力データを、メモリマップで開けるバイナリ形式(.npy)に変換する。
+    テキストはchunk_size行ずつ読み込むため、ファイル全体をメモリに載せずに変換できる。
+    変換元に「.json」(read_data_meta())があれば、変換先の「.json」にも書き出す。
+    input:
+        src: str 変換元のテキストファイル(DIRからの相対パスか絶対パス)
+        dst: str 変換先の.npyファイル(DIRからの相対パスか絶対パス)
+        chunk_size: int 1度に読み込む行数
+    output:
+        なし
+    """
+    meta = read_data_meta(src)
+    src = os.path.join(DIR, src)
+    dst = os.path.join(DIR, dst)
+
+    # 1回目の読み込みで行数と列数を数える
+    num_row = 0
+    num_col = None
+    with open(src, 'r') as f:
+        for line in f:
+            if (line.strip() == ''):
+                continue
+            if (num_col is None):
+                num_col = len(line.split())
+            num_row += 1
+    if (num_col is None):
+        raise ValueError
+
+    # 2回目の読み込みでchunk_size行ずつ.npyファイルに書き込む
+    out = np.lib.format.open_memmap(dst, mode='w+', dtype=np.float64, shape=(num_row, num_col))
+    irow = 0
+    with open(src, 'r') as f:
+        lines = (line for line in f if line.strip() != '')
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if (len(chunk) == 0):
+                break
+            out[irow:irow+len(chunk)] = np.loadtxt(chunk, delimiter=' ', ndmin=2)
+            irow += len(chunk)
+    out.flush()
+    del out
+
+    if (meta is not None):
+        with open(os.path.splitext(dst)[0] + '.json', mode='w') as f:
+            json.dump(meta, f, indent=2)
+
+def read_data_mmap(path='data.npy', text_path='/data.dat'):
+    """
+    convert_data()で変換したバイナリ形式の入出力データをメモリマップで開く。
+    ファイル全体は読み込まず、アクセスした部分だけがディスクから読まれる。
+    バイナリ形式のファイルが無ければ、read_data()でテキスト形式のファイルを読み込む。
+    input:
+        path: str .npyファイル(DIRからの相対パスか絶対パス)
+        text_path: str バイナリ形式が無かった時に読み込むテキストファイル
+    output:
+        data: np.memmap(テキストを読み込んだ場合はnp.array)
+    """
+    npy_path = os.path.join(DIR, path)
+    if (not os.path.exists(npy_path)):
+        return read_data(text_path)
+    return np.load(npy_path, mmap_mode='r')
+
 def init_net(num_input, num_hidden, num_output, seed=1):
     """
     ニューラルネットワークの重みの初期化
@@ -36,7 +133,7 @@ def init_net(num_input, num_hidden, num_output, seed=1):
         num_hidden: int 出力層のユニット数
         num_output: int 出力層のユニット数
     output:
-        network: [np.aray, np.array] 入力層~隠れ層、隠れ層~出力層それぞれの重み
+        network: [np.aray, np.array] 入力層~隠れ層、隠れ層~出力層それぞれの重み(型はconfig.FLOAT_DTYPE)
     """
     # 引数がint以外だったらValueErrorを投げる
     if ((type(num_input) != int) or (type(num_hidden) != int) or (type(num_output) != int)):
@@ -48,7 +145,7 @@ def init_net(num_input, num_hidden, num_output, seed=1):
     # 入力層~隠れ層の重みを(-0.5~0.5)の範囲で初期化
     weight1 = np.random.rand(num_input+1, num_hidden) - 0.5
     weight2 = np.random.rand(num_hidden+1, num_output) - 0.5
-    return [weight1, weight2]
+    return [weight1.astype(config.FLOAT_DTYPE, copy=False), weight2.astype(config.FLOAT_DTYPE, copy=False)]
 
 def feedforward(weight, data, isample, beta=0.8):
     """
@@ -91,7 +188,7 @@ def feedforward(weight, data, isample, beta=0.8):
         for j in range(NUM_INPUT+1):
             net_input = net_input + (weight[0][j][i] * X[j])
         # 加算された値をシグモイド関数に適用
-        H.append((1.0 / (1.0 + np.exp(net_input * -beta))))
+        H.append(activation.sigmoid(net_input, beta))
     
     H.append(1.0)
     # 出力層のユニット数だけ繰り返し
@@ -99,7 +196,7 @@ def feedforward(weight, data, isample, beta=0.8):
         net_input = 0
         for j in range(NUM_HIDDEN+1):
             net_input = net_input + (weight[1][j][i] * H[j])
-        Y.append((1.0 / (1.0 + np.exp(net_input * -beta))))
+        Y.append(activation.sigmoid(net_input, beta))
     return [X, H, Y]
 
 def backward(weight, data, isample, out, beta=0.8):
@@ -150,6 +247,672 @@ def modify_weights(weight, out, back, epsilon=0.05):
         for j in range(NUM_OUTPUT):
             weight[1][i][j] = weight[1][i][j] + epsilon * out[1][i] * back[1][j]
 
+def feedforward_vec(weight, data, isample, beta=0.8):
+    """
+    feedforward()と同じ計算を、各層1回の行列積で行う。
+    ユニット数はグローバル変数ではなく重みの形から求める。
+    input:
+        weight: リスト [np.array, np.array]
+        data: np.array 入力値と出力値のデータが入ったnp.array
+        isample: int サンプル番号
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+    output:
+        result: [X[num_input+1], H[num_hidden+1], Y[num_output]] それぞれnp.array
+            X : 入力層の出力値(最後の要素は閾値用の1.0)
+            H : 隠れ層の出力値(最後の要素は閾値用の1.0)
+            Y : 出力層の出力値
+    """
+    # 引数のweightがリスト、isampleがint以外だったらValueErrorを投げる
+    if ((type(weight) != list) or (type(data) != np.ndarray) or (type(isample) != int)):
+        raise ValueError
+
+    num_input = weight[0].shape[0] - 1
+
+    # 入力層の出力は読み込んだデータに閾値用の1.0を付け加えたもの(型は重みに合わせる)
+    X = np.empty(num_input+1, dtype=weight[0].dtype)
+    X[:-1] = data[isample, :num_input]
+    X[-1] = 1.0
+    # 隠れ層・出力層はそれぞれ行列積1回で総和を求め、シグモイド関数に適用
+    # (返す配列以外の一時配列を作らないよう、行列積とシグモイド関数は結果の配列に直接書き込む)
+    H = np.empty(weight[0].shape[1]+1, dtype=weight[0].dtype)
+    h = H[:-1]
+    np.dot(X, weight[0], out=h)
+    activation.sigmoid(h, beta, out=h)
+    H[-1] = 1.0
+    Y = np.dot(H, weight[1])
+    activation.sigmoid(Y, beta, out=Y)
+    return [X, H, Y]
+
+def backward_vec(weight, data, isample, out, beta=0.8):
+    """
+    backward()と同じ計算を、各層1回のベクトル演算で行う。
+    input:
+        weight: リスト [np.array, np.array]
+        data: np.array 入力値と出力値のデータが入ったnp.array
+        isample: int サンプル番号
+        out: リスト feedforward_vec()から返ってきたリスト
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+    output:
+        back: [H[num_hidden], Y[num_output]] それぞれnp.array
+    """
+    if ((type(weight) != list) or (type(data) != np.ndarray) or (type(isample) != int) or (type(out) != list)):
+        raise ValueError
+
+    num_input = weight[0].shape[0] - 1
+    num_output = weight[1].shape[1]
+
+    # 出力層から逆伝播させる(Networkクラスと同じ順番でその場で掛け合わせ、一時配列を減らす)
+    y = out[2]
+    Y = np.subtract(data[isample, num_input:num_input+num_output], y, dtype=y.dtype)
+    Y *= beta
+    Y *= y
+    Y *= 1.0 - y
+    # 隠れ層から逆伝播させる(閾値用のユニットは除く)
+    h = out[1][:-1]
+    H = np.dot(weight[1][:-1], Y)
+    H *= beta
+    H *= h
+    H *= 1.0 - h
+    return [H, Y]
+
+def modify_weights_vec(weight, out, back, epsilon=0.05):
+    """
+    modify_weights()と同じ修正を、各層1回の外積で行う。
+    重みはその場で書き換えられる。
+    input:
+        weight: リスト 各層の重み(np.array)が格納されたリスト
+        out: リスト feedforward_vec()から返ってきたリスト
+        back: リスト backward_vec()から返ってきたリスト
+        epsilon: float 学習率。初期値0.05
+    output:
+        なし
+    """
+    # 入力された型が正常か判定
+    if ((type(weight) != list) or (type(back) != list) or (type(epsilon) != float)):
+        raise ValueError
+    for i in range(2):
+        delta = np.outer(out[i], back[i])
+        delta *= epsilon
+        weight[i] += delta
+
+def init_deep_net(sizes, seed=1):
+    """
+    任意の層数のニューラルネットワークの重みの初期化
+    各層のユニット数のリストが入力されると、初期化された重み(numpy配列)のリストを返す。
+    init_deep_net([a, b, c])はinit_net(a, b, c)と同じ重みを返す。
+    input:
+        sizes: リスト [入力層, 隠れ層1, ..., 隠れ層n, 出力層]のユニット数(intを2つ以上)
+        seed: int 乱数シード
+    output:
+        network: [np.array, ...] 隣り合う層の間の重み(閾値用に行数が1つ多い、型はconfig.FLOAT_DTYPE)
+    """
+    # 引数がintを2つ以上含むリストでなければValueErrorを投げる
+    if ((type(sizes) != list) or (len(sizes) < 2) or any(type(size) != int for size in sizes)):
+        raise ValueError
+
+    # 乱数シードの値を設定する
+    np.random.seed(seed=seed)
+
+    # 各層の重みを(-0.5~0.5)の範囲で初期化
+    return [(np.random.rand(sizes[i]+1, sizes[i+1]) - 0.5).astype(config.FLOAT_DTYPE, copy=False)
+            for i in range(len(sizes)-1)]
+
+def _get_func(act):
+    """
+    活性化関数の名前か関数から、順伝播に使う関数を取り出す
+    input:
+        act: str activation.ACTIVATIONSの名前、またはfunc(x, beta)の形で呼び出せる関数
+    output:
+        func: 活性化関数
+    """
+    if callable(act):
+        return act
+    return activation.get_activation(act)[0]
+
+def feedforward_batch(weight, x, beta=0.8, act='sigmoid'):
+    """
+    複数サンプルをまとめて順方向に伝播させる。
+    重みの数だけ層を持つネットワーク(init_deep_net())にも使える。
+    input:
+        weight: リスト [np.array, ...] 各層の重み
+        x: np.array (N, num_input) の入力データ
+        beta: float 活性化関数に使われる定数(初期値0.8)
+        act: str 活性化関数の名前(初期値'sigmoid')、またはfunc(x, beta)の形で呼び出せる関数
+    output:
+        result: [X[N, num_input+1], H1[N, num_hidden1+1], ..., Y[N, num_output]]
+            各行がサンプル、出力層以外の最後の列は閾値用の1.0
+    """
+    if ((type(weight) != list) or (type(x) != np.ndarray)):
+        raise ValueError
+
+    func = _get_func(act)
+    # 重みと違う型の入力で計算全体の型が変わらないように、入力を重みの型に合わせる
+    x = x.astype(weight[0].dtype, copy=False)
+    ones = np.ones((x.shape[0], 1), dtype=x.dtype)
+    result = [np.hstack([x, ones])]
+    # 入力層から出力層の1つ手前の層まで、閾値用の1.0を付けて伝播させる
+    for w in weight[:-1]:
+        result.append(np.hstack([func(np.dot(result[-1], w), beta), ones]))
+    result.append(func(np.dot(result[-1], weight[-1]), beta))
+    return result
+
+def backward_batch(weight, t, out, beta=0.8, act='sigmoid'):
+    """
+    複数サンプルをまとめて逆方向に伝播させる。
+    重みの数だけ層を持つネットワーク(init_deep_net())にも使える。
+    input:
+        weight: リスト [np.array, ...] 各層の重み
+        t: np.array (N, num_output) の教師データ
+        out: リスト feedforward_batch()から返ってきたリスト
+        beta: float 活性化関数に使われる定数(初期値0.8)
+        act: str 順伝播に使った活性化関数の名前(初期値'sigmoid')
+    output:
+        back: [H1[N, num_hidden1], ..., Y[N, num_output]] 隠れ層・出力層それぞれの逆伝播の値
+    """
+    if ((type(weight) != list) or (type(t) != np.ndarray) or (type(out) != list)):
+        raise ValueError
+
+    deriv = activation.get_activation(act)[1]
+    t = t.astype(out[-1].dtype, copy=False)
+    # 出力層から逆伝播させる
+    back = [(t - out[-1]) * deriv(out[-1], beta)]
+    # 出力層側の隠れ層から順に逆伝播させる(閾値用のユニットは除く)
+    for i in range(len(weight)-1, 0, -1):
+        back.append(np.dot(back[-1], weight[i][:-1].T) * deriv(out[i][:, :-1], beta))
+    back.reverse()
+    return back
+
+def modify_weights_batch(weight, out, back, epsilon=0.05, optimizer=None, params=None):
+    """
+    バッチ内の全サンプルの修正量を足し合わせ、各層1回で重みを修正する。
+    サンプル数1のときはmodify_weights()と同じ修正になる。
+    input:
+        weight: リスト 各層の重み(np.array)が格納されたリスト
+        out: リスト feedforward_batch()から返ってきたリスト
+        back: リスト backward_batch()から返ってきたリスト
+        epsilon: float 学習率。初期値0.05
+        optimizer: optimizer.pyのクラスのオブジェクト。
+            指定されたときはepsilonは使わず、optimizerで重みを修正する
+        params: params.FlatParams weightがparams.weightの時に指定すると、
+            修正量をparams.gradに書き込み、1本の配列に対して1回で修正する
+    output:
+        なし
+    """
+    if ((type(weight) != list) or (type(back) != list) or (type(epsilon) != float)):
+        raise ValueError
+    if (params is not None):
+        for i in range(len(weight)):
+            np.dot(out[i].T, back[i], out=params.grad_views[i])
+        if (optimizer is not None):
+            optimizer.update([params.data], [params.grad])
+        else:
+            params.grad *= epsilon
+            params.data += params.grad
+        return
+    if (optimizer is not None):
+        optimizer.update(weight, [np.dot(out[i].T, back[i]) for i in range(len(weight))])
+        return
+    for i in range(len(weight)):
+        weight[i] += epsilon * np.dot(out[i].T, back[i])
+
+def train_batch(weight, data, num_input, batch_size=1, epsilon=0.05, beta=0.8, optimizer=None, act='sigmoid', params=None,
+                prof=profiler.NULL, callbacks=None):
+    """
+    dataを先頭からbatch_size個ずつ区切り、バッチごとに1回重みを修正する(1epoch分)。
+    batch_size=1ならサンプルごとに修正する今までの学習、
+    batch_size=len(data)なら全サンプルで1回だけ修正する学習になる。
+    input:
+        weight: リスト 各層の重み(np.array)が格納されたリスト
+        data: np.array 入力値と出力値のデータが入ったnp.array
+        num_input: int 入力層のユニット数
+        batch_size: int 1回の修正に使うサンプル数(初期値1)
+        epsilon: float 学習率。初期値0.05
+        beta: float 活性化関数に使われる定数(初期値0.8)
+        optimizer: optimizer.pyのクラスのオブジェクト(Noneなら学習率epsilonで修正する)
+        act: str 活性化関数の名前(初期値'sigmoid')
+        params: params.FlatParams weightがparams.weightの時に指定すると、1本の配列で修正する
+        prof: profiler.Profiler 処理ごとの時間を計測する時に指定する(初期値は計測しないprofiler.NULL)
+        callbacks: リスト callback.Callbackのリスト。on_sample()をバッチごとに呼び出す
+    output:
+        error: float 修正前の出力から計算したエラー値の総和
+    """
+    if ((type(batch_size) != int) or (batch_size < 1)):
+        raise ValueError
+
+    # on_sample()を上書きしたコールバックがある時だけ呼び出す
+    callbacks = callback.make_callbacks(callbacks)
+    on_sample = callbacks.on_sample if ((callbacks is not None) and callbacks.sample) else None
+
+    error = 0.0
+    for start in range(0, data.shape[0], batch_size):
+        batch = data[start:start+batch_size].astype(weight[0].dtype, copy=False)
+        t0 = prof.start()
+        out = feedforward_batch(weight, batch[:, :num_input], beta=beta, act=act)
+        prof.stop('forward', t0)
+        t0 = prof.start()
+        t = batch[:, num_input:]
+        batch_error = np.sum((t - out[-1]) ** 2) / 2.0
+        error += batch_error
+        prof.stop('error', t0)
+        if (on_sample is not None):
+            on_sample(start, {'batch': batch, 'out': out, 'error': batch_error, 'weight': weight})
+        t0 = prof.start()
+        back = backward_batch(weight, t, out, beta=beta, act=act)
+        prof.stop('backward', t0)
+        t0 = prof.start()
+        modify_weights_batch(weight, out, back, epsilon=epsilon, optimizer=optimizer, params=params)
+        prof.stop('update', t0)
+    return error
+
+def init_ensemble(sizes, seeds):
+    """
+    シードの異なる複数のネットワークの重みを初期化し、層ごとに1つの配列にまとめる。
+    k番目のネットワークの重みはinit_deep_net(sizes, seed=seeds[k])と同じになる。
+    input:
+        sizes: リスト [入力層, 隠れ層1, ..., 出力層]のユニット数
+        seeds: リスト 各ネットワークの乱数シード
+    output:
+        network: [np.array(K, num_input+1, num_hidden1), ...] K個のネットワークの重みを重ねたもの
+    """
+    if ((type(seeds) != list) or (len(seeds) == 0)):
+        raise ValueError
+    weights = [init_deep_net(sizes, seed=seed) for seed in seeds]
+    return [np.stack([weight[i] for weight in weights]) for i in range(len(sizes)-1)]
+
+def feedforward_ensemble(weight, x, beta=0.8):
+    """
+    K個のネットワークに同じ入力をまとめて順方向に伝播させる。
+    各層の計算はK個分まとめた1回の行列積(np.matmul)で行う。
+    input:
+        weight: リスト init_ensemble()が返した重み
+        x: np.array (N, num_input) の入力データ
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+    output:
+        result: [X[K, N, num_input+1], H1[K, N, num_hidden1+1], ..., Y[K, N, num_output]]
+    """
+    if ((type(weight) != list) or (type(x) != np.ndarray)):
+        raise ValueError
+
+    num_net = weight[0].shape[0]
+    x = x.astype(weight[0].dtype, copy=False)
+    ones = np.ones((num_net, x.shape[0], 1), dtype=x.dtype)
+    result = [np.concatenate([np.broadcast_to(x, (num_net,) + x.shape), ones], axis=2)]
+    for w in weight[:-1]:
+        result.append(np.concatenate([activation.sigmoid(np.matmul(result[-1], w), beta), ones], axis=2))
+    result.append(activation.sigmoid(np.matmul(result[-1], weight[-1]), beta))
+    return result
+
+def backward_ensemble(weight, t, out, beta=0.8):
+    """
+    K個のネットワークをまとめて逆方向に伝播させる。
+    input:
+        weight: リスト init_ensemble()が返した重み
+        t: np.array (N, num_output) の教師データ
+        out: リスト feedforward_ensemble()から返ってきたリスト
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+    output:
+        back: [H1[K, N, num_hidden1], ..., Y[K, N, num_output]]
+    """
+    if ((type(weight) != list) or (type(t) != np.ndarray) or (type(out) != list)):
+        raise ValueError
+
+    t = t.astype(out[-1].dtype, copy=False)
+    back = [(t - out[-1]) * activation.sigmoid_deriv(out[-1], beta)]
+    for i in range(len(weight)-1, 0, -1):
+        h = out[i][:, :, :-1]
+        back.append(np.matmul(back[-1], weight[i][:, :-1].transpose(0, 2, 1)) * activation.sigmoid_deriv(h, beta))
+    back.reverse()
+    return back
+
+def modify_weights_ensemble(weight, out, back, epsilon=0.05):
+    """
+    K個のネットワークの重みを、各層1回の行列積でまとめて修正する
+    input:
+        weight: リスト init_ensemble()が返した重み
+        out: リスト feedforward_ensemble()から返ってきたリスト
+        back: リスト backward_ensemble()から返ってきたリスト
+        epsilon: float 学習率。初期値0.05
+    output:
+        なし
+    """
+    if ((type(weight) != list) or (type(back) != list) or (type(epsilon) != float)):
+        raise ValueError
+    for i in range(len(weight)):
+        weight[i] += epsilon * np.matmul(out[i].transpose(0, 2, 1), back[i])
+
+def train_ensemble(weight, data, num_input, batch_size=1, epsilon=0.05, beta=0.8):
+    """
+    K個のネットワークを同時に1epoch分学習させる。
+    それぞれのネットワークはtrain_batch()で個別に学習させた時と同じように更新される。
+    input:
+        weight: リスト init_ensemble()が返した重み
+        data: np.array 入力値と出力値のデータが入ったnp.array
+        num_input: int 入力層のユニット数
+        batch_size: int 1回の重みの修正に使うサンプル数(初期値1)
+        epsilon: float 学習率。初期値0.05
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+    output:
+        error: np.array (K,) ネットワークごとの、修正前の出力から計算したエラー値の総和
+    """
+    if ((type(batch_size) != int) or (batch_size < 1)):
+        raise ValueError
+
+    error = np.zeros(weight[0].shape[0])
+    for start in range(0, data.shape[0], batch_size):
+        batch = data[start:start+batch_size].astype(weight[0].dtype, copy=False)
+        out = feedforward_ensemble(weight, batch[:, :num_input], beta=beta)
+        t = batch[:, num_input:]
+        error += np.sum((t - out[-1]) ** 2, axis=(1, 2)) / 2.0
+        back = backward_ensemble(weight, t, out, beta=beta)
+        modify_weights_ensemble(weight, out, back, epsilon=epsilon)
+    return error
+
+def evaluate(weight, data, beta=0.8, act='sigmoid'):
+    """
+    全サンプルのエラー値を1回の順伝播でまとめて計算する。重みは修正しない。
+    input:
+        weight: リスト 各層の重み(np.array)が格納されたリスト
+        data: np.array 入力値と出力値のデータが入ったnp.array
+        beta: float 活性化関数に使われる定数(初期値0.8)
+        act: str 活性化関数の名前、またはfunc(x, beta)の形で呼び出せる関数
+    output:
+        errors: np.array (N,) サンプルごとのエラー値(calc_error()と同じ定義)
+        total: float エラー値の総和
+    """
+    if ((type(weight) != list) or (not isinstance(data, np.ndarray))):
+        raise ValueError
+
+    num_input = weight[0].shape[0] - 1
+    out = feedforward_batch(weight, np.asarray(data[:, :num_input]), beta=beta, act=act)
+    errors = np.sum((data[:, num_input:] - out[-1]) ** 2, axis=1) / 2.0
+    return errors, float(np.sum(errors))
+
+def predict(model, x, act='sigmoid'):
+    """
+    学習済みのネットワークに入力だけを与え、出力層の出力値を返す(推論)
+    input:
+        model: リスト 各層の重み、またはcheckpoint.load_model()が返した辞書
+        x: np.array (N, num_input) の入力データ(1サンプルなら (num_input,) でも良い)
+        act: str 活性化関数の名前、またはfunc(x, beta)の形で呼び出せる関数
+    output:
+        y: np.array (N, num_output) の出力値((num_input,) を渡した時は (num_output,))
+    """
+    beta = 0.8
+    weight = model
+    if (type(model) == dict):
+        weight = model['weight']
+        beta = model['beta']
+    x = np.asarray(x)
+    if (x.ndim == 1):
+        return feedforward_batch(weight, x[np.newaxis, :], beta=beta, act=act)[-1][0]
+    return feedforward_batch(weight, x, beta=beta, act=act)[-1]
+
+class EarlyStopping():
+    """
+    evaluate()で計算したエラー値をもとに、学習を止めるかどうかを判定するクラス。
+    interval epochごとに全サンプルのエラー値を計算し、
+    threshold未満になるか、patience回続けて最小値が更新されなければ学習を止める。
+    """
+    def __init__(self, threshold=0.001, patience=None, interval=1):
+        """
+        EarlyStoppingクラスのコンストラクタ
+        input:
+            threshold: float エラー値の総和がこの値未満になったら収束とみなす
+            patience: int 最小値が更新されない評価がこの回数続いたら止める(Noneなら止めない)
+            interval: int 何epochごとに評価するか
+        """
+        if ((type(interval) != int) or (interval < 1)):
+            raise ValueError
+        self.threshold = threshold
+        self.patience = patience
+        self.interval = interval
+        self.best_error = np.inf      # これまでの評価で最小のエラー値
+        self.last_error = None        # 最後に評価した時のエラー値
+        self.wait = 0                 # 最小値が更新されなかった評価の回数
+        self.converged = False        # thresholdを下回って止まったかどうか
+        self.stop_epoch = None        # 学習を止めたepoch
+
+    def check(self, ilearn, weight, data, beta=0.8, act='sigmoid'):
+        """
+        ilearn epoch目の学習が終わった後に呼び出し、学習を止めるかどうかを返す
+        input:
+            ilearn: int 学習の繰り返し回数
+            weight: リスト 各層の重み(np.array)が格納されたリスト
+            data: np.array 入力値と出力値のデータが入ったnp.array
+            beta: float 活性化関数に使われる定数(初期値0.8)
+            act: str 活性化関数の名前(学習に使ったものと同じにする。初期値'sigmoid')
+        output:
+            stop: bool 学習を止めるならTrue
+        """
+        if ((ilearn + 1) % self.interval != 0):
+            return False
+
+        _, self.last_error = evaluate(weight, data, beta=beta, act=act)
+        if (self.last_error < self.threshold):
+            self.converged = True
+            self.stop_epoch = ilearn
+            return True
+
+        if (self.last_error < self.best_error):
+            self.best_error = self.last_error
+            self.wait = 0
+        else:
+            self.wait += 1
+            if ((self.patience is not None) and (self.wait >= self.patience)):
+                self.stop_epoch = ilearn
+                return True
+        return False
+
+def fit(weight, data, num_input, num_learn=50000, batch_size=1, epsilon=0.05, beta=0.8, optimizer=None, act='sigmoid',
+        early_stopping=None, callbacks=None, prof=profiler.NULL, params=None):
+    """
+    train_batch()をnum_learn epoch繰り返して学習する。
+    各epochの後にearly_stoppingで全サンプルのエラー値を評価し、収束したら止める。
+    コールバックには、logsとして以下の値を渡す。
+        'error': float そのepochの修正前の出力から計算したエラー値の総和(on_epoch_end・on_converge)
+        'eval_error': float 学習後の重みで評価したエラー値(評価しなかったepochはNone)
+        'weight': リスト 各層の重み
+        'params': params.FlatParams 重みを1本に並べたもの(指定しなければNone)
+        'data': np.array 学習に使うデータ
+    input:
+        weight: リスト 各層の重み(np.array)が格納されたリスト
+        data: np.array 入力値と出力値のデータが入ったnp.array
+        num_input: int 入力層のユニット数
+        num_learn: int 学習の繰り返し回数の上限
+        batch_size: int 1回の修正に使うサンプル数(初期値1)
+        epsilon: float 学習率。初期値0.05
+        beta: float 活性化関数に使われる定数(初期値0.8)
+        optimizer: optimizer.pyのクラスのオブジェクト(Noneなら学習率epsilonで修正する)
+        act: str 活性化関数の名前(初期値'sigmoid')
+        early_stopping: EarlyStopping 収束の判定に使う(NoneならEarlyStopping()を使う)
+        callbacks: リスト callback.Callbackのリスト
+        prof: profiler.Profiler 処理ごとの時間を計測する時に指定する
+        params: params.FlatParams weightがparams.weightの時に指定すると、1本の配列で修正する
+    output:
+        ilearn: int 最後に学習したepoch
+    """
+    if (early_stopping is None):
+        early_stopping = EarlyStopping()
+    callbacks = callback.make_callbacks(callbacks)
+
+    # 3層・シグモイド関数でサンプルごとに修正する時は、バッファを確保済みのNetworkで学習する
+    # (on_sample()のコールバックや処理ごとの時間の計測が必要な時はtrain_batch()を使う)
+    net = None
+    if ((batch_size == 1) and (optimizer is None) and (act == 'sigmoid') and (len(weight) == 2)
+            and (weight[0].ndim == 2) and (not prof.enabled) and ((callbacks is None) or (not callbacks.sample))):
+        net = Network(num_input, weight[0].shape[1], weight[1].shape[1], beta=beta, weight=weight)
+
+    logs = {'error': None, 'eval_error': None, 'weight': weight, 'params': params, 'data': data}
+    for ilearn in range(num_learn):
+        if (callbacks is not None):
+            callbacks.on_epoch_start(ilearn, logs)
+
+        if (net is not None):
+            logs['error'] = net.train_epoch(data, epsilon=epsilon)
+        else:
+            logs['error'] = train_batch(weight, data, num_input, batch_size=batch_size, epsilon=epsilon, beta=beta,
+                                        optimizer=optimizer, act=act, params=params, prof=prof,
+                                        callbacks=callbacks)
+
+        # 学習後の重みで全サンプルのエラー値を計算し、収束していれば停止
+        t0 = prof.start()
+        stop = early_stopping.check(ilearn, weight, data, beta=beta, act=act)
+        prof.stop('error', t0)
+        logs['eval_error'] = early_stopping.last_error if ((ilearn + 1) % early_stopping.interval == 0) else None
+
+        if (callbacks is not None):
+            if callbacks.on_epoch_end(ilearn, logs):
+                stop = True
+            if early_stopping.converged:
+                callbacks.on_converge(ilearn, logs)
+        if stop:
+            break
+    return ilearn
+
+class PrintResults(callback.PrintEpoch):
+    """
+    interval epochごとに、学習の繰り返し回数と各サンプルの出力・エラー値をプリントするコールバック
+    """
+    def __init__(self, interval=1000, num_sample=4):
+        """
+        PrintResultsクラスのコンストラクタ
+        input:
+            interval: int 何epochごとにプリントするか
+            num_sample: int プリントするサンプル数
+        """
+        super().__init__(interval)
+        self.num_sample = num_sample
+
+    def on_epoch_start(self, epoch, logs):
+        if (epoch % self.interval) == 0:
+            print('# of learning : {}'.format(epoch))
+            for isample in range(self.num_sample):
+                out = feedforward_vec(logs['weight'], logs['data'], isample)
+                print_results(isample, out, logs['data'], calc_error(isample, logs['data'], out))
+
+class Network():
+    """
+    重みと、各層の出力値・逆伝播の値を格納するバッファをまとめて持つクラス。
+    バッファは生成時に一度だけ確保し、学習中は新しい配列を作らずにその場で計算する。
+    """
+    __slots__ = ('num_input', 'num_hidden', 'num_output', 'beta', 'weight',
+                 'X', 'H', 'Y', 'back_h', 'back_y', 'tmp_h', 'tmp_y', 'delta1', 'delta2')
+
+    def __init__(self, num_input, num_hidden, num_output, seed=1, beta=0.8, weight=None):
+        """
+        Networkクラスのコンストラクタ
+        input:
+            num_input: int 入力層のユニット数
+            num_hidden: int 隠れ層のユニット数
+            num_output: int 出力層のユニット数
+            seed: int 重みを初期化する時の乱数シード
+            beta: float シグモイド関数に使われる定数(初期値0.8)
+            weight: リスト 初期化済みの重み。Noneならinit_net()で初期化する
+        """
+        if weight is None:
+            weight = init_net(num_input, num_hidden, num_output, seed=seed)
+        self.num_input = num_input
+        self.num_hidden = num_hidden
+        self.num_output = num_output
+        self.beta = beta
+        self.weight = weight                            # [入力層~隠れ層, 隠れ層~出力層]の重み
+        dtype = weight[0].dtype                         # バッファの型は重みに合わせる
+        self.X = np.ones(num_input+1, dtype=dtype)      # 入力層の出力値(最後は閾値用の1.0)
+        self.H = np.ones(num_hidden+1, dtype=dtype)     # 隠れ層の出力値(最後は閾値用の1.0)
+        self.Y = np.zeros(num_output, dtype=dtype)      # 出力層の出力値
+        self.back_h = np.zeros(num_hidden, dtype=dtype)  # 隠れ層の逆伝播の値
+        self.back_y = np.zeros(num_output, dtype=dtype)  # 出力層の逆伝播の値
+        self.tmp_h = np.zeros(num_hidden, dtype=dtype)  # 計算途中の値を置く作業用バッファ
+        self.tmp_y = np.zeros(num_output, dtype=dtype)
+        self.delta1 = np.zeros_like(weight[0])          # 重みの修正量
+        self.delta2 = np.zeros_like(weight[1])
+
+    def feedforward(self, x):
+        """
+        入力を順方向に伝播させ、結果をX・H・Yに書き込む
+        input:
+            x: np.array (num_input,) の入力値
+        output:
+            Y: np.array 出力層の出力値(バッファそのもの)
+        """
+        h = self.H[:-1]
+        self.X[:-1] = x
+        np.dot(self.X, self.weight[0], out=h)
+        activation.sigmoid(h, self.beta, out=h)
+        np.dot(self.H, self.weight[1], out=self.Y)
+        activation.sigmoid(self.Y, self.beta, out=self.Y)
+        return self.Y
+
+    def backward(self, t):
+        """
+        教師データとの差を逆方向に伝播させ、結果をback_h・back_yに書き込む
+        input:
+            t: np.array (num_output,) の教師データ
+        output:
+            なし
+        """
+        h = self.H[:-1]
+        # 出力層から逆伝播させる
+        np.subtract(t, self.Y, out=self.back_y)
+        self.back_y *= self.beta
+        self.back_y *= self.Y
+        np.subtract(1.0, self.Y, out=self.tmp_y)
+        self.back_y *= self.tmp_y
+        # 隠れ層から逆伝播させる
+        np.dot(self.weight[1][:-1], self.back_y, out=self.back_h)
+        self.back_h *= self.beta
+        self.back_h *= h
+        np.subtract(1.0, h, out=self.tmp_h)
+        self.back_h *= self.tmp_h
+
+    def modify_weights(self, epsilon=0.05):
+        """
+        逆伝播の結果を用いて、重みをその場で修正する
+        input:
+            epsilon: float 学習率。初期値0.05
+        output:
+            なし
+        """
+        # np.outer()と同じ計算だが、ufunc1回で済むので小さい配列ではこの方が速い
+        np.multiply(self.X[:, np.newaxis], self.back_h, out=self.delta1)
+        self.delta1 *= epsilon
+        self.weight[0] += self.delta1
+        np.multiply(self.H[:, np.newaxis], self.back_y, out=self.delta2)
+        self.delta2 *= epsilon
+        self.weight[1] += self.delta2
+
+    def train_step(self, x, t, epsilon=0.05):
+        """
+        1サンプル分の学習(順伝播・逆伝播・重みの修正)を行う
+        input:
+            x: np.array (num_input,) の入力値
+            t: np.array (num_output,) の教師データ
+            epsilon: float 学習率。初期値0.05
+        output:
+            error: float 修正前の出力から計算したエラー値
+        """
+        self.feedforward(x)
+        np.subtract(t, self.Y, out=self.tmp_y)
+        error = np.dot(self.tmp_y, self.tmp_y) / 2.0
+        self.backward(t)
+        self.modify_weights(epsilon)
+        return error
+
+    def train_epoch(self, data, epsilon=0.05):
+        """
+        dataの全サンプルについて1回ずつ学習する(1epoch分)
+        input:
+            data: np.array 入力値と出力値のデータが入ったnp.array
+            epsilon: float 学習率。初期値0.05
+        output:
+            error: float エラー値の総和
+        """
+        error = 0.0
+        num_input = self.num_input
+        for isample in range(data.shape[0]):
+            error += self.train_step(data[isample, :num_input], data[isample, num_input:], epsilon)
+        return error
+
 def print_results(isample, out, data, error):
     """
     学習結果をプリントする
@@ -190,39 +953,44 @@ def calc_error(isample, data, out):
 if __name__ == '__main__':
     NUM_LEARN = 50000           # 学習の繰り返し回数
     NUM_SAMPLE = 4              # サンプル数
-    global NUM_INPUT               # 入力層のユニット数
-    NUM_INPUT = 2
-    global NUM_HIDDEN              # 隠れ層のユニット数
-    NUM_HIDDEN = 3
-    global NUM_OUTPUT              # 出力層のユニット数
-    NUM_OUTPUT = 1
+    NUM_INPUT = 2               # 入力層のユニット数
+    NUM_HIDDEN = 3              # 隠れ層のユニット数
+    NUM_OUTPUT = 1              # 出力層のユニット数
     THRESHOLD_ERROR = 0.001     # 学習誤差がこの値以下になるとプログラムが停止する
+    BATCH_SIZE = 1              # 1回の重みの修正に使うサンプル数(1~NUM_SAMPLE)
+    EVAL_INTERVAL = 10          # 何epochごとに全サンプルのエラー値を計算して収束を判定するか
+    PATIENCE = None             # エラー値の最小値がこのepoch数更新されなければ停止する(Noneなら停止しない)
+    MODEL_PATH = DIR + '/bp_model'  # 学習済みモデルの保存先(拡張子なし)
+
+    # 環境変数ML_PROFILEが設定されていれば、処理ごとの時間をepochごとにJSONで書き出す
+    prof = profiler.get_profiler()
 
     # 入出力データの読み込み
+    t0 = prof.start()
     data = read_data()
-    # ネットワークの重みの初期化
-    weight = init_net(NUM_INPUT, NUM_HIDDEN, NUM_OUTPUT)
-    # 学習の繰り返しループ
-    for ilearn in range(NUM_LEARN):
-        if (ilearn % 1000) == 0:
-            print('# of learning : {}'.format(ilearn))
-        
-        # 訓練データに関するループ
-        error = 0.0
-        for isample in range(NUM_SAMPLE):
-            out = feedforward(weight, data, isample)
-            error += calc_error(isample, data, out)
-
-            if (ilearn % 1000) == 0:
-                print_results(isample, out, data, error)
-            
-            back = backward(weight, data, isample, out)
-            modify_weights(weight, out, back, epsilon=0.15)
-        
-        if (error < THRESHOLD_ERROR):
-            break
+    prof.stop('io', t0)
+    # ネットワークの重みの初期化(全ての層の重みを1本の配列に並べ、各層はそのビューとして使う)
+    flat = params.FlatParams.from_weight(init_net(NUM_INPUT, NUM_HIDDEN, NUM_OUTPUT))
+    weight = flat.weight
+    # 収束の判定はEVAL_INTERVAL epochごとなので、PATIENCEのepoch数を評価の回数に直して渡す
+    patience = None if (PATIENCE is None) else max(1, PATIENCE // EVAL_INTERVAL)
+    early_stopping = EarlyStopping(THRESHOLD_ERROR, patience=patience, interval=EVAL_INTERVAL)
+    # 1000epochごとに結果をプリントし、計測が有効ならepochごとに集計結果を書き出す
+    callbacks = [PrintResults(1000, NUM_SAMPLE)]
+    if prof.enabled:
+        callbacks.append(callback.EmitProfile(prof))
+    # 訓練データをBATCH_SIZEずつまとめて学習し、収束したら停止
+    ilearn = fit(weight, data[:NUM_SAMPLE], NUM_INPUT, NUM_LEARN, batch_size=BATCH_SIZE, epsilon=0.15,
+                 early_stopping=early_stopping, callbacks=callbacks, prof=prof, params=flat)
     
     print("\n\n# of learning : {}\n".format(ilearn))
     for i in range(NUM_SAMPLE):
-        out = feedforward(weight, data, i)
+        out = feedforward_vec(weight, data, i)
         print_results(i, out, data, calc_error(i, data, out))
+
+    # 学習済みの重みを保存
+    t0 = prof.start()
+    checkpoint.save_model(MODEL_PATH, flat, kind='bp', beta=0.8, extra={'epoch': ilearn})
+    prof.stop('io', t0)
+    prof.emit(epoch=ilearn, error=early_stopping.last_error)
+    prof.close()
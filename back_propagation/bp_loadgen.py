@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+import urllib.request
+import numpy as np
+
+
+def send_request(url, x):
+    """
+    推論サーバに入力を送り、出力を受け取る
+    input:
+        url: str 推論サーバのURL(http://host:port/predict)
+        x: np.array (N, 入力数) の入力データ
+    output:
+        y: np.array (N, 出力数) の出力値
+    """
+    body = json.dumps({'x': np.asarray(x).tolist()}).encode('utf-8')
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return np.array(json.loads(response.read().decode('utf-8'))['y'])
+
+def run_load(url, num_request=1000, concurrency=8, num_input=2, rows=1, seed=None):
+    """
+    concurrency個のスレッドから同時に推論サーバに要求を送り、スループットと遅延を測る
+    input:
+        url: str 推論サーバのURL(http://host:port/predict)
+        num_request: int 全体で送る要求の数
+        concurrency: int 同時に要求を送るスレッドの数
+        num_input: int 入力層のユニット数
+        rows: int 1つの要求に入れる行数
+        seed: int 入力データを作る乱数シード
+    output:
+        result: 辞書
+            'requests': int 成功した要求の数
+            'errors': int 失敗した要求の数
+            'seconds': float 全体にかかった時間
+            'throughput': float 1秒あたりの要求の数
+            'p50', 'p99': float 遅延の50・99パーセンタイル(ミリ秒)
+    """
+    if ((type(num_request) != int) or (num_request < 1)):
+        raise ValueError
+    if ((type(concurrency) != int) or (concurrency < 1)):
+        raise ValueError
+
+    rand = np.random.RandomState(seed)
+    inputs = rand.randint(2, size=(num_request, rows, num_input))
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(indices):
+        for i in indices:
+            start = time.perf_counter()
+            try:
+                send_request(url, inputs[i])
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            latency = time.perf_counter() - start
+            with lock:
+                latencies.append(latency)
+
+    threads = [threading.Thread(target=worker, args=(range(i, num_request, concurrency),))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000.0
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'seconds': seconds,
+        'throughput': len(latencies) / seconds,
+        'p50': float(np.percentile(latencies, 50)) if len(latencies) > 0 else float('nan'),
+        'p99': float(np.percentile(latencies, 99)) if len(latencies) > 0 else float('nan'),
+    }
+
+
+if __name__ == '__main__':
+    URL = 'http://127.0.0.1:8000/predict'   # bp_server.pyのURL
+    NUM_REQUEST = 2000                      # 全体で送る要求の数
+    CONCURRENCY = 16                        # 同時に要求を送るスレッドの数
+    NUM_INPUT = 2                           # 入力層のユニット数
+
+    result = run_load(URL, NUM_REQUEST, CONCURRENCY, NUM_INPUT, seed=1)
+    print('requests = {}\terrors = {}\tthroughput = {:.1f} req/s\tp50 = {:.2f} ms\tp99 = {:.2f} ms'.format(
+        result['requests'], result['errors'], result['throughput'], result['p50'], result['p99']))
+    with urllib.request.urlopen(URL.rsplit('/', 1)[0] + '/stats') as response:
+        print('server stats : {}'.format(response.read().decode('utf-8')))
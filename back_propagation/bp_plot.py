@@ -1,6 +1,15 @@
 import math
 import numpy as np
-import matplotlib.pyplot as plt
+import os
+import sys
+import bp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import activation
+
+# ErrorLogが書き出すエラー値の型
+ERROR_DTYPE = np.dtype('<f8')
 
 
 def read_data(path='data.dat'):
@@ -87,7 +96,7 @@ def feedforward(weight, data, isample, beta=0.8):
         for j in range(NUM_INPUT+1):
             net_input = net_input + (weight[0][j][i] * X[j])
         # 加算された値をシグモイド関数に適用
-        H.append((1.0 / (1.0 + np.exp(net_input * -beta))))
+        H.append(activation.sigmoid(net_input, beta))
     H.append(1.0)
     # 出力層のユニット数だけ繰り返し
     for i in range(NUM_OUTPUT):
@@ -96,7 +105,7 @@ def feedforward(weight, data, isample, beta=0.8):
         net_input = 0
         for j in range(NUM_HIDDEN+1):
             net_input = net_input + (weight[1][j][i] * H[j])
-        Y.append((1.0 / (1.0 + np.exp(net_input * -beta))))
+        Y.append(activation.sigmoid(net_input, beta))
     return [X, H, Y]
 
 def backward(weight, data, isample, out, beta=0.8):
@@ -184,14 +193,132 @@ def calc_error(isample, data, out):
 
     return error
 
-def plot_error(error):
+class ErrorLog():
+    """
+    毎epochのエラー値を、学習しながらバイナリファイルに追記していくクラス。
+    値はbuffer_size個ずつまとめて書き出すので、メモリ上に置かれるのはその分だけになる。
+    ファイルはfloat64の値を並べただけの形式なので、read_error_log()で学習中でも読み込める。
+    """
+    def __init__(self, path='error_per_epoch.bin', buffer_size=1000):
+        """
+        ErrorLogクラスのコンストラクタ(既にファイルがあれば空にする)
+        input:
+            path: str 書き出すファイル名
+            buffer_size: int まとめて書き出す値の数
+        """
+        if ((type(buffer_size) != int) or (buffer_size < 1)):
+            raise ValueError
+        self.path = path
+        self.buffer = np.zeros(buffer_size, dtype=ERROR_DTYPE)
+        self.num_buffer = 0      # bufferに溜まっている値の数
+        self.num_value = 0       # これまでに追加した値の数
+        self.file = open(path, mode='wb')
+
+    def append(self, error):
+        """
+        エラー値を1つ追加する(bufferが一杯になったらファイルに書き出す)
+        input:
+            error: float エラー値
+        output:
+            なし
+        """
+        self.buffer[self.num_buffer] = error
+        self.num_buffer += 1
+        self.num_value += 1
+        if (self.num_buffer == self.buffer.shape[0]):
+            self.flush()
+
+    def flush(self):
+        """
+        bufferに溜まっている値をファイルに書き出す
+        """
+        self.file.write(self.buffer[:self.num_buffer].tobytes())
+        self.file.flush()
+        self.num_buffer = 0
+
+    def close(self):
+        """
+        残りの値を書き出してファイルを閉じる
+        """
+        self.flush()
+        self.file.close()
+
+def read_error_log(path='error_per_epoch.bin'):
+    """
+    ErrorLogが書き出したファイルを読み取り専用のメモリマップで開く。
+    学習中で最後の値が書きかけの場合は、その値を除く。
+    input:
+        path: str ErrorLogが書き出したファイル名
+    output:
+        error: np.array 毎epochのエラー値(メモリマップ)
+    """
+    num_value = os.path.getsize(path) // ERROR_DTYPE.itemsize
+    if (num_value == 0):
+        return np.zeros(0, dtype=ERROR_DTYPE)
+    return np.memmap(path, dtype=ERROR_DTYPE, mode='r', shape=(num_value,))
+
+def downsample_minmax(error, num_bin=1000, chunk_size=1 << 20):
+    """
+    エラー値の列をnum_bin個の区間に分け、各区間の最小値と最大値だけを残す。
+    区間の中の山や谷を消さずに、プロットする点の数を2*num_bin以下に抑えられる。
+    chunk_size個ずつ処理するので、メモリマップを渡せば全体をメモリに読み込まない。
+    input:
+        error: np.array 毎epochのエラー値
+        num_bin: int 区間の数
+        chunk_size: int 1度に処理する値の数の目安
+    output:
+        x: np.array 残した値のepoch(昇順)
+        y: np.array 残した値
+    """
+    if ((type(num_bin) != int) or (num_bin < 1)):
+        raise ValueError
+
+    num_value = error.shape[0]
+    if (num_value <= 2 * num_bin):
+        return np.arange(num_value), np.array(error)
+
+    bin_size = -(-num_value // num_bin)
+    # 1度に処理する区間の数(区間の途中で区切らないように、bin_sizeの倍数ずつ処理する)
+    step = max(1, chunk_size // bin_size) * bin_size
+    xs = []
+    ys = []
+    for start in range(0, num_value, step):
+        chunk = np.asarray(error[start:start+step])
+        num_full = chunk.shape[0] // bin_size
+        bins = [chunk[:num_full*bin_size].reshape(num_full, bin_size)]
+        offsets = [start + np.arange(num_full) * bin_size]
+        if (chunk.shape[0] % bin_size != 0):
+            # 最後の区間だけ短くなる
+            bins.append(chunk[num_full*bin_size:][np.newaxis, :])
+            offsets.append(np.array([start + num_full * bin_size]))
+        for block, offset in zip(bins, offsets):
+            imin = np.argmin(block, axis=1)
+            imax = np.argmax(block, axis=1)
+            # 各区間の最小値と最大値を、epochの順に並べる
+            first = np.minimum(imin, imax)
+            second = np.maximum(imin, imax)
+            rows = np.arange(block.shape[0])
+            xs.append(np.stack([offset + first, offset + second], axis=1).ravel())
+            ys.append(np.stack([block[rows, first], block[rows, second]], axis=1).ravel())
+    return np.concatenate(xs), np.concatenate(ys)
+
+def plot_error(error, num_bin=1000, path='error_per_epoch.pdf'):
     """
     エラー値の推移をプロットする
+    点の数がepoch数によらないように、downsample_minmax()で間引いてからプロットする。
     input:
-        error: リスト 毎epochのエラー値が格納されたリスト
+        error: リスト・np.array 毎epochのエラー値、またはErrorLogが書き出したファイル名
+        num_bin: int 間引いた後の区間の数
+        path: str 書き出すファイル名
     output:
         なし
     """
+    # matplotlibは読み込みに時間がかかるので、プロットする時だけimportする
+    import matplotlib.pyplot as plt
+
+    if (type(error) == str):
+        error = read_error_log(error)
+    x, y = downsample_minmax(np.asarray(error), num_bin)
 
     # グラフタイトルの設定
     plt.title('error per epoch')
@@ -201,15 +328,46 @@ def plot_error(error):
     plt.ylabel('error')
     
     # プロット
-    plt.plot(error, label="error_value")
+    plt.plot(x, y, label="error_value")
 
     # 凡例の表示
     plt.legend()
 
     # PDFファイルに書き出し
-    plt.savefig('error_per_epoch.pdf')
+    plt.savefig(path)
+
+def watch_error(log_path='error_per_epoch.bin', num_bin=1000, interval=1.0):
+    """
+    学習中のErrorLogのファイルを読み直しながら、エラー値の推移を表示し続ける(Ctrl-Cで終了)。
+    学習とは別のプロセスで実行する。
+    input:
+        log_path: str ErrorLogが書き出すファイル名
+        num_bin: int 間引いた後の区間の数
+        interval: float 表示を更新する間隔(秒)
+    output:
+        なし
+    """
+    import matplotlib.pyplot as plt
+
+    plt.ion()
+    line, = plt.plot([], [], label="error_value")
+    plt.title('error per epoch')
+    plt.xlabel('epochs')
+    plt.ylabel('error')
+    plt.legend()
+    try:
+        while True:
+            if (os.path.exists(log_path)):
+                x, y = downsample_minmax(read_error_log(log_path), num_bin)
+                line.set_data(x, y)
+                plt.gca().relim()
+                plt.gca().autoscale_view()
+            plt.pause(interval)
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == '__main__':
+    PLOT = '--no-plot' not in sys.argv[1:]  # --no-plotを付けて実行するとプロットしない
     NUM_LEARN = 50000           # 学習の繰り返し回数
     NUM_SAMPLE = 4              # サンプル数
     global NUM_INPUT               # 入力層のユニット数
@@ -219,7 +377,15 @@ if __name__ == '__main__':
     global NUM_OUTPUT              # 出力層のユニット数
     NUM_OUTPUT = 1
     THRESHOLD_ERROR = 0.001     # 学習誤差がこの値以下になるとプログラムが停止する
-    error_list = []             # 毎epochエラー値を格納するリスト。プロットの時に使用。
+    BATCH_SIZE = 1              # 1回の重みの修正に使うサンプル数(1~NUM_SAMPLE)
+    ERROR_LOG = 'error_per_epoch.bin'   # 毎epochのエラー値を追記していくファイル。プロットの時に使用。
+
+    # --watchを付けて実行すると、別のプロセスで学習中のエラー値の推移を表示し続ける
+    if ('--watch' in sys.argv[1:]):
+        watch_error(ERROR_LOG)
+        sys.exit()
+
+    error_log = ErrorLog(ERROR_LOG)
     # 入出力データの読み込み
     data = read_data()
     # print(data)
@@ -230,26 +396,22 @@ if __name__ == '__main__':
     for ilearn in range(NUM_LEARN):
         if (ilearn % 1000) == 0:
             print('# of learning : {}'.format(ilearn))
-        
-        # 訓練データに関するループ
-        error = 0.0
-        for isample in range(NUM_SAMPLE):
-            out = feedforward(weight, data, isample)
-            error += calc_error(isample, data, out)
-
-            if (ilearn % 1000) == 0:
-                print_results(isample, out, data, error)
-            
-            back = backward(weight, data, isample, out)
-            modify_weights(weight, out, back, epsilon=0.15)
+            for isample in range(NUM_SAMPLE):
+                out = feedforward(weight, data, isample)
+                print_results(isample, out, data, calc_error(isample, data, out))
+
+        # 訓練データをBATCH_SIZEずつまとめて学習
+        error = bp.train_batch(weight, data[:NUM_SAMPLE], NUM_INPUT, batch_size=BATCH_SIZE, epsilon=0.15)
         
         if (error < THRESHOLD_ERROR):
             break
-        error_list.append(error)
+        error_log.append(error)
+    error_log.close()
     
     print("\n\n# of learning : {}\n".format(ilearn))
     for i in range(NUM_SAMPLE):
         out = feedforward(weight, data, i)
         print_results(i, out, data, calc_error(i, data, out))
 
-    plot_error(error_list)
+    if PLOT:
+        plot_error(ERROR_LOG)
@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import queue
+import threading
+import time
+import socketserver
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import numpy as np
+import bp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import checkpoint
+
+
+class MicroBatcher():
+    """
+    複数のスレッドから同時に来た推論の要求を1つのバッチにまとめて計算するクラス。
+    最初の要求が来てからmax_wait秒までに来た要求(合計max_batch行まで)をまとめて
+    bp.predict()を1回だけ呼び、結果を要求ごとに切り分けて返す。
+    """
+    def __init__(self, model, max_batch=64, max_wait=0.002, act='sigmoid'):
+        """
+        MicroBatcherクラスのコンストラクタ
+        input:
+            model: リスト 各層の重み、またはcheckpoint.load_model()が返した辞書
+            max_batch: int 1つのバッチにまとめる最大の行数
+            max_wait: float 最初の要求からバッチを締め切るまでの待ち時間(秒)
+            act: str 活性化関数の名前
+        """
+        if ((type(max_batch) != int) or (max_batch < 1)):
+            raise ValueError
+        if (max_wait < 0.0):
+            raise ValueError
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.act = act
+        weight = model['weight'] if (type(model) == dict) else model
+        self.num_input = weight[0].shape[0] - 1
+        self.num_request = 0     # 処理した要求の数
+        self.num_batch = 0       # bp.predict()を呼んだ回数
+        self.num_row = 0         # 処理した行数
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def predict(self, x):
+        """
+        要求をキューに入れ、バッチで計算されるまで待って結果を返す
+        input:
+            x: np.array (N, num_input) の入力データ
+        output:
+            y: np.array (N, num_output) の出力値
+        """
+        x = np.asarray(x, dtype=float)
+        if ((x.ndim != 2) or (x.shape[0] == 0) or (x.shape[1] != self.num_input)):
+            raise ValueError
+        box = {'event': threading.Event(), 'y': None, 'error': None}
+        self.queue.put((x, box))
+        box['event'].wait()
+        if (box['error'] is not None):
+            raise box['error']
+        return box['y']
+
+    def close(self):
+        """
+        バッチを計算するスレッドを止める
+        input:
+            なし
+        output:
+            なし
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+    def _collect(self, first):
+        """
+        最初の要求に続けて、締め切りまでに来た要求を集める
+        input:
+            first: (x, box) 最初の要求
+        output:
+            items: リスト 集めた要求
+            stop: bool 途中で停止の指示が来たかどうか
+        """
+        items = [first]
+        num_row = first[0].shape[0]
+        deadline = time.perf_counter() + self.max_wait
+        while (num_row < self.max_batch):
+            remain = deadline - time.perf_counter()
+            if (remain <= 0.0):
+                break
+            try:
+                item = self.queue.get(timeout=remain)
+            except queue.Empty:
+                break
+            if (item is None):
+                return items, True
+            items.append(item)
+            num_row += item[0].shape[0]
+        return items, False
+
+    def _loop(self):
+        """
+        キューから要求を取り出してバッチで計算し続ける(別スレッドで実行される)
+        """
+        stop = False
+        while (not stop):
+            first = self.queue.get()
+            if (first is None):
+                break
+            items, stop = self._collect(first)
+
+            x = np.vstack([item[0] for item in items])
+            try:
+                y = bp.predict(self.model, x, act=self.act)
+            except Exception as error:
+                for _, box in items:
+                    box['error'] = error
+                    box['event'].set()
+                continue
+
+            # 結果を要求ごとに切り分けて返す
+            start = 0
+            for xi, box in items:
+                box['y'] = y[start:start+xi.shape[0]]
+                start += xi.shape[0]
+                box['event'].set()
+            self.num_request += len(items)
+            self.num_batch += 1
+            self.num_row += x.shape[0]
+
+    def stats(self):
+        """
+        これまでの処理の統計を返す
+        input:
+            なし
+        output:
+            stats: 辞書 要求の数・バッチの数・行数・1バッチの平均の要求数
+        """
+        return {
+            'requests': self.num_request,
+            'batches': self.num_batch,
+            'rows': self.num_row,
+            'mean_batch': self.num_request / self.num_batch if self.num_batch > 0 else 0.0,
+        }
+
+class PredictHandler(BaseHTTPRequestHandler):
+    """
+    POST /predict に {"x": [[入力, ...], ...]} を送ると {"y": [[出力, ...], ...]} を返す。
+    GET /stats でMicroBatcherの統計を返す。
+    """
+    def do_POST(self):
+        if (self.path != '/predict'):
+            self._send(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            x = json.loads(self.rfile.read(length).decode('utf-8'))['x']
+            y = self.server.batcher.predict(x)
+        except (ValueError, KeyError, TypeError):
+            self._send(400, {'error': 'bad request'})
+            return
+        self._send(200, {'y': y.tolist()})
+
+    def do_GET(self):
+        if (self.path != '/stats'):
+            self._send(404, {'error': 'not found'})
+            return
+        self._send(200, self.server.batcher.stats())
+
+    def _send(self, code, body):
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 要求ごとのログは負荷をかけた時に邪魔になるので出さない
+        pass
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    要求ごとにスレッドを立てるHTTPサーバ(同時に来た要求をMicroBatcherでまとめられるように)
+    """
+    daemon_threads = True
+    # 同時に多くの接続が来ても拒否しないように、接続待ちのキューを大きくする
+    request_queue_size = 128
+
+def make_server(model, host='127.0.0.1', port=8000, max_batch=64, max_wait=0.002):
+    """
+    推論サーバを作る(serve_forever()を呼ぶと要求を受け付け始める)
+    input:
+        model: リスト 各層の重み、またはcheckpoint.load_model()が返した辞書
+        host: str 待ち受けるアドレス
+        port: int 待ち受けるポート(0なら空いているポートを使う)
+        max_batch: int 1つのバッチにまとめる最大の行数
+        max_wait: float 最初の要求からバッチを締め切るまでの待ち時間(秒)
+    output:
+        server: ThreadingHTTPServer server.batcherにMicroBatcherを持つ
+    """
+    server = ThreadingHTTPServer((host, port), PredictHandler)
+    server.batcher = MicroBatcher(model, max_batch=max_batch, max_wait=max_wait)
+    return server
+
+
+if __name__ == '__main__':
+    MODEL_PATH = bp.DIR + '/bp_model'   # bp.pyが保存した学習済みのモデル
+    HOST = '127.0.0.1'                  # 待ち受けるアドレス
+    PORT = 8000                         # 待ち受けるポート
+    MAX_BATCH = 64                      # 1つのバッチにまとめる最大の行数
+    MAX_WAIT = 0.002                    # バッチを締め切るまでの待ち時間(秒)
+
+    model = checkpoint.load_model(MODEL_PATH, mmap=True)
+    server = make_server(model, HOST, PORT, MAX_BATCH, MAX_WAIT)
+    print('serving on http://{}:{}/predict'.format(HOST, server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    server.batcher.close()
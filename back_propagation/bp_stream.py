@@ -0,0 +1,165 @@
+import os
+import itertools
+import resource
+import numpy as np
+import bp
+
+
+def iter_chunks(path, chunk_size=4096):
+    """
+    入出力データをディスクからchunk_size行ずつ読み込んで返すジェネレータ。
+    .npyファイルはメモリマップで開き、それ以外はテキスト形式として1チャンクずつ解析する。
+    どちらの場合もメモリ上に置かれるのは1チャンク分だけになる。
+    input:
+        path: str 入出力データのファイル(DIRからの相対パスか絶対パス)
+        chunk_size: int 1度に読み込む行数
+    output:
+        chunk: np.array (chunk_size, 入力数+出力数) の入出力データ(最後のチャンクは短くなる)
+    """
+    if ((type(chunk_size) != int) or (chunk_size < 1)):
+        raise ValueError
+
+    path = os.path.join(bp.DIR, path)
+    if (path.endswith('.npy')):
+        data = np.load(path, mmap_mode='r')
+        for start in range(0, data.shape[0], chunk_size):
+            # メモリマップ上のスライスをコピーし、チャンク以外のページを掴み続けないようにする
+            yield np.array(data[start:start+chunk_size])
+    else:
+        with open(path, 'r') as f:
+            lines = (line for line in f if line.strip() != '')
+            while True:
+                chunk = list(itertools.islice(lines, chunk_size))
+                if (len(chunk) == 0):
+                    break
+                yield np.loadtxt(chunk, delimiter=' ', ndmin=2)
+
+def iter_samples(chunks):
+    """
+    チャンクのジェネレータを1サンプル(1行)ずつのジェネレータに変換する。
+    各サンプルはチャンクのビューではなくコピーなので、
+    shuffle_buffer()などがサンプルを溜めてもチャンク全体を掴み続けない。
+    input:
+        chunks: iter_chunks()などのチャンクを返すイテレータ
+    output:
+        sample: np.array 1サンプル分の入出力データ
+    """
+    for chunk in chunks:
+        for sample in chunk:
+            yield sample.copy()
+
+def shuffle_buffer(samples, buffer_size=1024, seed=None):
+    """
+    大きさbuffer_sizeのバッファを使って、サンプルの順番をシャッフルしながら返すジェネレータ。
+    バッファが一杯になったら、ランダムに選んだ1サンプルを返して新しいサンプルと入れ替える。
+    メモリ上に置かれるのはbuffer_size個のサンプルだけになる。
+    input:
+        samples: サンプルを返すイテレータ
+        buffer_size: int バッファに溜めるサンプル数
+        seed: int 乱数シード(Noneならシードを固定しない)
+    output:
+        sample: np.array 1サンプル分の入出力データ
+    """
+    if ((type(buffer_size) != int) or (buffer_size < 1)):
+        raise ValueError
+
+    rand = np.random.RandomState(seed)
+    buffer = []
+    for sample in samples:
+        if (len(buffer) < buffer_size):
+            buffer.append(sample)
+            continue
+        i = rand.randint(buffer_size)
+        yield buffer[i]
+        buffer[i] = sample
+
+    # 残ったサンプルをシャッフルして全て返す
+    rand.shuffle(buffer)
+    for sample in buffer:
+        yield sample
+
+def iter_batches(samples, batch_size=1):
+    """
+    サンプルをbatch_size個ずつまとめて返すジェネレータ
+    input:
+        samples: サンプルを返すイテレータ
+        batch_size: int 1つのバッチにまとめるサンプル数
+    output:
+        batch: np.array (batch_size, 入力数+出力数) のバッチ(最後のバッチは短くなる)
+    """
+    if ((type(batch_size) != int) or (batch_size < 1)):
+        raise ValueError
+
+    samples = iter(samples)
+    while True:
+        batch = list(itertools.islice(samples, batch_size))
+        if (len(batch) == 0):
+            break
+        yield np.array(batch)
+
+def train_stream(weight, batches, num_input, epsilon=0.05, beta=0.8):
+    """
+    ストリームから流れてくるバッチごとに重みを修正する(1epoch分)。
+    input:
+        weight: リスト 各層の重み(np.array)が格納されたリスト
+        batches: iter_batches()などのバッチを返すイテレータ
+        num_input: int 入力層のユニット数
+        epsilon: float 学習率。初期値0.05
+        beta: float シグモイド関数に使われる定数(初期値0.8)
+    output:
+        error: float 修正前の出力から計算したエラー値の総和
+        num_sample: int 学習に使ったサンプル数
+    """
+    error = 0.0
+    num_sample = 0
+    for batch in batches:
+        batch = batch.astype(weight[0].dtype, copy=False)
+        out = bp.feedforward_batch(weight, batch[:, :num_input], beta=beta)
+        t = batch[:, num_input:]
+        error += np.sum((t - out[-1]) ** 2) / 2.0
+        back = bp.backward_batch(weight, t, out, beta=beta)
+        bp.modify_weights_batch(weight, out, back, epsilon=epsilon)
+        num_sample += batch.shape[0]
+    return error, num_sample
+
+def peak_memory():
+    """
+    このプロセスがこれまでに使ったメモリの最大値を返す
+    input:
+        なし
+    output:
+        peak: float 最大常駐メモリ(MB)
+    """
+    # Linuxではru_maxrssの単位はKB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+if __name__ == '__main__':
+    NUM_LEARN = 50000           # 学習の繰り返し回数
+    NUM_INPUT = 2               # 入力層のユニット数
+    NUM_HIDDEN = 3              # 隠れ層のユニット数
+    NUM_OUTPUT = 1              # 出力層のユニット数
+    THRESHOLD_ERROR = 0.001     # 学習誤差がこの値以下になるとプログラムが停止する
+    DATA_PATH = 'data.npy'      # 学習に使うデータ(無ければdata.datから変換する)
+    CHUNK_SIZE = 4096           # ディスクから1度に読み込む行数
+    BUFFER_SIZE = 1024          # シャッフル用のバッファの大きさ
+    BATCH_SIZE = 1              # 1回の重みの修正に使うサンプル数
+
+    if (not os.path.exists(os.path.join(bp.DIR, DATA_PATH))):
+        bp.convert_data(dst=DATA_PATH)
+
+    # ネットワークの重みの初期化
+    weight = bp.init_net(NUM_INPUT, NUM_HIDDEN, NUM_OUTPUT)
+    # 学習の繰り返しループ
+    for ilearn in range(NUM_LEARN):
+        # ディスクからチャンクごとに読み込み、シャッフルしながらバッチにまとめる
+        samples = shuffle_buffer(iter_samples(iter_chunks(DATA_PATH, CHUNK_SIZE)), BUFFER_SIZE, seed=ilearn)
+        error, num_sample = train_stream(weight, iter_batches(samples, BATCH_SIZE), NUM_INPUT, epsilon=0.15)
+
+        if (ilearn % 1000) == 0:
+            print('# of learning : {}\terror = {}\tsamples = {}\tpeak memory = {:.1f} MB'.format(ilearn, error, num_sample, peak_memory()))
+
+        if (error < THRESHOLD_ERROR):
+            break
+
+    print("\n\n# of learning : {}\terror = {}\tpeak memory = {:.1f} MB".format(ilearn, error, peak_memory()))
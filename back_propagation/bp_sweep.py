@@ -0,0 +1,129 @@
+import os
+import time
+import itertools
+import functools
+import multiprocessing
+import bp
+
+
+# 結果の表に書き出す列
+COLUMNS = ['seed', 'num_hidden', 'epsilon', 'beta', 'converge_epoch', 'final_error', 'wall_time']
+
+def make_configs(seeds, hiddens, epsilons, betas, num_input=None):
+    """
+    乱数シード・隠れ層のユニット数・学習率・betaの全ての組み合わせを作る
+    input:
+        seeds: リスト 乱数シード
+        hiddens: リスト 隠れ層のユニット数
+        epsilons: リスト 学習率
+        betas: リスト シグモイド関数に使われる定数
+        num_input: int 入力層のユニット数(指定した時だけ各設定に入れる)
+    output:
+        configs: リスト 1回の学習の設定(辞書)が格納されたリスト
+    """
+    configs = [{'seed': seed, 'num_hidden': num_hidden, 'epsilon': epsilon, 'beta': beta}
+               for seed, num_hidden, epsilon, beta in itertools.product(seeds, hiddens, epsilons, betas)]
+    if (num_input is not None):
+        for config in configs:
+            config['num_input'] = num_input
+    return configs
+
+def run_config(config, data=None, num_learn=50000, threshold=0.001, batch_size=1, data_path='data.dat'):
+    """
+    1つの設定でネットワークを学習させ、結果を返す。
+    入力層のユニット数はconfigの'num_input'を使い、無ければdata_pathの「.json」(bp.read_data_meta())から読む。
+    input:
+        config: 辞書 make_configs()が作った1回の学習の設定
+        data: np.array 入力値と出力値のデータ(Noneならdata_pathを読み込む)
+        num_learn: int 学習の繰り返し回数の上限
+        threshold: float 全サンプルのエラー値の総和がこの値未満になったら学習を止める
+        batch_size: int 1回の重みの修正に使うサンプル数
+        data_path: str 入出力データのファイル(DIRからの相対パス)
+    output:
+        result: 辞書 設定に、収束したepoch(収束しなければ-1)・最後のエラー値・学習時間を加えたもの
+    """
+    if (data is None):
+        data = bp.read_data(data_path)
+    num_input = config.get('num_input')
+    if (num_input is None):
+        meta = bp.read_data_meta(data_path)
+        # 入力と出力の区切りが分からなければ、推測せずにValueErrorを投げる
+        if (meta is None):
+            raise ValueError
+        num_input = meta['num_input']
+    num_output = data.shape[1] - num_input
+
+    start = time.perf_counter()
+    weight = bp.init_net(num_input, config['num_hidden'], num_output, seed=config['seed'])
+    early_stopping = bp.EarlyStopping(threshold)
+    for ilearn in range(num_learn):
+        bp.train_batch(weight, data, num_input, batch_size=batch_size,
+                       epsilon=float(config['epsilon']), beta=config['beta'])
+        if early_stopping.check(ilearn, weight, data, beta=config['beta']):
+            break
+
+    result = dict(config)
+    result['converge_epoch'] = early_stopping.stop_epoch if early_stopping.converged else -1
+    result['final_error'] = early_stopping.last_error
+    result['wall_time'] = time.perf_counter() - start
+    return result
+
+def sweep(configs, processes=None, data=None, num_learn=50000, threshold=0.001, batch_size=1, data_path='data.dat'):
+    """
+    全ての設定をプロセスプールで並列に学習させる
+    input:
+        configs: リスト make_configs()が作った設定のリスト
+        processes: int 使うプロセス数(NoneならCPUのコア数)
+        data: np.array 入力値と出力値のデータ(Noneならdata_pathを読み込む)
+        num_learn: int 学習の繰り返し回数の上限
+        threshold: float 学習誤差がこの値未満になったら学習を止める
+        batch_size: int 1回の重みの修正に使うサンプル数
+        data_path: str 入出力データのファイル(入力層のユニット数もこのファイルの「.json」から読む)
+    output:
+        results: リスト run_config()の結果(configsと同じ順番)
+    """
+    if (data is None):
+        data = bp.read_data(data_path)
+    run = functools.partial(run_config, data=data, num_learn=num_learn,
+                            threshold=threshold, batch_size=batch_size, data_path=data_path)
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(run, configs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+def write_table(results, path='sweep_result.dat'):
+    """
+    結果の表をスペース区切りのテキストファイルに書き出す(1行目は列名)
+    input:
+        results: リスト run_config()の結果のリスト
+        path: str 書き出すファイル(DIRからの相対パスか絶対パス)
+    output:
+        なし
+    """
+    with open(os.path.join(bp.DIR, path), mode='w') as f:
+        f.write(' '.join(COLUMNS) + '\n')
+        for result in results:
+            f.write(' '.join(str(result[column]) for column in COLUMNS) + '\n')
+
+
+if __name__ == '__main__':
+    SEEDS = [1, 2, 3, 4, 5, 6, 7, 8]   # 乱数シード
+    HIDDENS = [2, 3, 5]                 # 隠れ層のユニット数
+    EPSILONS = [0.05, 0.15, 0.3]        # 学習率
+    BETAS = [0.8]                       # シグモイド関数に使われる定数
+    NUM_LEARN = 50000                   # 学習の繰り返し回数の上限
+    THRESHOLD_ERROR = 0.001             # 学習誤差がこの値以下になると学習を止める
+
+    configs = make_configs(SEEDS, HIDDENS, EPSILONS, BETAS)
+    print('{} configs on {} processes'.format(len(configs), multiprocessing.cpu_count()))
+    start = time.perf_counter()
+    results = sweep(configs, num_learn=NUM_LEARN, threshold=THRESHOLD_ERROR)
+    print('total wall time : {:.2f} s'.format(time.perf_counter() - start))
+
+    print(' '.join(COLUMNS))
+    for result in results:
+        print(' '.join(str(result[column]) for column in COLUMNS))
+    write_table(results)
@@ -0,0 +1,139 @@
+import numpy as np
+
+
+class SGD():
+    """
+    学習率epsilonを掛けた修正量をそのまま重みに足す、今までと同じ修正方法。
+    修正量(grad)はmodify_weights()と同じ向き(エラー値が小さくなる向き)のものを渡す。
+    """
+    def __init__(self, epsilon=0.05):
+        """
+        SGDクラスのコンストラクタ
+        input:
+            epsilon: float 学習率。初期値0.05
+        """
+        if (type(epsilon) != float):
+            raise ValueError
+        self.epsilon = epsilon
+        self.state = {}          # 重みと同じ形の状態の配列(名前: 層ごとのリスト)
+
+    def _init_state(self, weight, names):
+        """
+        最初の修正の時に、重みと同じ形の状態の配列を確保する
+        """
+        if (len(self.state) == 0):
+            for name in names:
+                self.state[name] = [np.zeros_like(w) for w in weight]
+
+    def update(self, weight, grad):
+        """
+        重みをその場で修正する
+        input:
+            weight: リスト 各層の重み(np.array)が格納されたリスト
+            grad: リスト 各層の修正量(np.array)が格納されたリスト
+        output:
+            なし
+        """
+        for w, g in zip(weight, grad):
+            w += self.epsilon * g
+
+class Momentum(SGD):
+    """
+    前回までの修正量(速度)にmomentumを掛けて足し込むモーメンタム法
+    """
+    def __init__(self, epsilon=0.05, momentum=0.9):
+        """
+        Momentumクラスのコンストラクタ
+        input:
+            epsilon: float 学習率。初期値0.05
+            momentum: float 前回の速度をどれだけ残すか。初期値0.9
+        """
+        super().__init__(epsilon)
+        self.momentum = momentum
+
+    def update(self, weight, grad):
+        """
+        速度を更新し、重みをその場で修正する
+        input:
+            weight: リスト 各層の重み(np.array)が格納されたリスト
+            grad: リスト 各層の修正量(np.array)が格納されたリスト
+        output:
+            なし
+        """
+        self._init_state(weight, ['velocity'])
+        for w, g, v in zip(weight, grad, self.state['velocity']):
+            # v <- momentum * v + epsilon * g
+            v *= self.momentum
+            v += self.epsilon * g
+            w += v
+
+class Nesterov(Momentum):
+    """
+    速度で先に進んだ位置の勾配を使うネステロフの加速勾配法。
+    先に進んだ位置で勾配を計算し直さなくて済むように、
+    w <- w + momentum * v + epsilon * g (vは更新後の速度) と書き換えた形で修正する。
+    """
+    def update(self, weight, grad):
+        """
+        速度を更新し、重みをその場で修正する
+        input:
+            weight: リスト 各層の重み(np.array)が格納されたリスト
+            grad: リスト 各層の修正量(np.array)が格納されたリスト
+        output:
+            なし
+        """
+        self._init_state(weight, ['velocity'])
+        for w, g, v in zip(weight, grad, self.state['velocity']):
+            step = self.epsilon * g
+            v *= self.momentum
+            v += step
+            w += step
+            step[...] = v
+            step *= self.momentum
+            w += step
+
+class Adam(SGD):
+    """
+    修正量の1次・2次モーメントの移動平均で、重みごとに修正の大きさを調整するAdam
+    """
+    def __init__(self, epsilon=0.001, beta1=0.9, beta2=0.999, delta=1e-8):
+        """
+        Adamクラスのコンストラクタ
+        input:
+            epsilon: float 学習率。初期値0.001
+            beta1: float 1次モーメントの減衰率。初期値0.9
+            beta2: float 2次モーメントの減衰率。初期値0.999
+            delta: float 0で割らないための小さな値。初期値1e-8
+        """
+        super().__init__(epsilon)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.delta = delta
+        self.t = 0               # 修正した回数
+
+    def update(self, weight, grad):
+        """
+        1次・2次モーメントを更新し、重みをその場で修正する
+        input:
+            weight: リスト 各層の重み(np.array)が格納されたリスト
+            grad: リスト 各層の修正量(np.array)が格納されたリスト
+        output:
+            なし
+        """
+        self._init_state(weight, ['m', 'v'])
+        self.t += 1
+        # 移動平均の初期値が0であることによる偏りの補正を学習率にまとめる
+        lr = self.epsilon * np.sqrt(1.0 - self.beta2 ** self.t) / (1.0 - self.beta1 ** self.t)
+        for w, g, m, v in zip(weight, grad, self.state['m'], self.state['v']):
+            m *= self.beta1
+            m += (1.0 - self.beta1) * g
+            v *= self.beta2
+            g = g * g
+            g *= (1.0 - self.beta2)
+            v += g
+            # g の領域を作業用に使い回す: g <- lr * m / (sqrt(v) + delta)
+            np.sqrt(v, out=g)
+            g += self.delta
+            np.divide(m, g, out=g)
+            g *= lr
+            w += g
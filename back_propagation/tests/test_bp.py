@@ -3,9 +3,16 @@ import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+import tempfile
 import unittest
 import numpy as np
 import bp
+import activation
+import callback
+import checkpoint
+import config
+import optimizer
+import params
 
 
 class test_bp(unittest.TestCase):
@@ -175,6 +182,368 @@ class test_bp(unittest.TestCase):
             OK = []
             bp.modify_weights(NG, OK, NG)
 
+    def test_vec_matches_loop(self):
+        """
+        test method of feedforward_vec, backward_vec, modify_weights_vec
+        """
+        # ループ版の関数が参照するユニット数を設定
+        bp.NUM_INPUT = 2
+        bp.NUM_HIDDEN = 3
+        bp.NUM_OUTPUT = 1
+        data = bp.read_data()
+        weight_loop = bp.init_net(2, 3, 1)
+        weight_vec = [w.copy() for w in weight_loop]
+
+        # 数epoch分学習させて、ループ版と行列版の結果が一致するかテスト
+        for ilearn in range(5):
+            for isample in range(4):
+                out_loop = bp.feedforward(weight_loop, data, isample)
+                out_vec = bp.feedforward_vec(weight_vec, data, isample)
+                for expected, actual in zip(out_loop, out_vec):
+                    np.testing.assert_allclose(expected, actual)
+
+                back_loop = bp.backward(weight_loop, data, isample, out_loop)
+                back_vec = bp.backward_vec(weight_vec, data, isample, out_vec)
+                for expected, actual in zip(back_loop, back_vec):
+                    np.testing.assert_allclose(expected, actual)
+
+                bp.modify_weights(weight_loop, out_loop, back_loop, epsilon=0.15)
+                bp.modify_weights_vec(weight_vec, out_vec, back_vec, epsilon=0.15)
+                for expected, actual in zip(weight_loop, weight_vec):
+                    np.testing.assert_allclose(expected, actual)
+
+        # 入力された型が不正な時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            bp.feedforward_vec('test', 10, 10)
+        with self.assertRaises(ValueError):
+            bp.backward_vec('test', 10, 10, 'test')
+        with self.assertRaises(ValueError):
+            bp.modify_weights_vec(10, [], 10)
+
+    def test_train_batch(self):
+        """
+        test method of feedforward_batch, backward_batch, modify_weights_batch, train_batch
+        """
+        data = bp.read_data()
+
+        # batch_size=1の時はサンプルごとの学習(行列版)と一致するかテスト
+        weight_online = bp.init_net(2, 3, 1)
+        weight_batch = [w.copy() for w in weight_online]
+        expected_error = 0.0
+        for isample in range(4):
+            out = bp.feedforward_vec(weight_online, data, isample)
+            expected_error += np.sum((data[isample][2:] - out[2]) ** 2) / 2.0
+            back = bp.backward_vec(weight_online, data, isample, out)
+            bp.modify_weights_vec(weight_online, out, back, epsilon=0.15)
+        actual_error = bp.train_batch(weight_batch, data, 2, batch_size=1, epsilon=0.15)
+        self.assertAlmostEqual(expected_error, actual_error)
+        for expected, actual in zip(weight_online, weight_batch):
+            np.testing.assert_allclose(expected, actual)
+
+        # 全サンプルをまとめた時は、各サンプルの修正量の和で1回だけ修正されるかテスト
+        weight = bp.init_net(2, 3, 1)
+        weight_full = [w.copy() for w in weight]
+        delta = [np.zeros_like(w) for w in weight]
+        for isample in range(4):
+            out = bp.feedforward_vec(weight, data, isample)
+            back = bp.backward_vec(weight, data, isample, out)
+            delta[0] += 0.15 * np.outer(out[0], back[0])
+            delta[1] += 0.15 * np.outer(out[1], back[1])
+        bp.train_batch(weight_full, data, 2, batch_size=4, epsilon=0.15)
+        for w, d, actual in zip(weight, delta, weight_full):
+            np.testing.assert_allclose(w + d, actual)
+
+        # batch_sizeが不正な時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            bp.train_batch(weight, data, 2, batch_size=0)
+
+    def test_network(self):
+        """
+        test method of Network
+        """
+        data = bp.read_data()
+        net = bp.Network(2, 3, 1)
+        weight = bp.init_net(2, 3, 1)
+        buffers = [net.X, net.H, net.Y, net.back_h, net.back_y, net.weight[0], net.weight[1]]
+
+        # 行列版の関数と同じ結果になるかテスト
+        for ilearn in range(5):
+            for isample in range(4):
+                out = bp.feedforward_vec(weight, data, isample)
+                expected_error = np.sum((data[isample][2:] - out[2]) ** 2) / 2.0
+                back = bp.backward_vec(weight, data, isample, out)
+                bp.modify_weights_vec(weight, out, back, epsilon=0.15)
+
+                actual_error = net.train_step(data[isample, :2], data[isample, 2:], epsilon=0.15)
+                self.assertAlmostEqual(expected_error, actual_error)
+                np.testing.assert_allclose(out[1], net.H)
+                np.testing.assert_allclose(out[2], net.Y)
+                np.testing.assert_allclose(back[0], net.back_h)
+                np.testing.assert_allclose(back[1], net.back_y)
+                for expected, actual in zip(weight, net.weight):
+                    np.testing.assert_allclose(expected, actual)
+
+        # 学習中にバッファが作り直されていないかテスト
+        net.train_epoch(data, epsilon=0.15)
+        actual = [net.X, net.H, net.Y, net.back_h, net.back_y, net.weight[0], net.weight[1]]
+        for expected, actual in zip(buffers, actual):
+            self.assertIs(expected, actual)
+
+        # __slots__以外の属性は追加できないかテスト
+        with self.assertRaises(AttributeError):
+            net.extra = 1
+
+        # fit()がNetworkで学習しても、train_batch()を繰り返したのと同じ重みになるかテスト
+        # (FlatParamsのビューを渡した時は、1本の配列がその場で書き換えられるかもテスト)
+        weight = bp.init_net(2, 3, 1)
+        flat = params.FlatParams.from_weight(bp.init_net(2, 3, 1))
+        buffer = flat.data
+        early_stopping = bp.EarlyStopping(threshold=0.0)
+        bp.fit(flat.weight, data, 2, num_learn=5, epsilon=0.15, early_stopping=early_stopping, params=flat)
+        for ilearn in range(5):
+            bp.train_batch(weight, data, 2, epsilon=0.15)
+        for expected, actual in zip(weight, flat.weight):
+            np.testing.assert_allclose(expected, actual)
+        self.assertIs(buffer, flat.data)
+        np.testing.assert_allclose(np.concatenate([w.ravel() for w in weight]), flat.data)
+
+    def test_read_data_mmap(self):
+        """
+        test method of convert_data, read_data_mmap
+        """
+        expected = bp.read_data()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # バイナリ形式に変換してメモリマップで開いた値がテキストと一致するかテスト
+            path = os.path.join(tmp_dir, 'data.npy')
+            bp.convert_data(dst=path, chunk_size=3)
+            actual = bp.read_data_mmap(path)
+            self.assertEqual(type(actual), np.memmap)
+            np.testing.assert_array_equal(expected, actual)
+            # 入力層・出力層のユニット数も変換先に書き出されているかテスト
+            self.assertEqual({'num_input': 2, 'num_output': 1}, bp.read_data_meta(path))
+
+            # バイナリ形式のファイルが無い時はテキスト形式を読み込んでいるかテスト
+            actual = bp.read_data_mmap(os.path.join(tmp_dir, 'none.npy'))
+            self.assertEqual(type(actual), np.ndarray)
+            np.testing.assert_array_equal(expected, actual)
+
+    def test_deep_net(self):
+        """
+        test method of init_deep_net and the batch functions on deep networks
+        """
+        # 層が3つの時はinit_net()と同じ重みになるかテスト
+        for expected, actual in zip(bp.init_net(2, 3, 1), bp.init_deep_net([2, 3, 1])):
+            np.testing.assert_array_equal(expected, actual)
+
+        # 返り値が引数通りの形になっているかテスト
+        sizes = [2, 5, 4, 3, 1]
+        weight = bp.init_deep_net(sizes)
+        self.assertEqual([(3, 5), (6, 4), (5, 3), (4, 1)], [w.shape for w in weight])
+
+        # 重みの修正量が誤差の勾配(数値微分)と一致するかテスト
+        data = bp.read_data()
+        x = data[:, :2]
+        t = data[:, 2:]
+        def calc_total_error(weight):
+            return np.sum((t - bp.feedforward_batch(weight, x)[-1]) ** 2) / 2.0
+        out = bp.feedforward_batch(weight, x)
+        self.assertEqual([(4, 3), (4, 6), (4, 5), (4, 4), (4, 1)], [o.shape for o in out])
+        back = bp.backward_batch(weight, t, out)
+        grad = [np.dot(o.T, b) for o, b in zip(out, back)]
+        h = 1e-6
+        for ilayer in range(len(weight)):
+            for index in np.ndindex(weight[ilayer].shape):
+                original = weight[ilayer][index]
+                weight[ilayer][index] = original + h
+                error_plus = calc_total_error(weight)
+                weight[ilayer][index] = original - h
+                error_minus = calc_total_error(weight)
+                weight[ilayer][index] = original
+                self.assertAlmostEqual(-(error_plus - error_minus) / (2 * h), grad[ilayer][index], places=6)
+
+        # 引数が不正な時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            bp.init_deep_net([2])
+        with self.assertRaises(ValueError):
+            bp.init_deep_net([2, 'test', 1])
+
+    def test_ensemble(self):
+        """
+        test method of init_ensemble, train_ensemble
+        """
+        data = bp.read_data()
+        seeds = [1, 2, 3, 4, 5]
+        sizes = [2, 3, 1]
+
+        # 重みがネットワークの数だけ重ねられているかテスト
+        ensemble = bp.init_ensemble(sizes, seeds)
+        self.assertEqual([(5, 3, 3), (5, 4, 1)], [w.shape for w in ensemble])
+
+        # まとめて学習させた結果が、1つずつ学習させた結果と一致するかテスト
+        for batch_size in [1, 4]:
+            ensemble = bp.init_ensemble(sizes, seeds)
+            weights = [bp.init_deep_net(sizes, seed=seed) for seed in seeds]
+            for ilearn in range(10):
+                actual = bp.train_ensemble(ensemble, data, 2, batch_size=batch_size, epsilon=0.15)
+                expected = [bp.train_batch(weight, data, 2, batch_size=batch_size, epsilon=0.15) for weight in weights]
+                np.testing.assert_allclose(expected, actual)
+            for k, weight in enumerate(weights):
+                for ilayer in range(len(weight)):
+                    np.testing.assert_allclose(weight[ilayer], ensemble[ilayer][k])
+
+        # seedsが不正な時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            bp.init_ensemble(sizes, [])
+
+    def test_evaluate(self):
+        """
+        test method of evaluate
+        """
+        data = bp.read_data()
+        weight = bp.init_net(2, 3, 1)
+
+        # サンプルごとのエラー値がcalc_error()と一致するかテスト
+        bp.NUM_INPUT = 2
+        bp.NUM_OUTPUT = 1
+        errors, total = bp.evaluate(weight, data)
+        expected = [bp.calc_error(isample, data, bp.feedforward_vec(weight, data, isample)) for isample in range(4)]
+        np.testing.assert_allclose(expected, errors)
+        self.assertAlmostEqual(sum(expected), total)
+
+        # 入力された型が不正な時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            bp.evaluate('test', data)
+
+    def test_early_stopping(self):
+        """
+        test method of EarlyStopping
+        """
+        data = bp.read_data()
+        weight = bp.init_net(2, 3, 1)
+
+        # エラー値がthreshold未満になったら止まるかテスト
+        early_stopping = bp.EarlyStopping(threshold=0.1)
+        for ilearn in range(50000):
+            bp.train_batch(weight, data, 2, epsilon=0.15)
+            if early_stopping.check(ilearn, weight, data):
+                break
+        self.assertTrue(early_stopping.converged)
+        self.assertEqual(ilearn, early_stopping.stop_epoch)
+        self.assertLess(bp.evaluate(weight, data)[1], 0.1)
+
+        # interval epochごとにしか評価しないかテスト
+        early_stopping = bp.EarlyStopping(threshold=10.0, interval=3)
+        self.assertFalse(early_stopping.check(0, weight, data))
+        self.assertFalse(early_stopping.check(1, weight, data))
+        self.assertIsNone(early_stopping.last_error)
+        self.assertTrue(early_stopping.check(2, weight, data))
+
+        # 最小値がpatience回更新されなかったら止まるかテスト
+        early_stopping = bp.EarlyStopping(threshold=0.0, patience=2)
+        self.assertFalse(early_stopping.check(0, weight, data))
+        self.assertFalse(early_stopping.check(1, weight, data))
+        self.assertTrue(early_stopping.check(2, weight, data))
+        self.assertFalse(early_stopping.converged)
+
+        # intervalが不正な時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            bp.EarlyStopping(interval=0)
+
+    def test_activation(self):
+        """
+        test of the act argument of the batch functions
+        """
+        data = bp.read_data()
+        # 活性化関数を変えても重みの修正量が誤差の勾配(数値微分)と一致するかテスト
+        for act in ['sigmoid', 'tanh']:
+            weight = bp.init_deep_net([2, 4, 1])
+            x = data[:, :2]
+            t = data[:, 2:]
+            out = bp.feedforward_batch(weight, x, act=act)
+            back = bp.backward_batch(weight, t, out, act=act)
+            grad = np.dot(out[0].T, back[0])
+            h = 1e-6
+            weight[0][0, 0] += h
+            error_plus = bp.evaluate(weight, data, act=act)[1]
+            weight[0][0, 0] -= 2 * h
+            error_minus = bp.evaluate(weight, data, act=act)[1]
+            self.assertAlmostEqual(-(error_plus - error_minus) / (2 * h), grad[0, 0], places=6)
+
+        # 名前の代わりに関数を渡しても同じ結果になるかテスト
+        weight = bp.init_net(2, 3, 1)
+        expected = bp.evaluate(weight, data)[0]
+        actual = bp.evaluate(weight, data, act=activation.sigmoid)[0]
+        np.testing.assert_allclose(expected, actual)
+
+    def test_float32(self):
+        """
+        test of training with config.FLOAT_DTYPE = np.float32
+        """
+        data = bp.read_data()
+        config.set_float_dtype(np.float32)
+        try:
+            weight = bp.init_net(2, 3, 1)
+            deep = bp.init_deep_net([2, 4, 3, 1])
+            ensemble = bp.init_ensemble([2, 3, 1], [1, 2])
+            net = bp.Network(2, 3, 1)
+        finally:
+            config.set_float_dtype(np.float64)
+
+        # 学習中にfloat64に変わっていないかテスト
+        for w in weight + deep + ensemble + net.weight:
+            self.assertEqual(np.float32, w.dtype)
+        bp.train_batch(weight, data, 2, batch_size=2, epsilon=0.15)
+        bp.train_batch(deep, data, 2, epsilon=0.15)
+        bp.train_ensemble(ensemble, data, 2, epsilon=0.15)
+        net.train_epoch(data, epsilon=0.15)
+        for w in weight + deep + ensemble + net.weight + [net.H, net.Y, net.back_h]:
+            self.assertEqual(np.float32, w.dtype)
+        for out in bp.feedforward_batch(deep, data[:, :2]) + bp.feedforward_vec(weight, data, 0):
+            self.assertEqual(np.float32, out.dtype)
+        # 他の活性化関数でも、逆伝播の値がfloat64に変わっていないかテスト
+        for act in ['sigmoid', 'tanh', 'relu']:
+            out = bp.feedforward_batch(deep, data[:, :2], act=act)
+            back = bp.backward_batch(deep, data[:, 2:], out, act=act)
+            for value in out + back:
+                self.assertEqual(np.float32, value.dtype, act)
+
+        # float64で学習させた時とほぼ同じ結果になるかテスト
+        weight64 = bp.init_net(2, 3, 1)
+        bp.train_batch(weight64, data, 2, batch_size=2, epsilon=0.15)
+        for expected, actual in zip(weight64, weight):
+            np.testing.assert_allclose(expected, actual, rtol=1e-5)
+
+    def test_flat_params(self):
+        """
+        test of training with params.FlatParams
+        """
+        data = bp.read_data()
+        for opt_expected, opt_actual in [(None, None), (optimizer.Adam(epsilon=0.05), optimizer.Adam(epsilon=0.05))]:
+            weight = bp.init_deep_net([2, 4, 3, 1])
+            flat = params.FlatParams.from_weight(weight)
+            buffer = flat.data
 
+            # 1本の配列で修正した結果が、層ごとに修正した結果と一致するかテスト
+            for ilearn in range(10):
+                bp.train_batch(weight, data, 2, batch_size=2, epsilon=0.15, optimizer=opt_expected)
+                bp.train_batch(flat.weight, data, 2, batch_size=2, epsilon=0.15, optimizer=opt_actual, params=flat)
+            for expected, actual in zip(weight, flat.weight):
+                np.testing.assert_allclose(expected, actual)
 
+            # 学習後も重みがdataのビューのままかテスト
+            self.assertIs(buffer, flat.data)
+            for view in flat.weight:
+                self.assertFalse(view.flags.owndata)
 
+        # fit()にparamsを渡しても同じ重みになり、Checkpointで1本の配列のまま保存されるかテスト
+        weight = bp.init_net(2, 3, 1)
+        flat = params.FlatParams.from_weight(weight)
+        bp.fit(weight, data, 2, num_learn=5, epsilon=0.15, optimizer=optimizer.Adam(epsilon=0.05))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model')
+            bp.fit(flat.weight, data, 2, num_learn=5, epsilon=0.15, optimizer=optimizer.Adam(epsilon=0.05),
+                   params=flat, callbacks=[callback.Checkpoint(path, interval=5)])
+            model = checkpoint.load_model(path)
+            np.testing.assert_array_equal(flat.data, model['params'].data)
+        for expected, actual in zip(weight, flat.weight):
+            np.testing.assert_allclose(expected, actual)
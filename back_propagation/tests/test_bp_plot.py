@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import tempfile
+import unittest
+import numpy as np
+import bp_plot
+
+
+class test_bp_plot(unittest.TestCase):
+    def test_error_log(self):
+        """
+        test method of ErrorLog and read_error_log
+        """
+        error = np.random.RandomState(1).rand(2500)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'error.bin')
+            log = bp_plot.ErrorLog(path, buffer_size=1000)
+            for value in error[:1500]:
+                log.append(value)
+            # 書き出された分(bufferの大きさの倍数)だけ学習中でも読み込めるかテスト
+            np.testing.assert_array_equal(error[:1000], bp_plot.read_error_log(path))
+            for value in error[1500:]:
+                log.append(value)
+            log.close()
+            self.assertEqual(2500, log.num_value)
+            np.testing.assert_array_equal(error, bp_plot.read_error_log(path))
+
+            # 最後の値が書きかけでも、読める所まで読み込めるかテスト
+            with open(path, mode='ab') as f:
+                f.write(b'\x00\x00\x00')
+            self.assertEqual(2500, bp_plot.read_error_log(path).shape[0])
+
+        with self.assertRaises(ValueError):
+            bp_plot.ErrorLog(path, buffer_size=0)
+
+    def test_downsample_minmax(self):
+        """
+        test method of downsample_minmax
+        """
+        # 点の数が少なければそのまま返すかテスト
+        x, y = bp_plot.downsample_minmax(np.arange(10.0), num_bin=5)
+        np.testing.assert_array_equal(np.arange(10), x)
+        np.testing.assert_array_equal(np.arange(10.0), y)
+
+        error = np.random.RandomState(1).rand(100003)
+        x, y = bp_plot.downsample_minmax(error, num_bin=100, chunk_size=4096)
+        # 点の数が2*num_bin以下で、epochが昇順に並んでいるかテスト
+        self.assertLessEqual(x.shape[0], 200)
+        self.assertTrue(np.all(np.diff(x) > 0))
+        np.testing.assert_array_equal(error[x], y)
+        # 全体の最小値・最大値(山や谷)が消えていないかテスト
+        self.assertIn(np.argmin(error), x)
+        self.assertIn(np.argmax(error), x)
+        # chunk_sizeによらず同じ結果になるかテスト
+        x2, y2 = bp_plot.downsample_minmax(error, num_bin=100, chunk_size=1 << 20)
+        np.testing.assert_array_equal(x, x2)
+        np.testing.assert_array_equal(y, y2)
+
+
+if __name__ == '__main__':
+    unittest.main()
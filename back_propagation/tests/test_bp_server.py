@@ -0,0 +1,68 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import unittest
+import urllib.error
+import numpy as np
+import bp
+import bp_loadgen
+import bp_server
+
+
+class test_bp_server(unittest.TestCase):
+    def setUp(self):
+        self.weight = bp.init_net(2, 3, 1)
+        self.server = bp_server.make_server(self.weight, port=0, max_batch=16, max_wait=0.01)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{}/predict'.format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.server.batcher.close()
+        self.thread.join()
+
+    def test_predict(self):
+        """
+        test method of predict
+        """
+        data = bp.read_data()
+        # 1サンプルずつの順伝播と同じ出力になるかテスト
+        y = bp.predict(self.weight, data[:, :2])
+        self.assertEqual((4, 1), y.shape)
+        for isample in range(data.shape[0]):
+            out = bp.feedforward(self.weight, data, isample)
+            np.testing.assert_allclose(out[2], y[isample])
+        np.testing.assert_allclose(y[0], bp.predict(self.weight, data[0, :2]))
+        np.testing.assert_allclose(y, bp.predict({'weight': self.weight, 'beta': 0.8}, data[:, :2]))
+
+    def test_server(self):
+        """
+        test method of make_server
+        """
+        x = bp.read_data()[:, :2]
+        np.testing.assert_allclose(bp.predict(self.weight, x), bp_loadgen.send_request(self.url, x))
+        # 入力数が合わない要求はエラーになるかテスト
+        with self.assertRaises(urllib.error.HTTPError):
+            bp_loadgen.send_request(self.url, np.zeros((1, 3)))
+
+    def test_run_load(self):
+        """
+        test method of run_load
+        """
+        result = bp_loadgen.run_load(self.url, num_request=200, concurrency=8, seed=1)
+        self.assertEqual(200, result['requests'])
+        self.assertEqual(0, result['errors'])
+        self.assertLessEqual(result['p50'], result['p99'])
+        # 同時に来た要求がまとめて計算されているかテスト
+        stats = self.server.batcher.stats()
+        self.assertEqual(200, stats['requests'])
+        self.assertLess(stats['batches'], stats['requests'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import tempfile
+import unittest
+import numpy as np
+import bp
+import bp_stream
+
+
+class test_bp_stream(unittest.TestCase):
+    def test_iter_chunks(self):
+        """
+        test method of iter_chunks
+        """
+        expected = bp.read_data()
+        # テキスト形式のファイルをチャンクごとに読み込めているかテスト
+        chunks = list(bp_stream.iter_chunks('data.dat', chunk_size=3))
+        self.assertEqual([3, 1], [chunk.shape[0] for chunk in chunks])
+        np.testing.assert_array_equal(expected, np.vstack(chunks))
+
+        # バイナリ形式のファイルをチャンクごとに読み込めているかテスト
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'data.npy')
+            bp.convert_data(dst=path)
+            chunks = list(bp_stream.iter_chunks(path, chunk_size=3))
+            self.assertEqual([3, 1], [chunk.shape[0] for chunk in chunks])
+            np.testing.assert_array_equal(expected, np.vstack(chunks))
+
+        # chunk_sizeが不正な時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            list(bp_stream.iter_chunks('data.dat', chunk_size=0))
+
+    def test_shuffle_buffer(self):
+        """
+        test method of shuffle_buffer
+        """
+        # 全てのサンプルが1回ずつ返されているかテスト
+        samples = list(range(100))
+        actual = list(bp_stream.shuffle_buffer(iter(samples), buffer_size=10, seed=1))
+        self.assertEqual(samples, sorted(actual))
+        # 順番が入れ替わっているかテスト
+        self.assertNotEqual(samples, actual)
+        # 同じシードなら同じ順番になるかテスト
+        self.assertEqual(actual, list(bp_stream.shuffle_buffer(iter(samples), buffer_size=10, seed=1)))
+
+        # buffer_sizeが不正な時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            list(bp_stream.shuffle_buffer(iter(samples), buffer_size=0))
+
+        # バッファに溜めたサンプルがチャンクとメモリを共有していないかテスト
+        chunks = list(bp_stream.iter_chunks('data.dat', chunk_size=3))
+        buffered = list(bp_stream.shuffle_buffer(bp_stream.iter_samples(iter(chunks)), buffer_size=10, seed=1))
+        np.testing.assert_array_equal(np.vstack(chunks), np.array(sorted(buffered, key=tuple)))
+        for sample in buffered:
+            for chunk in chunks:
+                self.assertFalse(np.shares_memory(sample, chunk))
+
+    def test_train_stream(self):
+        """
+        test method of iter_batches, train_stream
+        """
+        data = bp.read_data()
+        # シャッフルしない場合はtrain_batch()と同じ結果になるかテスト
+        for batch_size in [1, 3, 4]:
+            weight_expected = bp.init_net(2, 3, 1)
+            weight_actual = [w.copy() for w in weight_expected]
+            expected = bp.train_batch(weight_expected, data, 2, batch_size=batch_size, epsilon=0.15)
+            batches = bp_stream.iter_batches(bp_stream.iter_samples(bp_stream.iter_chunks('data.dat', 3)), batch_size)
+            actual, num_sample = bp_stream.train_stream(weight_actual, batches, 2, epsilon=0.15)
+            self.assertAlmostEqual(expected, actual)
+            self.assertEqual(4, num_sample)
+            for w_expected, w_actual in zip(weight_expected, weight_actual):
+                np.testing.assert_allclose(w_expected, w_actual)
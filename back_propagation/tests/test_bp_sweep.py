@@ -0,0 +1,59 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import tempfile
+import unittest
+import bp_sweep
+
+
+class test_bp_sweep(unittest.TestCase):
+    def test_make_configs(self):
+        """
+        test method of make_configs
+        """
+        # 全ての組み合わせが作られているかテスト
+        configs = bp_sweep.make_configs([1, 2], [3], [0.1, 0.2], [0.8])
+        self.assertEqual(4, len(configs))
+        self.assertEqual({'seed': 1, 'num_hidden': 3, 'epsilon': 0.1, 'beta': 0.8}, configs[0])
+
+    def test_sweep(self):
+        """
+        test method of run_config, sweep, write_table
+        """
+        configs = bp_sweep.make_configs([1, 2], [3], [0.15], [0.8])
+        results = bp_sweep.sweep(configs, processes=2, num_learn=50)
+
+        # 並列に学習させた結果が直列に学習させた結果と一致するかテスト
+        self.assertEqual(len(configs), len(results))
+        for config, result in zip(configs, results):
+            expected = bp_sweep.run_config(config, num_learn=50)
+            self.assertEqual(expected['converge_epoch'], result['converge_epoch'])
+            self.assertAlmostEqual(expected['final_error'], result['final_error'])
+            for column in bp_sweep.COLUMNS:
+                self.assertIn(column, result)
+
+        # 入力層のユニット数は設定にあればそれを使い、無ければdata.jsonから読むかテスト
+        data = bp_sweep.bp.read_data()
+        config = bp_sweep.make_configs([1], [3], [0.15], [0.8], num_input=2)[0]
+        self.assertEqual(2, config['num_input'])
+        expected = bp_sweep.run_config(configs[0], num_learn=5)
+        actual = bp_sweep.run_config(config, data=data, num_learn=5, data_path='none.dat')
+        self.assertAlmostEqual(expected['final_error'], actual['final_error'])
+        # どちらからも分からなければValueErrorを投げるかテスト
+        with self.assertRaises(ValueError):
+            bp_sweep.run_config(configs[0], data=data, num_learn=5, data_path='none.dat')
+
+        # 収束した時は収束したepochが記録されているかテスト
+        result = bp_sweep.run_config(configs[0], threshold=10.0)
+        self.assertEqual(0, result['converge_epoch'])
+
+        # 表の書き出しのテスト
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'sweep.dat')
+            bp_sweep.write_table(results, path)
+            with open(path, 'r') as f:
+                lines = f.read().splitlines()
+            self.assertEqual(bp_sweep.COLUMNS, lines[0].split())
+            self.assertEqual(len(results)+1, len(lines))
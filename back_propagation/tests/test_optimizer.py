@@ -0,0 +1,91 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import numpy as np
+import bp
+import optimizer
+
+
+def count_epochs(opt, num_learn=50000, threshold=0.001):
+    """
+    収束するまでのepoch数を数える
+    """
+    data = bp.read_data()
+    weight = bp.init_net(2, 3, 1)
+    early_stopping = bp.EarlyStopping(threshold)
+    for ilearn in range(num_learn):
+        bp.train_batch(weight, data, 2, optimizer=opt)
+        if early_stopping.check(ilearn, weight, data):
+            break
+    return ilearn
+
+class test_optimizer(unittest.TestCase):
+    def test_sgd(self):
+        """
+        test method of SGD
+        """
+        # 学習率epsilonで修正した時と同じ結果になるかテスト
+        data = bp.read_data()
+        weight_expected = bp.init_net(2, 3, 1)
+        weight_actual = [w.copy() for w in weight_expected]
+        bp.train_batch(weight_expected, data, 2, epsilon=0.15)
+        bp.train_batch(weight_actual, data, 2, optimizer=optimizer.SGD(epsilon=0.15))
+        for expected, actual in zip(weight_expected, weight_actual):
+            np.testing.assert_allclose(expected, actual)
+
+        # 学習率がfloat以外の時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            optimizer.SGD(epsilon=1)
+
+    def test_momentum(self):
+        """
+        test method of Momentum, Nesterov
+        """
+        grad = [np.array([1.0, -2.0])]
+        for cls in [optimizer.Momentum, optimizer.Nesterov]:
+            # 状態の配列がその場で更新され続けているかテスト
+            weight = [np.zeros(2)]
+            opt = cls(epsilon=0.1, momentum=0.5)
+            opt.update(weight, grad)
+            velocity = opt.state['velocity'][0]
+            opt.update(weight, grad)
+            self.assertIs(velocity, opt.state['velocity'][0])
+            np.testing.assert_allclose([0.15, -0.3], velocity)
+
+        # 2回修正した後の重みが式通りになっているかテスト
+        weight = [np.zeros(2)]
+        opt = optimizer.Momentum(epsilon=0.1, momentum=0.5)
+        opt.update(weight, grad)
+        opt.update(weight, grad)
+        np.testing.assert_allclose([0.1 + 0.15, -0.2 - 0.3], weight[0])
+        weight = [np.zeros(2)]
+        opt = optimizer.Nesterov(epsilon=0.1, momentum=0.5)
+        opt.update(weight, grad)
+        opt.update(weight, grad)
+        np.testing.assert_allclose([0.15 + 0.175, -0.3 - 0.35], weight[0])
+
+    def test_adam(self):
+        """
+        test method of Adam
+        """
+        # 1回目の修正の大きさがほぼ学習率になっているかテスト
+        weight = [np.zeros(3)]
+        grad = [np.array([0.5, -2.0, 0.0])]
+        opt = optimizer.Adam(epsilon=0.01)
+        opt.update(weight, grad)
+        np.testing.assert_allclose([0.01, -0.01, 0.0], weight[0], atol=1e-6)
+        # 渡した修正量が書き換えられていないかテスト
+        np.testing.assert_array_equal([0.5, -2.0, 0.0], grad[0])
+
+    def test_convergence(self):
+        """
+        モーメンタム法を使うと収束までのepoch数が減るかテスト
+        """
+        epochs_sgd = count_epochs(optimizer.SGD(epsilon=0.15), threshold=0.05)
+        epochs_momentum = count_epochs(optimizer.Momentum(epsilon=0.15, momentum=0.9), threshold=0.05)
+        epochs_nesterov = count_epochs(optimizer.Nesterov(epsilon=0.15, momentum=0.9), threshold=0.05)
+        self.assertLess(epochs_momentum, epochs_sgd)
+        self.assertLess(epochs_nesterov, epochs_sgd)
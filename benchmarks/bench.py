@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for sub in ['back_propagation', 'RNN', 'Q', 'SARSA']:
+    sys.path.append(os.path.join(ROOT, sub))
+
+import bp
+import rnn
+import q
+import sarsa
+# (bp・rnnがルートのディレクトリをsys.pathに加えるので、その後でimportする)
+import activation
+
+# ベースラインのファイル(このファイルと同じディレクトリ)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# 測定する条件(quick=Trueの時は小さい条件だけ、回数も少なくする)
+BP_SIZES = [[2, 3, 1], [16, 32, 4], [64, 128, 16]]
+BP_BATCH_SIZES = [1, 32]
+RNN_HIDDENS = [3, 8]
+RNN_LENGTHS = [300, 3000]
+ELMAN_HIDDENS = [3, 100]
+ENSEMBLE_SEEDS = 12
+MAZE_SIZES = [(11, 19), (21, 39)]
+
+
+def best_time(func, repeat=3):
+    """
+    funcを1回空実行してから、repeat回実行して最も短い実行時間を返す
+    input:
+        func: 引数なしで呼び出せる関数
+        repeat: int 繰り返す回数
+    output:
+        seconds: float 最も短い実行時間(秒)
+    """
+    if ((type(repeat) != int) or (repeat < 1)):
+        raise ValueError
+    # 初回だけ遅くなる分(メモリの確保など)を測らないように、1回空実行する
+    func()
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+def bench_sigmoid_scalar(num_call=10000, repeat=3):
+    """
+    1ユニットずつ計算するループ(rnn.feedforward()など)と同じように、
+    activation.sigmoid()をPythonのfloatで呼び出した時の、1秒あたりの呼び出し回数を測る
+    input:
+        num_call: int 1回の測定で呼び出す回数
+        repeat: int 繰り返す回数(最も速い回を使う)
+    output:
+        calls_per_sec: float
+    """
+    xs = [float(x) for x in np.linspace(-10.0, 10.0, num_call)]
+
+    def calls():
+        for x in xs:
+            activation.sigmoid(x, 0.8)
+
+    return num_call / best_time(calls, repeat)
+
+def bench_bp(sizes, batch_size=1, num_sample=256, repeat=3):
+    """
+    bp.train_batch()で1秒あたりに学習できるサンプル数を測る
+    input:
+        sizes: リスト [入力層, 隠れ層, ..., 出力層]のユニット数
+        batch_size: int 1回の修正に使うサンプル数
+        num_sample: int 1epochのサンプル数
+        repeat: int 繰り返す回数(最も速い回を使う)
+    output:
+        samples_per_sec: float
+    """
+    weight = bp.init_deep_net(sizes, seed=1)
+    rand = np.random.RandomState(1)
+    data = rand.randint(2, size=(num_sample, sizes[0] + sizes[-1])).astype(weight[0].dtype)
+    seconds = best_time(lambda: bp.train_batch(weight, data, sizes[0], batch_size=batch_size), repeat)
+    return num_sample / seconds
+
+def bench_rnn(num_hidden, length, repeat=3):
+    """
+    rnn.pyの順伝播・逆伝播・重みの修正で、1秒あたりに学習できるビット数を測る
+    input:
+        num_hidden: int 隠れ層(コンテキスト層)のユニット数
+        length: int 1epochのビット数
+        repeat: int 繰り返す回数(最も速い回を使う)
+    output:
+        bits_per_sec: float
+    """
+    # 1ビットずつの関数はモジュールのユニット数を使うので、測る間だけ書き換えて元に戻す
+    names = ['NUM_INPUT', 'NUM_HIDDEN', 'NUM_CONTEXT', 'NUM_OUTPUT']
+    saved = [getattr(rnn, name) for name in names]
+    for name, value in zip(names, [1, num_hidden, num_hidden, 1]):
+        setattr(rnn, name, value)
+    try:
+        np.random.seed(seed=1)
+        data = rnn.init_data(length)
+        weight = rnn.init_net(1, num_hidden, num_hidden, 1)
+
+        def epoch():
+            context = np.zeros(num_hidden)
+            for isample in range(length):
+                out = rnn.feedforward(weight, data, isample, context)
+                context = out[1]
+                back = rnn.backward(weight, data, isample, out)
+                rnn.modify_weights(weight, out, back, epsilon=0.1)
+
+        return length / best_time(epoch, repeat)
+    finally:
+        for name, value in zip(names, saved):
+            setattr(rnn, name, value)
+
+def bench_elman(num_hidden, length, repeat=3):
+    """
+    rnn.Elman.train_epoch()で、1秒あたりに学習できるビット数を測る
+    input:
+        num_hidden: int 隠れ層(コンテキスト層)のユニット数
+        length: int 1epochのビット数
+        repeat: int 繰り返す回数(最も速い回を使う)
+    output:
+        bits_per_sec: float
+    """
+    np.random.seed(seed=1)
+    data = rnn.make_bits(length)
+    net = rnn.Elman(1, num_hidden, num_hidden, 1)
+    return length / best_time(lambda: net.train_epoch(data, epsilon=0.1), repeat)
+
+def bench_ensemble(num_hidden, length, num_seed=ENSEMBLE_SEEDS, repeat=3):
+    """
+    rnn.ElmanEnsemble.train_epoch()でnum_seed個のネットワークをまとめて学習させ、
+    1秒あたりに学習できるビット数(全てのネットワークの合計)を測る
+    input:
+        num_hidden: int 隠れ層(コンテキスト層)のユニット数
+        length: int 1epochのビット数
+        num_seed: int まとめて学習させるネットワークの数
+        repeat: int 繰り返す回数(最も速い回を使う)
+    output:
+        bits_per_sec: float
+    """
+    weight, data, context = rnn.init_seeds(list(range(1, num_seed+1)), length, 1, num_hidden, num_hidden, 1)
+    net = rnn.ElmanEnsemble(1, num_hidden, num_hidden, 1, weight, context=context)
+    return length * num_seed / best_time(lambda: net.train_epoch(data, epsilon=0.1), repeat)
+
+def run_episodes(module, row, col, num_episode=20, num_step=1000, epsilon=0.7, alpha=0.1, gamma=0.9):
+    """
+    q.pyかsarsa.pyの学習ループをnum_episodeエピソード実行する
+    input:
+        module: q か sarsa
+        row, col: int 迷路の大きさ
+        num_episode: int エピソード数
+        num_step: int 1エピソードの最大ステップ数
+        epsilon, alpha, gamma: float 各プログラムの__main__と同じ定数
+    output:
+        num_total: int 実行したステップ数の合計
+    """
+    start_pos = [row-1, 0]
+    goal_pos = [row-1, col-1]
+    np.random.seed(seed=1)
+    maze = module.init_map(row, col, start_pos=start_pos, goal_pos=goal_pos)
+    q_table = module.init_qtable(row, col)
+    num_total = 0
+    for _ in range(num_episode):
+        agent = module.Agent(start_pos=start_pos)
+        agent.current_action = agent.decide_action(agent.current_pos, q_table, epsilon)
+        istep = 0
+        while True:
+            agent.move_agent(row=row, col=col)
+            reward = agent.cal_reward(maze, row=row, col=col)
+            agent.next_action = agent.decide_action(agent.next_pos, q_table, epsilon)
+            now_x, now_y = agent.current_pos
+            q_table[now_x, now_y, agent.current_action] = module.update_q(q_table, agent, reward, alpha, gamma)
+            agent.move_state(maze)
+            istep += 1
+            if (agent.current_pos == goal_pos) | (istep == num_step):
+                break
+        num_total += istep
+    return num_total
+
+def bench_maze(module, row, col, num_episode=20, repeat=3):
+    """
+    q.pyかsarsa.pyの学習で、1秒あたりに進められる環境のステップ数を測る
+    input:
+        module: q か sarsa
+        row, col: int 迷路の大きさ
+        num_episode: int 1回の測定のエピソード数
+        repeat: int 繰り返す回数(最も速い回を使う)
+    output:
+        steps_per_sec: float
+    """
+    steps = []
+    seconds = best_time(lambda: steps.append(run_episodes(module, row, col, num_episode)), repeat)
+    # 乱数シードを固定しているので、毎回同じステップ数になる
+    return steps[-1] / seconds
+
+def run_all(quick=False, repeat=3):
+    """
+    全ての条件で測定する
+    input:
+        quick: bool Trueなら各アルゴリズムの最も小さい条件だけを測る
+        repeat: int 繰り返す回数
+    output:
+        results: 辞書 {条件の名前: {'value': 測定値, 'unit': 単位}}
+    """
+    bp_sizes = BP_SIZES[:1] if quick else BP_SIZES
+    rnn_hiddens = RNN_HIDDENS[:1] if quick else RNN_HIDDENS
+    rnn_lengths = RNN_LENGTHS[:1] if quick else RNN_LENGTHS
+    elman_hiddens = ELMAN_HIDDENS[:1] if quick else ELMAN_HIDDENS
+    maze_sizes = MAZE_SIZES[:1] if quick else MAZE_SIZES
+    num_episode = 2 if quick else 20
+
+    results = {}
+    results['activation/sigmoid/scalar'] = {'value': bench_sigmoid_scalar(repeat=repeat), 'unit': 'calls/sec'}
+    for sizes in bp_sizes:
+        for batch_size in BP_BATCH_SIZES:
+            name = 'bp/{}/batch{}'.format('-'.join(map(str, sizes)), batch_size)
+            results[name] = {'value': bench_bp(sizes, batch_size, repeat=repeat), 'unit': 'samples/sec'}
+    for num_hidden in rnn_hiddens:
+        for length in rnn_lengths:
+            name = 'rnn/hidden{}/len{}'.format(num_hidden, length)
+            results[name] = {'value': bench_rnn(num_hidden, length, repeat=repeat), 'unit': 'bits/sec'}
+    for num_hidden in elman_hiddens:
+        for length in rnn_lengths:
+            name = 'rnn/elman/hidden{}/len{}'.format(num_hidden, length)
+            results[name] = {'value': bench_elman(num_hidden, length, repeat=repeat), 'unit': 'bits/sec'}
+            name = 'rnn/ensemble{}/hidden{}/len{}'.format(ENSEMBLE_SEEDS, num_hidden, length)
+            results[name] = {'value': bench_ensemble(num_hidden, length, repeat=repeat), 'unit': 'bits/sec'}
+    for module in [q, sarsa]:
+        for row, col in maze_sizes:
+            # 短い測定は初回の分の影響が大きいので、エピソード数の違う結果を比べないよう名前に入れる
+            name = '{}/{}x{}/ep{}'.format(module.__name__, row, col, num_episode)
+            results[name] = {'value': bench_maze(module, row, col, num_episode, repeat=repeat), 'unit': 'steps/sec'}
+    return results
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    測定結果をベースラインと比べる(どの測定値も大きいほど速い)
+    input:
+        results: 辞書 run_all()の結果
+        baseline: 辞書 保存してあるrun_all()の結果
+        tolerance: float ベースラインからこの割合以上遅くなったら性能低下とみなす
+    output:
+        rows: リスト (条件の名前, ベースライン, 今回, 今回/ベースライン, 'ok'か'slower'か'faster')
+            ベースラインに無い条件は含まない
+    """
+    rows = []
+    for name in sorted(results):
+        if (name not in baseline):
+            continue
+        base = baseline[name]['value']
+        value = results[name]['value']
+        ratio = value / base
+        if (ratio < 1.0 - tolerance):
+            status = 'slower'
+        elif (ratio > 1.0 + tolerance):
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, base, value, ratio, status))
+    return rows
+
+def read_results(path):
+    """
+    write_results()で書き出した結果を読み込む
+    input:
+        path: str JSONファイル
+    output:
+        results: 辞書 {条件の名前: {'value': 測定値, 'unit': 単位}}
+    """
+    with open(path, 'r') as f:
+        return json.load(f)['results']
+
+def write_results(results, path):
+    """
+    測定結果を測定した環境と一緒にJSONで書き出す
+    input:
+        results: 辞書 run_all()の結果
+        path: str 書き出すJSONファイル
+    output:
+        なし
+    """
+    record = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, mode='w') as f:
+        json.dump(record, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='bp・RNN・Q学習・SARSAの学習速度を測る')
+    parser.add_argument('--quick', action='store_true', help='小さい条件だけを測る')
+    parser.add_argument('--repeat', type=int, default=3, help='繰り返す回数(最も速い回を使う)')
+    parser.add_argument('--output', default=None, help='測定結果を書き出すJSONファイル')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='比べるベースラインのJSONファイル')
+    parser.add_argument('--save-baseline', action='store_true', help='測定結果をベースラインとして保存する')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='性能低下とみなす割合')
+    args = parser.parse_args()
+
+    results = run_all(quick=args.quick, repeat=args.repeat)
+    for name in sorted(results):
+        print('{:<34}{:>14.1f} {}'.format(name, results[name]['value'], results[name]['unit']))
+    if (args.output is not None):
+        write_results(results, args.output)
+
+    if (args.save_baseline):
+        write_results(results, args.baseline)
+        print('\nbaseline saved to {}'.format(args.baseline))
+    elif (os.path.exists(args.baseline)):
+        rows = compare(results, read_results(args.baseline), args.tolerance)
+        print('\n{:<34}{:>14}{:>14}{:>8}'.format('name', 'baseline', 'current', 'ratio'))
+        for name, base, value, ratio, status in rows:
+            print('{:<34}{:>14.1f}{:>14.1f}{:>8.2f} {}'.format(name, base, value, ratio, status))
+        # 性能が低下した条件があれば終了コード1で終わる
+        if any(row[4] == 'slower' for row in rows):
+            sys.exit(1)
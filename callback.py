@@ -0,0 +1,189 @@
+import checkpoint
+
+
+class Callback():
+    """
+    学習ループの途中で呼び出される処理(コールバック)の基底クラス。
+    必要なメソッドだけを上書きして、bp.fit()・rnn.fit()などにcallbacks=[...]として渡す。
+    上書きしていないメソッドは呼び出されない。
+    logsには各学習関数がその時点の値(エラー値・重みなど)を辞書で渡す。
+    """
+    def on_epoch_start(self, epoch, logs):
+        """
+        各epochの学習を始める前に呼び出される
+        input:
+            epoch: int 学習の繰り返し回数
+            logs: 辞書 学習関数が渡す値
+        output:
+            なし
+        """
+        pass
+
+    def on_epoch_end(self, epoch, logs):
+        """
+        各epochの学習が終わった後に呼び出される
+        input:
+            epoch: int 学習の繰り返し回数
+            logs: 辞書 学習関数が渡す値
+        output:
+            stop: bool Trueを返すと学習を止める
+        """
+        return False
+
+    def on_sample(self, isample, logs):
+        """
+        サンプル(バッチ)ごとに、順伝播の後・重みの修正の前に呼び出される
+        input:
+            isample: int サンプル番号(バッチの場合は先頭のサンプル番号)
+            logs: 辞書 学習関数が渡す値
+        output:
+            なし
+        """
+        pass
+
+    def on_converge(self, epoch, logs):
+        """
+        エラー値が閾値を下回って学習が収束した時に呼び出される
+        input:
+            epoch: int 収束したepoch
+            logs: 辞書 学習関数が渡す値
+        output:
+            なし
+        """
+        pass
+
+class CallbackList():
+    """
+    複数のコールバックをまとめて呼び出すクラス。
+    各メソッドを上書きしたコールバックだけを登録時に選んでおくので、
+    上書きしたものが無ければ何も呼び出さない。
+    """
+    def __init__(self, callbacks):
+        """
+        CallbackListクラスのコンストラクタ
+        input:
+            callbacks: リスト Callbackのオブジェクトのリスト
+        """
+        if (type(callbacks) != list):
+            raise ValueError
+        self.callbacks = callbacks
+        self.epoch_start = self._hooks('on_epoch_start')
+        self.epoch_end = self._hooks('on_epoch_end')
+        self.sample = self._hooks('on_sample')
+        self.converge = self._hooks('on_converge')
+
+    def _hooks(self, name):
+        """
+        メソッドnameを上書きしたコールバックの、そのメソッドのリストを返す
+        """
+        return [getattr(callback, name) for callback in self.callbacks
+                if getattr(type(callback), name) is not getattr(Callback, name)]
+
+    def on_epoch_start(self, epoch, logs):
+        for hook in self.epoch_start:
+            hook(epoch, logs)
+
+    def on_epoch_end(self, epoch, logs):
+        # 1つでもTrueを返せば学習を止める(残りのコールバックも全て呼び出す)
+        stop = False
+        for hook in self.epoch_end:
+            if hook(epoch, logs):
+                stop = True
+        return stop
+
+    def on_sample(self, isample, logs):
+        for hook in self.sample:
+            hook(isample, logs)
+
+    def on_converge(self, epoch, logs):
+        for hook in self.converge:
+            hook(epoch, logs)
+
+def make_callbacks(callbacks):
+    """
+    学習関数に渡されたcallbacksを、CallbackListかNoneにする。
+    学習関数はNoneの時にコールバックに関する処理を一切しない。
+    input:
+        callbacks: リスト Callbackのオブジェクトのリスト、CallbackList、またはNone
+    output:
+        callback_list: CallbackList(登録されたコールバックが無ければNone)
+    """
+    if (callbacks is None):
+        return None
+    if (type(callbacks) != CallbackList):
+        callbacks = CallbackList(callbacks)
+    if (len(callbacks.callbacks) == 0):
+        return None
+    return callbacks
+
+class PrintEpoch(Callback):
+    """
+    interval epochごとに学習の繰り返し回数をプリントするコールバック
+    """
+    def __init__(self, interval=1000):
+        """
+        PrintEpochクラスのコンストラクタ
+        input:
+            interval: int 何epochごとにプリントするか
+        """
+        if ((type(interval) != int) or (interval < 1)):
+            raise ValueError
+        self.interval = interval
+
+    def on_epoch_start(self, epoch, logs):
+        if (epoch % self.interval) == 0:
+            print('# of learning : {}'.format(epoch))
+
+class Checkpoint(Callback):
+    """
+    interval epochごとと収束した時に、logs['weight']の重みをcheckpoint.save_model()で保存するコールバック
+    (logs['params']にparams.FlatParamsがあれば、1本に並べた配列をそのまま保存する)
+    """
+    def __init__(self, path, interval=1000, kind='bp', beta=0.8):
+        """
+        Checkpointクラスのコンストラクタ
+        input:
+            path: str 保存先(拡張子を除いたファイル名)
+            interval: int 何epochごとに保存するか
+            kind: str ネットワークの種類('bp'、'rnn'など)
+            beta: float シグモイド関数に使われる定数
+        """
+        if ((type(interval) != int) or (interval < 1)):
+            raise ValueError
+        self.path = path
+        self.interval = interval
+        self.kind = kind
+        self.beta = beta
+
+    def save(self, epoch, logs):
+        weight = logs['weight'] if logs.get('params') is None else logs['params']
+        checkpoint.save_model(self.path, weight, kind=self.kind, beta=self.beta, extra={'epoch': epoch})
+
+    def on_epoch_end(self, epoch, logs):
+        if ((epoch + 1) % self.interval) == 0:
+            self.save(epoch, logs)
+        return False
+
+    def on_converge(self, epoch, logs):
+        self.save(epoch, logs)
+
+class EmitProfile(Callback):
+    """
+    各epochの終わりにprofiler.Profilerの集計結果を書き出すコールバック
+    """
+    def __init__(self, prof, **fields):
+        """
+        EmitProfileクラスのコンストラクタ
+        input:
+            prof: profiler.Profiler 学習関数にも同じものを渡す
+            fields: 乱数シードなど、毎回一緒に書き出す値
+        """
+        self.prof = prof
+        self.fields = fields
+
+    def on_epoch_end(self, epoch, logs):
+        # logsの値のうち、JSONにできる数値だけを一緒に書き出す
+        values = {key: float(value) for key, value in logs.items()
+                  if isinstance(value, (int, float)) and not isinstance(value, bool)}
+        self.prof.emit(epoch=epoch, **dict(self.fields, **values))
+        return False
@@ -0,0 +1,95 @@
+import json
+import numpy as np
+from params import FlatParams
+
+
+def save_model(path, weight, kind='bp', beta=0.8, optimizer=None, extra=None):
+    """
+    学習済みの重み・ネットワークの形・beta・最適化手法の状態を保存する。
+    以下の3つのファイルに書き出す。
+        path.npy : 全ての層の重みを1本に並べた配列(メモリマップで開ける)
+        path.json: ネットワークの種類・各層の形・型・beta・最適化手法の設定など
+        path.opt.npz: 最適化手法の状態の配列(optimizerを指定した時だけ)
+    input:
+        path: str 保存先(拡張子を除いたファイル名)
+        weight: リスト 各層の重み(np.array)が格納されたリスト、またはparams.FlatParams
+            (FlatParamsならコピーせずに、1本の配列をそのまま書き出す)
+        kind: str ネットワークの種類('bp'、'rnn'など)
+        beta: float シグモイド関数に使われる定数
+        optimizer: optimizer.pyのクラスのオブジェクト(Noneなら保存しない)
+        extra: 辞書 学習の途中経過(epoch数など)、JSONにできる値
+    output:
+        なし
+    """
+    if (isinstance(weight, FlatParams)):
+        params = weight
+    elif (type(weight) == list):
+        params = FlatParams.from_weight(weight, with_grad=False)
+    else:
+        raise ValueError
+    np.save(path + '.npy', params.data)
+
+    meta = {
+        'kind': kind,
+        'shapes': [list(shape) for shape in params.shapes],
+        'dtype': params.data.dtype.name,
+        'beta': beta,
+        'optimizer': None,
+        'extra': extra if extra is not None else {},
+    }
+    if (optimizer is not None):
+        # 状態の配列以外の属性(学習率・修正回数など)は設定としてJSONに書く
+        settings = {key: value for key, value in vars(optimizer).items() if key != 'state'}
+        meta['optimizer'] = {'class': type(optimizer).__name__, 'settings': settings,
+                             'state': {name: len(arrays) for name, arrays in optimizer.state.items()}}
+        arrays = {}
+        for name, state in optimizer.state.items():
+            for i, array in enumerate(state):
+                arrays['{}_{}'.format(name, i)] = array
+        np.savez(path + '.opt.npz', **arrays)
+
+    with open(path + '.json', mode='w') as f:
+        json.dump(meta, f, indent=2)
+
+def load_model(path, mmap=False, optimizer=None):
+    """
+    save_model()で保存したモデルを読み込む
+    input:
+        path: str 保存先(拡張子を除いたファイル名)
+        mmap: bool Trueなら重みを読み取り専用のメモリマップで開く(推論用)。
+            Falseならメモリに読み込み、学習を再開できるようにする
+        optimizer: optimizer.pyのクラスのオブジェクト。
+            指定すると保存されていた設定と状態をこのオブジェクトに戻す(保存時と同じクラスであること)
+    output:
+        model: 辞書
+            'kind': str ネットワークの種類
+            'beta': float シグモイド関数に使われる定数
+            'params': params.FlatParams 重み
+            'weight': リスト 各層の重み(params.weight)
+            'optimizer': 状態を戻したoptimizer(指定しなければNone)
+            'extra': 辞書 保存時に指定した学習の途中経過
+    """
+    with open(path + '.json', 'r') as f:
+        meta = json.load(f)
+
+    data = np.load(path + '.npy', mmap_mode='r' if mmap else None)
+    params = FlatParams(meta['shapes'], buffer=data, with_grad=not mmap)
+
+    if (optimizer is not None):
+        saved = meta['optimizer']
+        if ((saved is None) or (saved['class'] != type(optimizer).__name__)):
+            raise ValueError
+        for key, value in saved['settings'].items():
+            setattr(optimizer, key, value)
+        with np.load(path + '.opt.npz') as arrays:
+            optimizer.state = {name: [arrays['{}_{}'.format(name, i)] for i in range(num)]
+                               for name, num in saved['state'].items()}
+
+    return {
+        'kind': meta['kind'],
+        'beta': meta['beta'],
+        'params': params,
+        'weight': params.weight,
+        'optimizer': optimizer,
+        'extra': meta['extra'],
+    }
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+# ネットワークの重み・Qテーブルなどの実数の配列に使う型
+FLOAT_DTYPE = np.float64
+# 迷路の配列に使う型(0:道 1:スタート 2:ゴール 3:落とし穴 が入れば良い)
+MAP_DTYPE = np.int8
+
+def set_float_dtype(dtype):
+    """
+    実数の配列に使う型を変更する。
+    変更後にinit_net()・init_qtable()などで作った配列から、この型で計算されるようになる。
+    input:
+        dtype: np.float32 か np.float64
+    output:
+        なし
+    """
+    global FLOAT_DTYPE
+    dtype = np.dtype(dtype)
+    if (dtype not in (np.dtype(np.float32), np.dtype(np.float64))):
+        raise ValueError
+    FLOAT_DTYPE = dtype.type
+
+def set_map_dtype(dtype):
+    """
+    迷路の配列に使う型を変更する
+    input:
+        dtype: 整数型(np.int8など)
+    output:
+        なし
+    """
+    global MAP_DTYPE
+    dtype = np.dtype(dtype)
+    if (not np.issubdtype(dtype, np.integer)):
+        raise ValueError
+    MAP_DTYPE = dtype.type
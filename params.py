@@ -0,0 +1,86 @@
+import multiprocessing
+import numpy as np
+import config
+
+
+class FlatParams():
+    """
+    全ての層の重みを1本の連続した配列(data)に並べて持つクラス。
+    各層の重み(weight)はdataのビュー(np.ndarray)なので、今までの重みのリストと同じように使える。
+    重みの修正量(grad)も同じ並びで1本の配列に持つため、
+    最適化・保存・勾配のノルム・プロセス間の共有を配列1本に対する操作で行える。
+    """
+    def __init__(self, shapes, dtype=None, shared=False, buffer=None, with_grad=True):
+        """
+        FlatParamsクラスのコンストラクタ
+        input:
+            shapes: リスト 各層の重みの形 [(行, 列), ...]
+            dtype: 重みの型(Noneならconfig.FLOAT_DTYPE)
+            shared: bool Trueならプロセス間で共有できるメモリ(multiprocessing.RawArray)に確保する
+            buffer: np.array 重みを並べた既存の1次元配列(指定した時はコピーせずにそのまま使う)
+            with_grad: bool Falseなら修正量の配列を確保しない(推論だけに使う時)
+        """
+        self.shapes = [tuple(shape) for shape in shapes]
+        self.sizes = [int(np.prod(shape)) for shape in self.shapes]
+        num_param = sum(self.sizes)
+
+        if (buffer is not None):
+            if ((buffer.ndim != 1) or (buffer.shape[0] != num_param)):
+                raise ValueError
+            self.data = buffer
+        else:
+            dtype = np.dtype(config.FLOAT_DTYPE if dtype is None else dtype)
+            if (shared):
+                raw = multiprocessing.RawArray('f' if dtype == np.float32 else 'd', num_param)
+                self.data = np.frombuffer(raw, dtype=dtype)
+            else:
+                self.data = np.zeros(num_param, dtype=dtype)
+        self.weight = self.views(self.data)    # 各層の重み(dataのビュー)
+        self.grad = None                       # 全ての層の修正量を並べた配列
+        self.grad_views = None                 # 各層の修正量(gradのビュー)
+        if (with_grad):
+            self.grad = np.zeros(num_param, dtype=self.data.dtype)
+            self.grad_views = self.views(self.grad)
+
+    @classmethod
+    def from_weight(cls, weight, shared=False, with_grad=True):
+        """
+        今までの重みのリストから、値をコピーしたFlatParamsを作る
+        input:
+            weight: リスト 各層の重み(np.array)が格納されたリスト
+            shared: bool Trueならプロセス間で共有できるメモリに確保する
+            with_grad: bool Falseなら修正量の配列を確保しない(重みだけを1本に並べたい時)
+        output:
+            params: FlatParams
+        """
+        if (type(weight) != list):
+            raise ValueError
+        params = cls([w.shape for w in weight], dtype=weight[0].dtype, shared=shared, with_grad=with_grad)
+        for view, w in zip(params.weight, weight):
+            view[...] = w
+        return params
+
+    def views(self, buffer):
+        """
+        1次元配列を各層の形に区切ったビューのリストを返す(コピーはしない)
+        input:
+            buffer: np.array dataと同じ長さの1次元配列
+        output:
+            views: リスト 各層の形のnp.arrayのリスト
+        """
+        views = []
+        start = 0
+        for shape, size in zip(self.shapes, self.sizes):
+            views.append(buffer[start:start+size].reshape(shape))
+            start += size
+        return views
+
+    def grad_norm(self):
+        """
+        全ての層の修正量をまとめたL2ノルムを返す
+        input:
+            なし
+        output:
+            norm: float
+        """
+        return float(np.sqrt(np.dot(self.grad, self.grad)))
@@ -0,0 +1,126 @@
+import json
+import os
+import sys
+import time
+
+
+# この環境変数に出力先のファイル名を設定すると計測が有効になる('-'なら標準エラー出力)
+ENV_NAME = 'ML_PROFILE'
+
+class Profiler():
+    """
+    学習ループの処理(順伝播・逆伝播・重みの修正など)ごとに、かかった時間と回数を集計するクラス。
+    1epoch(1エピソード)ごとにemit()を呼ぶと、集計結果を1行のJSONとして書き出してリセットする。
+        t = prof.start()
+        out = feedforward(...)
+        prof.stop('forward', t)
+    """
+    enabled = True
+
+    def __init__(self, stream=None):
+        """
+        Profilerクラスのコンストラクタ
+        input:
+            stream: 書き出し先のファイルオブジェクト(Noneなら標準エラー出力)
+        """
+        self.stream = stream if stream is not None else sys.stderr
+        self.times = {}          # 処理の名前: 合計時間(秒)
+        self.counts = {}         # 処理の名前: 回数
+
+    def start(self):
+        """
+        計測を開始する
+        input:
+            なし
+        output:
+            start: float 開始時刻(stop()に渡す)
+        """
+        return time.perf_counter()
+
+    def stop(self, name, start):
+        """
+        start()からの経過時間を処理nameに足し込む
+        input:
+            name: str 処理の名前
+            start: float start()が返した開始時刻
+        output:
+            なし
+        """
+        elapsed = time.perf_counter() - start
+        self.times[name] = self.times.get(name, 0.0) + elapsed
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def summary(self):
+        """
+        これまでの集計結果を返す
+        input:
+            なし
+        output:
+            phases: 辞書 {処理の名前: {'seconds': 合計時間, 'count': 回数}}
+        """
+        return {name: {'seconds': self.times[name], 'count': self.counts[name]} for name in self.times}
+
+    def emit(self, **fields):
+        """
+        集計結果を1行のJSONとして書き出し、集計をリセットする
+        input:
+            fields: epoch数・エラー値など、一緒に書き出す値
+        output:
+            なし
+        """
+        record = dict(fields)
+        record['phases'] = self.summary()
+        self.stream.write(json.dumps(record) + '\n')
+        self.stream.flush()
+        self.times = {}
+        self.counts = {}
+
+    def close(self):
+        """
+        書き出し先のファイルを閉じる(標準出力・標準エラー出力は閉じない)
+        """
+        if (self.stream not in (sys.stdout, sys.stderr)):
+            self.stream.close()
+
+class NullProfiler(Profiler):
+    """
+    計測が無効な時に使う、何もしないProfiler。
+    呼び出し側で有効/無効を分岐しなくて済むように同じメソッドを持つ。
+    """
+    enabled = False
+
+    def __init__(self):
+        self.stream = None
+        self.times = {}
+        self.counts = {}
+
+    def start(self):
+        return 0.0
+
+    def stop(self, name, start):
+        pass
+
+    def emit(self, **fields):
+        pass
+
+    def close(self):
+        pass
+
+# 計測が無効な時に共通で使うオブジェクト
+NULL = NullProfiler()
+
+def get_profiler(path=None):
+    """
+    Profilerを作る。pathも環境変数ML_PROFILEも指定されていなければ、何もしないNULLを返す
+    input:
+        path: str 書き出し先のファイル名('-'なら標準エラー出力)。Noneなら環境変数ML_PROFILEを使う
+    output:
+        prof: Profiler か NullProfiler
+    """
+    if (path is None):
+        path = os.environ.get(ENV_NAME, '')
+    if (path == ''):
+        return NULL
+    if (path == '-'):
+        return Profiler()
+    return Profiler(open(path, mode='w'))
@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import warnings
+import numpy as np
+import activation
+
+
+class test_activation(unittest.TestCase):
+    def test_sigmoid(self):
+        """
+        test method of sigmoid, sigmoid_deriv
+        """
+        # 今までの式と同じ値になるかテスト
+        x = np.linspace(-10, 10, 101)
+        expected = 1.0 / (1.0 + np.exp(x * -0.8))
+        np.testing.assert_allclose(expected, activation.sigmoid(x, 0.8))
+        self.assertEqual(expected[3], activation.sigmoid(x[3], 0.8))
+
+        # 大きな負の入力でもオーバーフローの警告を出さないかテスト
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            np.testing.assert_allclose([0.0, 1.0], activation.sigmoid(np.array([-1e6, 1e6]), 0.8), atol=1e-30)
+            self.assertAlmostEqual(0.0, activation.sigmoid(-1e6, 0.8))
+            self.assertAlmostEqual(0.0, activation.sigmoid(np.array([-1e6], dtype=np.float32), 0.8)[0])
+
+        # outを指定した時はその場で計算されるかテスト
+        buf = x.copy()
+        ret = activation.sigmoid(buf, 0.8, out=buf)
+        self.assertIs(buf, ret)
+        np.testing.assert_allclose(expected, buf)
+
+        # 微分が数値微分と一致するかテスト
+        h = 1e-6
+        numerical = (activation.sigmoid(x + h, 0.8) - activation.sigmoid(x - h, 0.8)) / (2 * h)
+        np.testing.assert_allclose(numerical, activation.sigmoid_deriv(expected, 0.8), atol=1e-8)
+
+    def test_tanh_relu(self):
+        """
+        test method of tanh, tanh_deriv, relu, relu_deriv
+        """
+        x = np.linspace(-3, 3, 61) + 0.01
+        h = 1e-6
+        for name in ['tanh', 'relu']:
+            func, deriv = activation.get_activation(name)
+            # 微分が数値微分と一致するかテスト
+            numerical = (func(x + h, 0.8) - func(x - h, 0.8)) / (2 * h)
+            np.testing.assert_allclose(numerical, deriv(func(x, 0.8), 0.8), atol=1e-6)
+        np.testing.assert_allclose(np.tanh(0.8 * x), activation.tanh(x, 0.8))
+        np.testing.assert_array_equal(np.maximum(0.8 * x, 0.0), activation.relu(x, 0.8))
+
+        # 存在しない名前の時はValueErrorを投げているかテスト
+        with self.assertRaises(ValueError):
+            activation.get_activation('test')
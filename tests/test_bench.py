@@ -0,0 +1,65 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import tempfile
+import unittest
+import bench
+import q
+import rnn
+
+
+class test_bench(unittest.TestCase):
+    def test_compare(self):
+        """
+        test method of compare
+        """
+        baseline = {'a': {'value': 100.0, 'unit': 'samples/sec'},
+                    'b': {'value': 100.0, 'unit': 'samples/sec'},
+                    'c': {'value': 100.0, 'unit': 'samples/sec'}}
+        results = {'a': {'value': 70.0, 'unit': 'samples/sec'},
+                   'b': {'value': 95.0, 'unit': 'samples/sec'},
+                   'c': {'value': 150.0, 'unit': 'samples/sec'},
+                   'd': {'value': 1.0, 'unit': 'samples/sec'}}
+        rows = bench.compare(results, baseline, tolerance=0.2)
+        # ベースラインに無い条件は比べず、20%以上の変化だけを遅い/速いとするかテスト
+        self.assertEqual(['a', 'b', 'c'], [row[0] for row in rows])
+        self.assertEqual(['slower', 'ok', 'faster'], [row[4] for row in rows])
+        self.assertAlmostEqual(0.7, rows[0][3])
+
+    def test_results_file(self):
+        """
+        test method of write_results and read_results
+        """
+        results = {'bp/2-3-1/batch1': {'value': bench.bench_bp([2, 3, 1], num_sample=8, repeat=1), 'unit': 'samples/sec'}}
+        self.assertGreater(results['bp/2-3-1/batch1']['value'], 0.0)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'result.json')
+            bench.write_results(results, path)
+            self.assertEqual(results, bench.read_results(path))
+
+    def test_bench_rnn(self):
+        """
+        test method of bench_rnn, bench_elman, bench_ensemble
+        """
+        saved = (rnn.NUM_INPUT, rnn.NUM_HIDDEN, rnn.NUM_CONTEXT, rnn.NUM_OUTPUT)
+        self.assertGreater(bench.bench_rnn(8, 30, repeat=1), 0.0)
+        # 測った後にrnn.pyのユニット数が元に戻っているかテスト
+        self.assertEqual(saved, (rnn.NUM_INPUT, rnn.NUM_HIDDEN, rnn.NUM_CONTEXT, rnn.NUM_OUTPUT))
+        self.assertGreater(bench.bench_elman(8, 30, repeat=1), 0.0)
+        self.assertGreater(bench.bench_ensemble(8, 30, num_seed=2, repeat=1), 0.0)
+        self.assertGreater(bench.bench_sigmoid_scalar(num_call=10, repeat=1), 0.0)
+
+    def test_run_episodes(self):
+        """
+        test method of run_episodes
+        """
+        # 乱数シードを固定しているので、何回実行しても同じステップ数になるかテスト
+        steps = bench.run_episodes(q, 5, 6, num_episode=2, num_step=50)
+        self.assertEqual(steps, bench.run_episodes(q, 5, 6, num_episode=2, num_step=50))
+        self.assertLessEqual(steps, 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
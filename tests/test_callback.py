@@ -0,0 +1,114 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'back_propagation'))
+
+import tempfile
+import unittest
+import numpy as np
+import bp
+import callback
+import checkpoint
+
+
+class Recorder(callback.Callback):
+    """
+    呼び出された順番を記録するテスト用のコールバック
+    """
+    def __init__(self, stop_epoch=None):
+        self.events = []
+        self.num_sample = 0
+        self.stop_epoch = stop_epoch
+
+    def on_epoch_start(self, epoch, logs):
+        self.events.append(('start', epoch))
+
+    def on_epoch_end(self, epoch, logs):
+        self.events.append(('end', epoch))
+        return epoch == self.stop_epoch
+
+    def on_sample(self, isample, logs):
+        self.num_sample += 1
+
+    def on_converge(self, epoch, logs):
+        self.events.append(('converge', epoch))
+
+class EpochOnly(callback.Callback):
+    def on_epoch_end(self, epoch, logs):
+        return False
+
+
+class test_callback(unittest.TestCase):
+    def test_callback_list(self):
+        """
+        test method of CallbackList and make_callbacks
+        """
+        # コールバックが無ければNoneになるかテスト
+        self.assertIsNone(callback.make_callbacks(None))
+        self.assertIsNone(callback.make_callbacks([]))
+        with self.assertRaises(ValueError):
+            callback.make_callbacks(Recorder())
+
+        # 上書きしたメソッドだけが登録されるかテスト
+        callbacks = callback.make_callbacks([EpochOnly()])
+        self.assertEqual(0, len(callbacks.epoch_start))
+        self.assertEqual(1, len(callbacks.epoch_end))
+        self.assertEqual(0, len(callbacks.sample))
+        self.assertEqual(0, len(callbacks.converge))
+        self.assertIs(callbacks, callback.make_callbacks(callbacks))
+
+    def test_fit(self):
+        """
+        test method of bp.fit
+        """
+        data = bp.read_data()
+        recorder = Recorder(stop_epoch=2)
+        weight = bp.init_net(2, 3, 1)
+        ilearn = bp.fit(weight, data, 2, num_learn=10, batch_size=2, callbacks=[recorder])
+        # on_epoch_end()がTrueを返したepochで止まるかテスト
+        self.assertEqual(2, ilearn)
+        self.assertEqual([('start', 0), ('end', 0), ('start', 1), ('end', 1), ('start', 2), ('end', 2)], recorder.events)
+        self.assertEqual(6, recorder.num_sample)
+
+        # コールバックがあっても無くても、train_batch()を繰り返したのと同じ重みになるかテスト
+        weight1 = bp.init_net(2, 3, 1)
+        weight2 = bp.init_net(2, 3, 1)
+        bp.fit(weight1, data, 2, num_learn=5, epsilon=0.15, callbacks=[Recorder()])
+        for _ in range(5):
+            bp.train_batch(weight2, data, 2, epsilon=0.15)
+        for w1, w2 in zip(weight1, weight2):
+            np.testing.assert_array_equal(w1, w2)
+
+        # 収束した時にon_converge()が呼ばれ、Checkpointで保存されるかテスト
+        recorder = Recorder()
+        weight = bp.init_net(2, 3, 1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model')
+            early_stopping = bp.EarlyStopping(threshold=0.1)
+            ilearn = bp.fit(weight, data, 2, num_learn=50000, epsilon=0.15, early_stopping=early_stopping,
+                            callbacks=[recorder, callback.Checkpoint(path, interval=100000)])
+            self.assertTrue(early_stopping.converged)
+            self.assertEqual(('converge', ilearn), recorder.events[-1])
+            model = checkpoint.load_model(path)
+            self.assertEqual(ilearn, model['extra']['epoch'])
+            for w1, w2 in zip(weight, model['weight']):
+                np.testing.assert_array_equal(w1, w2)
+
+    def test_fit_act(self):
+        """
+        test method of bp.fit with act
+        """
+        # 収束の判定にも学習と同じ活性化関数を使っているかテスト
+        data = bp.read_data()
+        weight = bp.init_net(2, 3, 1)
+        early_stopping = bp.EarlyStopping(threshold=0.0, interval=5)
+        bp.fit(weight, data, 2, num_learn=5, epsilon=0.05, act='tanh', early_stopping=early_stopping)
+        _, expected = bp.evaluate(weight, data, act='tanh')
+        self.assertAlmostEqual(expected, early_stopping.last_error)
+        _, sigmoid_error = bp.evaluate(weight, data)
+        self.assertNotAlmostEqual(sigmoid_error, early_stopping.last_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
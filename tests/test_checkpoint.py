@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'back_propagation'))
+
+import tempfile
+import unittest
+import numpy as np
+import bp
+import checkpoint
+import optimizer
+
+
+class test_checkpoint(unittest.TestCase):
+    def test_save_load(self):
+        """
+        test method of save_model, load_model
+        """
+        data = bp.read_data()
+        weight = bp.init_deep_net([2, 4, 3, 1])
+        opt = optimizer.Momentum(epsilon=0.15, momentum=0.9)
+        for ilearn in range(10):
+            bp.train_batch(weight, data, 2, optimizer=opt)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model')
+            checkpoint.save_model(path, weight, kind='bp', beta=0.8, optimizer=opt, extra={'epoch': 10})
+
+            # 推論用にメモリマップで開いた重みが保存した重みと一致するかテスト
+            model = checkpoint.load_model(path, mmap=True)
+            self.assertEqual('bp', model['kind'])
+            self.assertEqual(0.8, model['beta'])
+            self.assertEqual({'epoch': 10}, model['extra'])
+            self.assertIsInstance(model['params'].data, np.memmap)
+            for expected, actual in zip(weight, model['weight']):
+                np.testing.assert_array_equal(expected, actual)
+            np.testing.assert_allclose(bp.evaluate(weight, data)[0], bp.evaluate(model['weight'], data)[0])
+
+            # 学習を再開した結果が、中断しなかった時と一致するかテスト
+            resumed_opt = optimizer.Momentum()
+            model = checkpoint.load_model(path, optimizer=resumed_opt)
+            self.assertEqual(0.15, resumed_opt.epsilon)
+            self.assertEqual(0.9, resumed_opt.momentum)
+            resumed = model['weight']
+            for ilearn in range(10):
+                bp.train_batch(weight, data, 2, optimizer=opt)
+                bp.train_batch(resumed, data, 2, optimizer=resumed_opt)
+            for expected, actual in zip(weight, resumed):
+                np.testing.assert_allclose(expected, actual)
+
+            # 保存時と違う最適化手法を指定した時はValueErrorを投げているかテスト
+            with self.assertRaises(ValueError):
+                checkpoint.load_model(path, optimizer=optimizer.Adam())
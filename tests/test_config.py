@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import numpy as np
+import config
+
+
+class test_config(unittest.TestCase):
+    def test_set_float_dtype(self):
+        """
+        test method of set_float_dtype
+        """
+        try:
+            # 指定した型に変更されているかテスト
+            config.set_float_dtype(np.float32)
+            self.assertEqual(np.float32, config.FLOAT_DTYPE)
+            config.set_float_dtype('float64')
+            self.assertEqual(np.float64, config.FLOAT_DTYPE)
+
+            # 実数型以外の時はValueErrorを投げているかテスト
+            with self.assertRaises(ValueError):
+                config.set_float_dtype(np.int32)
+        finally:
+            config.set_float_dtype(np.float64)
+
+    def test_set_map_dtype(self):
+        """
+        test method of set_map_dtype
+        """
+        try:
+            # 指定した型に変更されているかテスト
+            config.set_map_dtype(np.int16)
+            self.assertEqual(np.int16, config.MAP_DTYPE)
+
+            # 整数型以外の時はValueErrorを投げているかテスト
+            with self.assertRaises(ValueError):
+                config.set_map_dtype(np.float32)
+        finally:
+            config.set_map_dtype(np.int8)
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class test_imports(unittest.TestCase):
+    def test_no_matplotlib(self):
+        """
+        学習用のモジュールをimportしただけではmatplotlibが読み込まれないかテスト
+        """
+        for sub, name in [('back_propagation', 'bp_plot'), ('RNN', 'rnn'), ('Q', 'q'), ('SARSA', 'sarsa')]:
+            code = "import sys; sys.path.insert(0, {!r}); import {}; print('matplotlib' in sys.modules)".format(
+                os.path.join(ROOT, sub), name)
+            output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+            self.assertEqual(b'False', output.strip(), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import unittest
+import numpy as np
+import params
+
+
+class test_params(unittest.TestCase):
+    def test_flat_params(self):
+        """
+        test method of FlatParams
+        """
+        weight = [np.arange(6.0).reshape((3, 2)), np.arange(3.0).reshape((3, 1))]
+        flat = params.FlatParams.from_weight(weight)
+
+        # 値がコピーされ、1本の配列に並んでいるかテスト
+        np.testing.assert_array_equal(np.arange(6.0).tolist() + np.arange(3.0).tolist(), flat.data)
+        for expected, actual in zip(weight, flat.weight):
+            np.testing.assert_array_equal(expected, actual)
+            self.assertEqual(expected.shape, actual.shape)
+
+        # 各層の重みがdataのビューになっているかテスト
+        for view in flat.weight + flat.grad_views:
+            self.assertFalse(view.flags.owndata)
+        flat.weight[1][2, 0] = 100.0
+        self.assertEqual(100.0, flat.data[-1])
+        flat.data += 1.0
+        self.assertEqual(1.0, flat.weight[0][0, 0])
+
+        # 修正量のノルムのテスト
+        flat.grad_views[0][0, 0] = 3.0
+        flat.grad_views[1][0, 0] = 4.0
+        self.assertAlmostEqual(5.0, flat.grad_norm())
+
+        # 既存の配列を指定した時はコピーせずに使うかテスト
+        other = params.FlatParams(flat.shapes, buffer=flat.data)
+        self.assertIs(flat.data, other.data)
+        with self.assertRaises(ValueError):
+            params.FlatParams(flat.shapes, buffer=np.zeros(3))
+
+        # 共有メモリに確保できるかテスト
+        shared = params.FlatParams.from_weight([w.astype(np.float32) for w in weight], shared=True)
+        self.assertEqual(np.float32, shared.data.dtype)
+        np.testing.assert_array_equal(weight[0], shared.weight[0])
@@ -0,0 +1,83 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'back_propagation'))
+
+import io
+import json
+import tempfile
+import unittest
+import numpy as np
+import bp
+import profiler
+
+
+class test_profiler(unittest.TestCase):
+    def test_profiler(self):
+        """
+        test method of Profiler
+        """
+        stream = io.StringIO()
+        prof = profiler.Profiler(stream)
+        for _ in range(3):
+            t0 = prof.start()
+            prof.stop('forward', t0)
+        t0 = prof.start()
+        prof.stop('update', t0)
+        self.assertEqual({'forward': 3, 'update': 1}, {name: value['count'] for name, value in prof.summary().items()})
+
+        # 1行のJSONとして書き出され、集計がリセットされるかテスト
+        prof.emit(epoch=0, error=0.5)
+        prof.emit(epoch=1)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+        record = json.loads(lines[0])
+        self.assertEqual(0, record['epoch'])
+        self.assertEqual(0.5, record['error'])
+        self.assertEqual(3, record['phases']['forward']['count'])
+        self.assertGreaterEqual(record['phases']['forward']['seconds'], 0.0)
+        self.assertEqual({}, json.loads(lines[1])['phases'])
+
+    def test_get_profiler(self):
+        """
+        test method of get_profiler
+        """
+        os.environ.pop(profiler.ENV_NAME, None)
+        prof = profiler.get_profiler()
+        self.assertIs(profiler.NULL, prof)
+        self.assertFalse(prof.enabled)
+        t0 = prof.start()
+        prof.stop('forward', t0)
+        self.assertEqual({}, prof.summary())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'profile.jsonl')
+            os.environ[profiler.ENV_NAME] = path
+            try:
+                prof = profiler.get_profiler()
+            finally:
+                os.environ.pop(profiler.ENV_NAME)
+            self.assertTrue(prof.enabled)
+            # bpの学習で処理ごとの回数が記録されるかテスト
+            weight = bp.init_net(2, 3, 1)
+            bp.train_batch(weight, bp.read_data(), 2, batch_size=2, prof=prof)
+            prof.emit(epoch=0)
+            prof.close()
+            with open(path, 'r') as f:
+                record = json.loads(f.readline())
+            for name in ['forward', 'error', 'backward', 'update']:
+                self.assertEqual(2, record['phases'][name]['count'])
+
+        # 計測してもしなくても学習結果が変わらないかテスト
+        data = bp.read_data()
+        weight1 = bp.init_net(2, 3, 1)
+        weight2 = [w.copy() for w in weight1]
+        bp.train_batch(weight1, data, 2)
+        bp.train_batch(weight2, data, 2, prof=profiler.Profiler(io.StringIO()))
+        for w1, w2 in zip(weight1, weight2):
+            np.testing.assert_array_equal(w1, w2)
+
+
+if __name__ == '__main__':
+    unittest.main()